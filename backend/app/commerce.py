@@ -5,9 +5,233 @@ Stage 4: Seamless Commerce - Quote Generation and Payment Processing
 Handles insurance quote generation, policy presentation, and payment flow.
 """
 
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
-import uuid
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from operator import itemgetter
+import re
+import sys
+import threading
+import time
+import numpy as np
+
+# Numba is optional - batch pricing falls back to plain NumPy without it
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _price_kernel(base_prices, durations, travelers, high_risk, adventurous,
+                      is_premium, high_risk_surcharge, adventure_surcharge):
+        """Fused base price + surcharge (in cents) for shape (policies, trips)."""
+        n_policies = base_prices.shape[0]
+        n_trips = durations.shape[0]
+        out = np.empty((n_policies, n_trips), np.float64)
+        for p in prange(n_policies):
+            for i in range(n_trips):
+                surcharge = 0
+                if high_risk[i]:
+                    surcharge += high_risk_surcharge
+                if adventurous[i] and not is_premium[p]:
+                    surcharge += adventure_surcharge
+                out[p, i] = base_prices[p] * durations[i] * travelers[i] + surcharge
+        return out
+    
+    # Compile once at import so the first user request doesn't pay for it
+    _price_kernel(
+        np.ones(1, np.int64), np.ones(1, np.float64), np.ones(1, np.float64),
+        np.zeros(1, np.bool_), np.zeros(1, np.bool_), np.zeros(1, np.bool_),
+        0, 0
+    )
+else:
+    _price_kernel = None
+
+
+logger = logging.getLogger(__name__)
+
+# Interned values repeated in every quote/payment dict
+CURRENCY = sys.intern('SGD')
+STATUS_PENDING = sys.intern('pending')
+STATUS_SUCCESS = sys.intern('success')
+
+# Feature list shown on each quote card, per policy tier
+FEATURES_MAP = {
+    'basic': (
+        '24/7 Emergency Assistance',
+        'Medical Expenses Coverage',
+        'Baggage Loss Protection',
+        'Trip Cancellation Coverage'
+    ),
+    'standard': (
+        'All Basic Features',
+        'Higher Coverage Limits',
+        'Emergency Evacuation',
+        'Trip Delay Coverage',
+        'Personal Accident Coverage'
+    ),
+    'premium': (
+        'All Standard Features',
+        'Maximum Coverage Limits',
+        'Adventure Sports Coverage',
+        'Pre-Existing Conditions',
+        'Cancel For Any Reason (CFAR)'
+    )
+}
+
+
+# URL builders for issued policy documents
+_POLICY_DOCUMENT_URL = "https://policies.example.com/{}.pdf".format
+_POLICY_DOWNLOAD_URL = "https://policies.example.com/download/{}".format
+
+
+# (second, ISO timestamp, ISO timestamp + 7 days) for the current second
+_timestamp_cache = (0, '', '')
+
+
+def _now_iso_pair() -> Tuple[str, str]:
+    """
+    Return (now, now + 7 days) as ISO strings at second precision.
+    
+    The strings are formatted once per second and reused by every caller
+    in that second.
+    """
+    global _timestamp_cache
+    second = int(time.time())
+    cached = _timestamp_cache
+    if cached[0] != second:
+        now = datetime.fromtimestamp(second)
+        cached = (second, now.isoformat(), (now + timedelta(days=7)).isoformat())
+        _timestamp_cache = cached
+    return cached[1], cached[2]
+
+
+def _now_iso() -> str:
+    """Return the current time as an ISO string at second precision."""
+    return _now_iso_pair()[0]
+
+
+@lru_cache(maxsize=1)
+def _policy_date_str(day_ordinal: int) -> str:
+    """Return the YYYYMMDD policy-number stamp for a day (formatted once per day)."""
+    return date.fromordinal(day_ordinal).strftime('%Y%m%d')
+
+
+class _ReadOnlyDict(dict):
+    """
+    Immutable dict shared by every quote of a tier.
+    
+    Unlike MappingProxyType it is still a dict, so json/orjson serialize it
+    directly; any mutation raises TypeError.
+    """
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("policy coverage is read-only")
+    
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+    
+    def __copy__(self):
+        return self
+    
+    def __deepcopy__(self, memo):
+        return self
+    
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+
+class _IDPool:
+    """
+    Hands out random hex IDs sliced from a pre-fetched block of entropy.
+    
+    One os.urandom call serves many IDs instead of one syscall per ID.
+    """
+    
+    def __init__(self, block_size: int = 4096):
+        self._block_size = block_size
+        self._lock = threading.Lock()
+        self._refill()
+        
+        # Forked workers must not hand out IDs from the parent's buffer
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+    
+    def _refill(self) -> None:
+        self._buf = os.urandom(self._block_size)
+        self._pos = 0
+    
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._refill()
+    
+    def get(self, nbytes: int = 16) -> str:
+        """Return a random ID of nbytes bytes as a hex string."""
+        with self._lock:
+            if self._pos + nbytes > self._block_size:
+                self._refill()
+            chunk = self._buf[self._pos:self._pos + nbytes]
+            self._pos += nbytes
+        return chunk.hex()
+
+
+_id_pool = _IDPool()
+
+
+def _compile_quote_builder(template: Dict):
+    """
+    Generate a quote builder specialized for one policy tier.
+    
+    The returned function builds the quote dict in a single expression with
+    the tier's string fields inlined as literals, which is faster than
+    copying the template and updating it.
+    
+    Args:
+        template: Static quote fields for the tier
+        
+    Returns:
+        Function (price, duration, traveler_count, created_at, valid_until) -> quote dict
+    """
+    namespace = {'_new_id': _id_pool.get}
+    fields = []
+    for i, (key, value) in enumerate(template.items()):
+        if isinstance(value, str):
+            fields.append(f"{key!r}: {value!r}")
+        else:
+            # Shared objects (coverage, highlights, features) are bound as globals
+            name = f"_const_{i}"
+            namespace[name] = value
+            fields.append(f"{key!r}: {name}")
+    
+    source = (
+        "def build(price, duration, traveler_count, created_at, valid_until):\n"
+        "    return {" + ", ".join(fields) + ", "
+        "'quote_id': _new_id(), 'price': price, 'duration_days': duration, "
+        "'traveler_count': traveler_count, 'created_at': created_at, "
+        "'valid_until': valid_until}\n"
+    )
+    exec(compile(source, f"<quote builder {template.get('policy_key')}>", "exec"), namespace)
+    return namespace['build']
+
+
+class Policy(NamedTuple):
+    """
+    Immutable policy tier record used on the quoting hot path.
+    """
+    key: str
+    name: str
+    description: str
+    base_price_cents: int
+    coverage: Mapping[str, Any]
+    highlights: Tuple[str, ...]
+    features: Tuple[str, ...]
 
 
 class QuoteGenerator:
@@ -15,6 +239,10 @@ class QuoteGenerator:
     Generates insurance quotes based on trip information and policy data.
     """
     
+    # Flat surcharges (in cents) added on top of the per-day price
+    HIGH_RISK_SURCHARGE_CENTS = 2000
+    ADVENTURE_SURCHARGE_CENTS = 3000
+    
     def __init__(self, vector_store=None, qa_system=None):
         """
         Initialize quote generator.
@@ -66,6 +294,51 @@ class QuoteGenerator:
                 }
             }
         }
+        
+        # Keyword matchers for surcharges (high-risk areas, adventure activities),
+        # run on lowercased text: much faster than IGNORECASE matching
+        self._risk_re = re.compile(r'africa|middle east|south america')
+        self._adv_re = re.compile(r'ski|dive|scuba|climbing|parachute')
+        
+        # Immutable per-tier records (attribute access instead of nested dict lookups)
+        self._policies = tuple(
+            Policy(
+                key=policy_key,
+                name=policy_data['name'],
+                description=policy_data['description'],
+                base_price_cents=policy_data['base_price_per_day'] * 100,
+                coverage=_ReadOnlyDict(policy_data['coverage']),
+                highlights=tuple(self._get_highlights(policy_data['coverage'])),
+                features=self._get_features(policy_key)
+            )
+            for policy_key, policy_data in self.policies.items()
+        )
+        
+        # Precompute the static part of each quote card once per tier, so
+        # generate_quotes only has to fill in the trip-specific fields
+        self._quote_templates = {}
+        for policy in self._policies:
+            self._quote_templates[policy.key] = {
+                'policy_name': policy.name,
+                'policy_key': policy.key,
+                'description': policy.description,
+                'currency': CURRENCY,
+                'coverage': policy.coverage,
+                'highlights': policy.highlights,
+                'features': policy.features
+            }
+        
+        # Specialized builder per tier, generated from its template
+        self._quote_builders = {
+            key: _compile_quote_builder(template)
+            for key, template in self._quote_templates.items()
+        }
+        
+        # Per-tier pricing arrays for vectorized batch quoting
+        self._base_prices = np.array(
+            [policy.base_price_cents for policy in self._policies], dtype=np.int64
+        )
+        self._is_premium = np.array([policy.key == 'premium' for policy in self._policies])
     
     def generate_quotes(self, trip_info: Dict) -> List[Dict]:
         """
@@ -77,73 +350,166 @@ class QuoteGenerator:
         Returns:
             List of quote dictionaries with policy details and prices
         """
-        # Extract trip information
-        destination = trip_info.get('destination', 'Unknown')
-        duration = trip_info.get('duration_days', 7)  # Default 7 days
-        traveler_count = trip_info.get('traveler_count', 1)
-        activities = trip_info.get('activities', [])
+        destination, duration, traveler_count, activities = self._trip_fields(trip_info)
+        
+        # Risk checks only depend on the trip, not on the policy tier
+        is_high_risk, is_adventurous = self._risk_flags(destination, activities)
+        
+        # Timestamps are shared by every quote in this batch
+        created_at, valid_until = _now_iso_pair()
+        
+        # Generate quote for each policy tier, pricing in integer cents:
+        # base price + surcharges based on destination/activities
+        quotes = [
+            self._build_quote(
+                policy.key,
+                (policy.base_price_cents * duration * traveler_count
+                 + self._calculate_surcharge(policy.key, is_high_risk, is_adventurous)) / 100,
+                duration, traveler_count, created_at, valid_until
+            )
+            for policy in self._policies
+        ]
+        
+        # Sort by price (cheapest first)
+        quotes.sort(key=itemgetter('price'))
         
-        quotes = []
+        return quotes
+    
+    def _trip_fields(self, trip_info: Dict) -> Tuple[str, float, int, List[str]]:
+        """
+        Read the priced trip fields, with defaults (fields extracted from
+        documents are null, not missing, when not found).
         
-        # Generate quote for each policy tier
-        for policy_key, policy_data in self.policies.items():
-            # Calculate base price
-            base_price = policy_data['base_price_per_day'] * duration * traveler_count
+        Args:
+            trip_info: Trip information dictionary
             
-            # Add surcharges based on destination/activities
-            surcharge = self._calculate_surcharge(destination, activities, policy_key)
-            total_price = base_price + surcharge
+        Returns:
+            (destination, duration in days, traveler count, activities)
+        """
+        destination = trip_info.get('destination') or 'Unknown'
+        duration = trip_info.get('duration_days')
+        if duration is None:
+            duration = 7  # Default 7 days
+        traveler_count = trip_info.get('traveler_count')
+        if traveler_count is None:
+            traveler_count = 1
+        activities = trip_info.get('activities') or []
+        return destination, duration, traveler_count, activities
+    
+    def _risk_flags(self, destination: str, activities: List[str]) -> Tuple[bool, bool]:
+        """
+        Check a trip for the surcharge keywords.
+        
+        Args:
+            destination: Trip destination
+            activities: Planned activities
             
-            # Build quote card
-            quote = {
-                'quote_id': str(uuid.uuid4()),
-                'policy_name': policy_data['name'],
-                'policy_key': policy_key,
-                'description': policy_data['description'],
-                'price': round(total_price, 2),
-                'currency': 'SGD',
-                'duration_days': duration,
-                'traveler_count': traveler_count,
-                'coverage': policy_data['coverage'],
-                'highlights': self._get_highlights(policy_data['coverage']),
-                'features': self._get_features(policy_key),
-                'created_at': datetime.now().isoformat(),
-                'valid_until': (datetime.now() + timedelta(days=7)).isoformat()
-            }
+        Returns:
+            (high-risk destination, adventure activities) flags
+        """
+        # Activities are lowercased and searched once, one per line (no
+        # keyword spans lines)
+        return (
+            self._risk_re.search(destination.lower()) is not None,
+            self._adv_re.search('\n'.join(activities).lower()) is not None
+        )
+    
+    def generate_quotes_batch(self, trip_infos: List[Dict]) -> List[List[Dict]]:
+        """
+        Generate insurance quotes for many trips at once.
+        
+        Prices for every (policy tier, trip) pair are computed in a single
+        NumPy broadcast instead of a Python loop per trip.
+        
+        Args:
+            trip_infos: List of trip information dictionaries
             
-            quotes.append(quote)
+        Returns:
+            List of quote lists (one per trip, cheapest first)
+        """
+        if not trip_infos:
+            return []
+        
+        # Build per-trip arrays (same field defaults as generate_quotes; float
+        # so fractional durations price the same as there)
+        fields = [self._trip_fields(t) for t in trip_infos]
+        durations = np.array([duration for _, duration, _, _ in fields], dtype=np.float64)
+        travelers = np.array([traveler_count for _, _, traveler_count, _ in fields], dtype=np.float64)
+        flags = [self._risk_flags(destination, activities) for destination, _, _, activities in fields]
+        high_risk = np.array([is_high_risk for is_high_risk, _ in flags], dtype=bool)
+        adventurous = np.array([is_adventurous for _, is_adventurous in flags], dtype=bool)
+        
+        # Prices in cents with shape (policies, trips)
+        if _price_kernel is not None:
+            price_cents = _price_kernel(
+                self._base_prices, durations, travelers, high_risk, adventurous,
+                self._is_premium, self.HIGH_RISK_SURCHARGE_CENTS, self.ADVENTURE_SURCHARGE_CENTS
+            )
+        else:
+            base = self._base_prices[:, None] * durations[None, :] * travelers[None, :]
+            surcharge = (
+                self.HIGH_RISK_SURCHARGE_CENTS * high_risk[None, :]
+                + self.ADVENTURE_SURCHARGE_CENTS * (adventurous[None, :] & ~self._is_premium[:, None])
+            )
+            price_cents = base + surcharge
+        prices = (price_cents / 100).tolist()
+        
+        created_at, valid_until = _now_iso_pair()
+        
+        all_quotes = []
+        for i, (_, duration, traveler_count, _) in enumerate(fields):
+            quotes = [
+                self._build_quote(policy.key, prices[p][i], duration, traveler_count,
+                                  created_at, valid_until)
+                for p, policy in enumerate(self._policies)
+            ]
+            quotes.sort(key=itemgetter('price'))
+            all_quotes.append(quotes)
         
-        # Sort by price (cheapest first)
-        quotes.sort(key=lambda x: x['price'])
+        return all_quotes
+    
+    def _build_quote(self, policy_key: str, price: float, duration: int,
+                     traveler_count: int, created_at: str, valid_until: str) -> Dict:
+        """
+        Build a quote card for a policy tier using its specialized builder.
         
-        return quotes
+        Args:
+            policy_key: Policy tier key
+            price: Total quoted price
+            duration: Trip duration in days
+            traveler_count: Number of travelers
+            created_at: ISO timestamp of quote creation
+            valid_until: ISO timestamp when the quote expires
+            
+        Returns:
+            Quote dictionary
+        """
+        return self._quote_builders[policy_key](
+            price, duration, traveler_count, created_at, valid_until
+        )
     
-    def _calculate_surcharge(self, destination: str, activities: List, policy_key: str) -> float:
+    def _calculate_surcharge(self, policy_key: str, is_high_risk: bool, is_adventurous: bool) -> int:
         """
         Calculate additional surcharges based on destination and activities.
         
         Args:
-            destination: Travel destination
-            activities: List of activities
             policy_key: Policy tier key
+            is_high_risk: True if the destination is a high-risk area
+            is_adventurous: True if any adventure activity is planned
             
         Returns:
-            Surcharge amount
+            Surcharge amount in cents
         """
         surcharge = 0
         
         # Destination-based surcharges (high-risk areas)
-        high_risk_destinations = ['africa', 'middle east', 'south america']
-        if any(dest in destination.lower() for dest in high_risk_destinations):
-            surcharge += 20
+        if is_high_risk:
+            surcharge += self.HIGH_RISK_SURCHARGE_CENTS
         
         # Activity-based surcharges
-        adventure_activities = ['ski', 'dive', 'scuba', 'climbing', 'parachute']
-        if any(any(act in activity.lower() for act in adventure_activities) 
-               for activity in activities):
-            # Only charge if not included in premium
-            if policy_key != 'premium':
-                surcharge += 30
+        # Only charge if not included in premium
+        if is_adventurous and policy_key != 'premium':
+            surcharge += self.ADVENTURE_SURCHARGE_CENTS
         
         return surcharge
     
@@ -173,7 +539,7 @@ class QuoteGenerator:
         
         return highlights
     
-    def _get_features(self, policy_key: str) -> List[str]:
+    def _get_features(self, policy_key: str) -> Tuple[str, ...]:
         """
         Get feature list for a policy.
         
@@ -181,32 +547,9 @@ class QuoteGenerator:
             policy_key: Policy tier key
             
         Returns:
-            List of feature strings
-        """
-        features_map = {
-            'basic': [
-                '24/7 Emergency Assistance',
-                'Medical Expenses Coverage',
-                'Baggage Loss Protection',
-                'Trip Cancellation Coverage'
-            ],
-            'standard': [
-                'All Basic Features',
-                'Higher Coverage Limits',
-                'Emergency Evacuation',
-                'Trip Delay Coverage',
-                'Personal Accident Coverage'
-            ],
-            'premium': [
-                'All Standard Features',
-                'Maximum Coverage Limits',
-                'Adventure Sports Coverage',
-                'Pre-Existing Conditions',
-                'Cancel For Any Reason (CFAR)'
-            ]
-        }
-        
-        return features_map.get(policy_key, features_map['basic'])
+            Tuple of feature strings
+        """
+        return FEATURES_MAP.get(policy_key, FEATURES_MAP['basic'])
 
 
 class PaymentProcessor:
@@ -231,7 +574,7 @@ class PaymentProcessor:
         Returns:
             Dictionary with payment link and transaction ID
         """
-        transaction_id = str(uuid.uuid4())
+        transaction_id = _id_pool.get()
         
         # In production, call payment gateway API
         # For now, return mock payment link
@@ -243,8 +586,8 @@ class PaymentProcessor:
             'amount': quote['price'],
             'currency': quote['currency'],
             'quote_id': quote['quote_id'],
-            'status': 'pending',
-            'created_at': datetime.now().isoformat()
+            'status': STATUS_PENDING,
+            'created_at': _now_iso()
         }
     
     def process_payment(self, transaction_id: str, payment_data: Dict) -> Dict:
@@ -264,9 +607,9 @@ class PaymentProcessor:
         # In production, call payment gateway API
         return {
             'transaction_id': transaction_id,
-            'status': 'success',
-            'payment_id': str(uuid.uuid4()),
-            'processed_at': datetime.now().isoformat(),
+            'status': STATUS_SUCCESS,
+            'payment_id': _id_pool.get(),
+            'processed_at': _now_iso(),
             'message': 'Payment processed successfully'
         }
     
@@ -282,7 +625,7 @@ class PaymentProcessor:
         Returns:
             Policy document dictionary
         """
-        policy_number = f"POL-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
+        policy_number = f"POL-{_policy_date_str(date.today().toordinal())}-{_id_pool.get(4).upper()}"
         
         policy = {
             'policy_number': policy_number,
@@ -295,11 +638,11 @@ class PaymentProcessor:
             'traveler_count': quote['traveler_count'],
             'price_paid': quote['price'],
             'currency': quote['currency'],
-            'issued_at': datetime.now().isoformat(),
+            'issued_at': _now_iso(),
             'valid_from': quote.get('departure_date'),
             'valid_until': quote.get('return_date'),
-            'policy_document_url': f"https://policies.example.com/{policy_number}.pdf",
-            'download_url': f"https://policies.example.com/download/{policy_number}",
+            'policy_document_url': _POLICY_DOCUMENT_URL(policy_number),
+            'download_url': _POLICY_DOWNLOAD_URL(policy_number),
             'transaction_id': transaction_id
         }
         
@@ -316,28 +659,44 @@ class PaymentProcessor:
             True if sent successfully
         """
         # In production, integrate with email/SMS service
-        # (SendGrid, Twilio, etc.)
-        
-        email_content = f"""
-        Subject: Your Travel Insurance Policy - {policy['policy_number']}
+        # (SendGrid, Twilio, etc.) - the mail worker renders the email body
         
-        Dear {policy['policy_holder']},
-        
-        Your travel insurance policy has been issued successfully!
+        # Mock: In production, send actual email
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Policy confirmation queued: policy=%s to=%s",
+                        policy['policy_number'], policy.get('email'))
         
-        Policy Number: {policy['policy_number']}
-        Coverage: {policy['policy_name']}
-        Amount Paid: {policy['currency']} {policy['price_paid']}
+        return True
+    
+    async def process_payment_async(self, transaction_id: str, payment_data: Dict) -> Dict:
+        """
+        Async version of process_payment for concurrent bulk purchases.
         
-        Download your policy: {policy['download_url']}
+        In production, await the payment gateway HTTP call here so many
+        payments can be in flight at once.
         
-        Thank you for choosing our insurance!
+        Args:
+            transaction_id: Transaction identifier
+            payment_data: Payment information (card, etc.)
+            
+        Returns:
+            Payment result dictionary
         """
+        return self.process_payment(transaction_id, payment_data)
+    
+    async def send_policy_confirmation_async(self, policy: Dict) -> bool:
+        """
+        Async version of send_policy_confirmation.
         
-        # Mock: In production, send actual email
-        print(f"Email sent to {policy.get('email')}: {email_content}")
+        In production, await the email/SMS service call here.
         
-        return True
+        Args:
+            policy: Policy dictionary
+            
+        Returns:
+            True if sent successfully
+        """
+        return self.send_policy_confirmation(policy)
 
 
 class QuoteService:
@@ -345,6 +704,12 @@ class QuoteService:
     Main service that orchestrates quote generation and purchase flow.
     """
     
+    # Maximum number of issued quotes kept for the purchase flow
+    MAX_CACHED_QUOTES = 10000
+    
+    # Maximum purchases processed concurrently by complete_purchases_bulk
+    MAX_CONCURRENT_PURCHASES = 50
+    
     def __init__(self, vector_store=None, qa_system=None):
         """
         Initialize quote service.
@@ -355,6 +720,13 @@ class QuoteService:
         """
         self.quote_generator = QuoteGenerator(vector_store, qa_system)
         self.payment_processor = PaymentProcessor()
+        
+        # Issued quotes by quote_id (oldest first), so purchases can look up
+        # the exact quote the user saw instead of regenerating it
+        self._quote_cache = OrderedDict()
+        
+        # Background confirmation tasks (kept referenced until they finish)
+        self._confirmation_tasks = set()
     
     def get_quotes(self, trip_info: Dict) -> Dict:
         """
@@ -368,10 +740,16 @@ class QuoteService:
         """
         quotes = self.quote_generator.generate_quotes(trip_info)
         
+        # Remember issued quotes, evicting the oldest beyond the cap
+        for quote in quotes:
+            self._quote_cache[quote['quote_id']] = quote
+        while len(self._quote_cache) > self.MAX_CACHED_QUOTES:
+            self._quote_cache.popitem(last=False)
+        
         return {
             'quotes': quotes,
             'trip_info': trip_info,
-            'generated_at': datetime.now().isoformat(),
+            'generated_at': _now_iso(),
             'quote_count': len(quotes)
         }
     
@@ -387,12 +765,8 @@ class QuoteService:
         Returns:
             Dictionary with payment link and transaction details
         """
-        # Get quotes again to find the selected one
-        quotes_data = self.get_quotes(trip_info)
-        selected_quote = next(
-            (q for q in quotes_data['quotes'] if q['quote_id'] == quote_id),
-            None
-        )
+        # Look up the previously issued quote
+        selected_quote = self._quote_cache.get(quote_id)
         
         if not selected_quote:
             return {
@@ -427,18 +801,14 @@ class QuoteService:
         # Process payment
         payment_result = self.payment_processor.process_payment(transaction_id, payment_data)
         
-        if payment_result['status'] != 'success':
+        if payment_result['status'] != STATUS_SUCCESS:
             return {
                 'success': False,
                 'error': 'Payment failed'
             }
         
         # Get quote
-        quotes_data = self.get_quotes(trip_info)
-        selected_quote = next(
-            (q for q in quotes_data['quotes'] if q['quote_id'] == quote_id),
-            None
-        )
+        selected_quote = self._quote_cache.get(quote_id)
         
         if not selected_quote:
             return {
@@ -459,6 +829,83 @@ class QuoteService:
         }
 
 
+    async def complete_purchase_async(self, transaction_id: str, payment_data: Dict,
+                                      quote_id: str, trip_info: Dict, user_info: Dict) -> Dict:
+        """
+        Async version of complete_purchase.
+        
+        The confirmation email is sent in a background task so it does not
+        hold up the response.
+        
+        Args:
+            transaction_id: Transaction identifier
+            payment_data: Payment information
+            quote_id: Quote identifier
+            trip_info: Trip information
+            user_info: User information
+            
+        Returns:
+            Dictionary with policy details
+        """
+        # Process payment
+        payment_result = await self.payment_processor.process_payment_async(transaction_id, payment_data)
+        
+        if payment_result['status'] != STATUS_SUCCESS:
+            return {
+                'success': False,
+                'error': 'Payment failed'
+            }
+        
+        # Get quote
+        selected_quote = self._quote_cache.get(quote_id)
+        
+        if not selected_quote:
+            return {
+                'success': False,
+                'error': 'Quote not found'
+            }
+        
+        # Issue policy
+        policy = self.payment_processor.issue_policy(transaction_id, selected_quote, user_info)
+        
+        # Send confirmation in the background
+        task = asyncio.create_task(self.payment_processor.send_policy_confirmation_async(policy))
+        self._confirmation_tasks.add(task)
+        task.add_done_callback(self._confirmation_tasks.discard)
+        
+        return {
+            'success': True,
+            'policy': policy,
+            'payment': payment_result
+        }
+    
+    async def complete_purchases_bulk(self, purchases: List[Dict]) -> List[Dict]:
+        """
+        Complete many purchases concurrently (e.g. B2B bulk issuance).
+        
+        Args:
+            purchases: List of dictionaries with the complete_purchase arguments
+                       (transaction_id, payment_data, quote_id, trip_info, user_info)
+            
+        Returns:
+            List of purchase results, in the same order as the input
+        """
+        # Bound concurrency to avoid throttling by downstream services
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_PURCHASES)
+        
+        async def complete_one(purchase: Dict) -> Dict:
+            async with semaphore:
+                return await self.complete_purchase_async(
+                    purchase['transaction_id'],
+                    purchase.get('payment_data', {}),
+                    purchase['quote_id'],
+                    purchase.get('trip_info', {}),
+                    purchase.get('user_info', {})
+                )
+        
+        return await asyncio.gather(*[complete_one(p) for p in purchases])
+
+
 # Example usage
 if __name__ == "__main__":
     # quote_service = QuoteService()
@@ -5,10 +5,111 @@ Stage 0-2: Entry Point, Intent Detection, and Conversational Magic
 Handles human-like chat interactions, intent detection, and dynamic conversation flows.
 """
 
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import httpx
 import ollama
+from collections import deque
 from datetime import datetime
+from string import Template
+from types import MappingProxyType
+import asyncio
 import json
+import os
+import re
+import weakref
+from core.cache import LRUCache, SemanticCache, TTLCache
+
+# Optional: C-speed JSON parsing for LLM output (and serialization of sessions)
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+# Optional: local entity extraction (falls back to the LLM if not installed)
+try:
+    import spacy
+    from spacy.matcher import PhraseMatcher
+except ImportError:
+    spacy = None
+
+try:
+    import dateparser
+except ImportError:
+    dateparser = None
+
+
+# Conversation personas (different chat styles); read-only, shared by all engines
+_PERSONAS = MappingProxyType({
+    'travel_guru': MappingProxyType({
+        'key': 'travel_guru',
+        'name': 'Travel Guru',
+        'tone': 'fun, friendly, travel-savvy',
+        'emoji': '🧳✈️',
+        'greeting': 'Hey there! Ready to explore the world? 🌍'
+    }),
+    'advisor': MappingProxyType({
+        'key': 'advisor',
+        'name': 'Insurance Advisor',
+        'tone': 'formal, professional, compliance-aware',
+        'emoji': '🛡️',
+        'greeting': 'Hello, I\'m here to help you find the perfect travel insurance. How can I assist you today?'
+    }),
+    'companion': MappingProxyType({
+        'key': 'companion',
+        'name': 'Travel Companion',
+        'tone': 'casual, helpful, empathetic',
+        'emoji': '👋',
+        'greeting': 'Hi! Planning a trip? I\'d love to help you get protected! 😊'
+    })
+})
+
+# Intents the LLM may return
+_VALID_INTENTS = frozenset({
+    'get_quote', 'compare_policies', 'ask_question',
+    'check_eligibility', 'make_claim', 'learn_coverage'
+})
+
+# Keyword fallback when the LLM returns no valid intent. Alternatives are
+# tried in priority order (quote words anywhere beat compare words, etc.);
+# match.lastgroup is the intent
+_FALLBACK_INTENT_RE = re.compile(
+    r'^(?=.*?(?P<get_quote>quote|price|cost|buy))'
+    r'|^(?=.*?(?P<compare_policies>compare|difference))'
+    r'|^(?=.*?(?P<make_claim>claim|file))',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Follow-up suggestions shown after each intent
+_SUGGESTIONS_MAP = MappingProxyType({
+    'get_quote': ("Tell me more about coverage", "Compare with other plans"),
+    'compare_policies': ("Show me prices", "What's the difference?"),
+    'ask_question': ("Get a quote", "Compare policies"),
+    'check_eligibility': ("Ask another question", "Get a quote"),
+    'make_claim': ("File a claim", "Check claim status"),
+    'learn_coverage': ("Get a quote", "Compare policies")
+})
+_DEFAULT_SUGGESTIONS = ("How can I help?",)
+
+# Questions asking for missing quote information, by (field, persona key)
+_QUOTE_QUESTIONS = MappingProxyType({
+    ('destination', 'travel_guru'): "Where are you planning to go? 🌍",
+    ('destination', 'advisor'): "Which country or region will you be traveling to?",
+    ('destination', 'companion'): "Tell me your destination and I'll find the perfect coverage!",
+    ('travel_date', 'travel_guru'): "When does your adventure begin? 📅",
+    ('travel_date', 'advisor'): "What is your departure date?",
+    ('travel_date', 'companion'): "When are you planning to leave?",
+    ('duration', 'travel_guru'): "How long will you be away? 🗓️",
+    ('duration', 'advisor'): "What is the duration of your trip?",
+    ('duration', 'companion'): "How many days will you be traveling?",
+    ('travelers', 'travel_guru'): "How many travelers? (Including yourself!) 👥",
+    ('travelers', 'advisor'): "How many people will be covered under this policy?",
+    ('travelers', 'companion'): "Just yourself or traveling with others?"
+})
 
 
 class ConversationEngine:
@@ -21,7 +122,31 @@ class ConversationEngine:
     - Persona switching
     """
     
-    def __init__(self, vector_store=None, qa_system=None, llm_model: str = "llama3"):
+    # Turns kept per session (older ones are dropped automatically)
+    MAX_HISTORY_TURNS = 20
+    
+    # Seconds to wait for an Ollama response before falling back
+    LLM_TIMEOUT = 120.0
+    
+    # Same keep-alive and context size as PolicyQASystem, so every call reuses
+    # the model loaded (and kept loaded) at startup: a different num_ctx makes
+    # Ollama reload it
+    KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "2h")
+    NUM_CTX = 4096
+    
+    # Intent labels are a few tokens long: decode deterministically and stop
+    # at the end of the label instead of generating a preamble
+    # (no ' ' stop: a leading space in the output would halt decoding at once)
+    INTENT_OPTIONS = {'temperature': 0.0, 'num_predict': 5, 'stop': ['\n', '.', ','], 'num_ctx': NUM_CTX}
+    
+    def __init__(
+        self,
+        vector_store=None,
+        qa_system=None,
+        llm_model: str = "llama3",
+        session_ttl: int = 3600,
+        max_sessions: int = 10000
+    ):
         """
         Initialize the conversation engine.
         
@@ -29,35 +154,143 @@ class ConversationEngine:
             vector_store: VectorStore instance for policy queries
             qa_system: PolicyQASystem instance for answering policy questions
             llm_model: Ollama model to use
+            session_ttl: Seconds an idle session is kept
+            max_sessions: Maximum sessions held in memory (least recently used are dropped)
         """
         self.vector_store = vector_store
         self.qa_system = qa_system
         self.llm_model = llm_model
         
+        # Ollama clients owned by the engine: keep-alive connections are reused
+        # across turns, and a timeout keeps a stuck model from hanging a turn
+        # (set OLLAMA_NUM_PARALLEL>=2 on the Ollama server to serve concurrent
+        # async requests in parallel)
+        self.client = ollama.Client(
+            timeout=self.LLM_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=8)
+        )
+        self.async_client = ollama.AsyncClient(
+            timeout=self.LLM_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=8)
+        )
+        
         # Conversation personas (different chat styles)
-        self.personas = {
-            'travel_guru': {
-                'name': 'Travel Guru',
-                'tone': 'fun, friendly, travel-savvy',
-                'emoji': '🧳✈️',
-                'greeting': 'Hey there! Ready to explore the world? 🌍'
-            },
-            'advisor': {
-                'name': 'Insurance Advisor',
-                'tone': 'formal, professional, compliance-aware',
-                'emoji': '🛡️',
-                'greeting': 'Hello, I\'m here to help you find the perfect travel insurance. How can I assist you today?'
-            },
-            'companion': {
-                'name': 'Travel Companion',
-                'tone': 'casual, helpful, empathetic',
-                'emoji': '👋',
-                'greeting': 'Hi! Planning a trip? I\'d love to help you get protected! 😊'
+        self.personas = _PERSONAS
+        
+        # Greeting for each persona and time of day, built once
+        self._greetings = {
+            key: {
+                'morning': info['greeting'] + " Good morning!",
+                'afternoon': info['greeting'] + " Good afternoon!",
+                'evening': info['greeting'] + " Good evening!"
+            }
+            for key, info in self.personas.items()
+        }
+        
+        # Entities included in the LLM context, in display order
+        self._context_entity_fields = (
+            ('destination', 'Destination'),
+            ('travel_date', 'Travel date'),
+            ('travelers', 'Travelers')
+        )
+        
+        # Response prompts: the persona instructions come first and are
+        # byte-identical on every turn, so Ollama can reuse the cached prefix;
+        # only the context/message suffix changes
+        self._response_prefixes = {
+            info['name']: (
+                f"You are a {info['tone']} travel insurance assistant. {info['name']} {info['emoji']}\n\n"
+                f"Respond in a {info['tone']} way. Be helpful, concise, and friendly. "
+                f"Ask follow-up questions if needed to help the user.\n\n"
+            )
+            for info in self.personas.values()
+        }
+        self._response_suffix = Template('Conversation context:\n$context\n\nUser message: "$message"\n\nResponse:')
+        # Word count is a lower bound on the prefix token count (safe for num_keep)
+        self._response_options = {
+            name: {
+                'temperature': 0.7,
+                'num_predict': 300,
+                'num_keep': len(prefix.split()),
+                'num_ctx': self.NUM_CTX
             }
+            for name, prefix in self._response_prefixes.items()
+        }
+        
+        # Keyword classifier for intent detection: a confident keyword match
+        # answers directly, and only ambiguous messages go to the LLM
+        self.intent_keywords = {
+            'get_quote': ['quote', 'price', 'cost', 'buy', 'purchase'],
+            'compare_policies': ['compare', 'comparison', 'difference', 'versus'],
+            'ask_question': ['does it cover', 'what about', 'can i'],
+            'check_eligibility': ['eligible', 'eligibility', 'available in'],
+            'make_claim': ['claim', 'file claim', 'reimbursement'],
+            'learn_coverage': ['what covers', 'explain', 'tell me about']
+        }
+        self._keyword_to_intent = {
+            keyword: intent
+            for intent, keywords in self.intent_keywords.items()
+            for keyword in keywords
         }
+        # Longest keywords first so multi-word phrases win over their prefixes
+        self._intent_keyword_re = re.compile(
+            r'\b(?:' + '|'.join(
+                re.escape(kw) for kw in sorted(self._keyword_to_intent, key=len, reverse=True)
+            ) + r')\b',
+            re.IGNORECASE
+        )
+        
+        # Local entity extraction: spaCy NER (GPE/LOC, DATE, CARDINAL) plus rules,
+        # so most messages don't need an LLM call for entities
+        self.activity_keywords = [
+            'skiing', 'snowboarding', 'scuba diving', 'diving', 'snorkeling',
+            'hiking', 'trekking', 'mountaineering', 'climbing', 'surfing',
+            'rafting', 'skydiving', 'bungee jumping', 'paragliding', 'safari'
+        ]
+        self._duration_re = re.compile(r'\b(\d+)\s*(day|night|week|month)s?\b', re.IGNORECASE)
+        self._duration_days = {'day': 1, 'night': 1, 'week': 7, 'month': 30}
+        self._traveler_words = {'traveler', 'travelers', 'traveller', 'travellers',
+                                'people', 'persons', 'adults', 'passengers', 'of'}
+        self._number_words = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+                              'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
+        self.nlp = None
+        if spacy is not None:
+            try:
+                # Parser and lemmatizer aren't needed for NER
+                self.nlp = spacy.load("en_core_web_sm", exclude=["parser", "lemmatizer"])
+                self._activity_matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
+                self._activity_matcher.add(
+                    "ACTIVITY", [self.nlp.make_doc(kw) for kw in self.activity_keywords]
+                )
+            except OSError:
+                print("⚠️  spaCy model en_core_web_sm not found, using LLM for entity extraction")
+                self.nlp = None
         
-        # Active conversation sessions (in production, use Redis/database)
-        self.sessions = {}
+        # Caches in front of the LLM calls:
+        # - exact match on the normalized message (intent, entities)
+        # - exact match on the full prompt (free-form responses, which depend on context)
+        # - semantic match for intent, so paraphrases reuse a label
+        #   (not used for entities: "trip to Japan" and "trip to Korea" embed
+        #   almost identically but need different answers)
+        self._intent_cache = LRUCache(maxsize=4096)
+        self._entity_cache = LRUCache(maxsize=4096)
+        self._response_cache = LRUCache(maxsize=1024)
+        self._intent_semantic_cache = (
+            SemanticCache(vector_store.generate_embedding, threshold=0.95)
+            if vector_store else None
+        )
+        
+        # Active conversation sessions, bounded and expired when idle
+        # (in production, use Redis/database to share them across workers)
+        self.sessions = TTLCache(maxsize=max_sessions, ttl=session_ttl)
+        
+        # Serialized sessions for get_session_json(): user_id -> (session, JSON),
+        # dropped whenever the session changes
+        self._session_json = LRUCache(maxsize=1024)
+        
+        # Per-user locks so concurrent turns from one user don't interleave
+        # their session updates (a lock disappears once no turn holds it)
+        self._session_locks = weakref.WeakValueDictionary()
     
     def start_conversation(self, user_id: str, persona: str = 'travel_guru') -> Dict:
         """
@@ -72,6 +305,9 @@ class ConversationEngine:
         Returns:
             Dictionary with greeting message and session info
         """
+        now = datetime.now()
+        timestamp = now.isoformat()
+        
         # Initialize session
         self.sessions[user_id] = {
             'user_id': user_id,
@@ -80,24 +316,20 @@ class ConversationEngine:
             'context': {},
             'intent': None,
             'entities': {},  # Extracted information (destination, dates, etc.)
-            'conversation_history': [],
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
+            'conversation_history': deque(maxlen=self.MAX_HISTORY_TURNS),
+            'recent_context': deque(maxlen=3),  # Last 3 exchanges, preformatted for LLM prompts
+            'created_at': timestamp,
+            'updated_at': timestamp
         }
         
-        # Get greeting based on persona
-        persona_info = self.personas.get(persona, self.personas['travel_guru'])
-        greeting = persona_info['greeting']
-        
-        # Add contextual awareness if possible
-        # (In production, check user history, time of day, etc.)
-        hour = datetime.now().hour
-        if 6 <= hour < 12:
-            greeting += " Good morning!"
-        elif 12 <= hour < 18:
-            greeting += " Good afternoon!"
-        else:
-            greeting += " Good evening!"
+        # Get greeting based on persona and time of day
+        # (In production, also check user history, etc.)
+        if persona not in self.personas:
+            persona = 'travel_guru'
+        persona_info = self.personas[persona]
+        hour = now.hour
+        period = 'morning' if 6 <= hour < 12 else 'afternoon' if 12 <= hour < 18 else 'evening'
+        greeting = self._greetings[persona][period]
         
         return {
             'message': greeting,
@@ -130,8 +362,207 @@ class ConversationEngine:
         Returns:
             Dictionary with detected intent and confidence
         """
+        # Fast path: cached or unambiguous keyword match, no LLM call needed
+        intent, cache_key, embedding = self._lookup_intent(user_message)
+        if intent:
+            return self._record_intent(intent, 'high', user_message, user_id)
+        
         # Use LLM to detect intent
-        prompt = f"""Analyze this user message and identify their intent. Choose ONE intent:
+        return self._query_intent_llm(user_message, user_id, cache_key, embedding)
+    
+    async def adetect_intent(self, user_message: str, user_id: str) -> Dict:
+        """
+        Async version of detect_intent (uses the async Ollama client).
+        
+        Args:
+            user_message: User's input message
+            user_id: User identifier
+            
+        Returns:
+            Dictionary with detected intent and confidence
+        """
+        intent, cache_key, embedding = await self._alookup_intent(user_message)
+        if intent:
+            return self._record_intent(intent, 'high', user_message, user_id)
+        
+        return await self._aquery_intent_llm(user_message, user_id, cache_key, embedding)
+    
+    def _query_intent_llm(self, user_message: str, user_id: str, cache_key: str, embedding) -> Dict:
+        """
+        Ask the LLM for the intent and cache the answer.
+        
+        Args:
+            user_message: User's input message
+            user_id: User identifier
+            cache_key: Normalized message (from _lookup_intent)
+            embedding: Message embedding (from _lookup_intent)
+            
+        Returns:
+            Dictionary with detected intent and confidence
+        """
+        try:
+            response = self.client.generate(
+                model=self.llm_model,
+                prompt=self._build_intent_prompt(user_message),
+                keep_alive=self.KEEP_ALIVE,
+                options=self.INTENT_OPTIONS
+            )
+            result = self._resolve_intent(response['response'], user_message, user_id)
+            self._remember_intent(cache_key, embedding, result['intent'])
+            return result
+        except Exception:
+            return self._fallback_intent(user_message)
+    
+    async def _aquery_intent_llm(self, user_message: str, user_id: str, cache_key: str, embedding) -> Dict:
+        """
+        Async version of _query_intent_llm.
+        
+        Args:
+            user_message: User's input message
+            user_id: User identifier
+            cache_key: Normalized message (from _lookup_intent)
+            embedding: Message embedding (from _lookup_intent)
+            
+        Returns:
+            Dictionary with detected intent and confidence
+        """
+        try:
+            response = await self.async_client.generate(
+                model=self.llm_model,
+                prompt=self._build_intent_prompt(user_message),
+                keep_alive=self.KEEP_ALIVE,
+                options=self.INTENT_OPTIONS
+            )
+            result = self._resolve_intent(response['response'], user_message, user_id)
+            self._remember_intent(cache_key, embedding, result['intent'])
+            return result
+        except Exception:
+            return self._fallback_intent(user_message)
+    
+    def _cache_key(self, user_message: str) -> str:
+        """
+        Normalize a message for exact-match caching.
+        
+        Args:
+            user_message: User's input message
+            
+        Returns:
+            Cache key
+        """
+        return ' '.join(user_message.lower().split())
+    
+    def _lookup_intent(self, user_message: str, semantic: bool = True) -> Tuple[Optional[str], str, Optional[object]]:
+        """
+        Resolve intent without the LLM if possible.
+        
+        Checks, in order: exact-match cache, keyword classifier, semantic cache.
+        
+        Args:
+            user_message: User's input message
+            semantic: Also check the semantic cache (embeds the message)
+            
+        Returns:
+            Tuple of (intent or None, cache key, message embedding or None)
+        """
+        cache_key = self._cache_key(user_message)
+        intent = self._intent_cache.get(cache_key)
+        if intent:
+            return intent, cache_key, None
+        
+        intent = self._classify_by_keywords(user_message)
+        if intent:
+            return intent, cache_key, None
+        
+        embedding = None
+        if semantic:
+            intent, embedding = self._lookup_intent_semantic(cache_key)
+        
+        return intent, cache_key, embedding
+    
+    async def _alookup_intent(self, user_message: str) -> Tuple[Optional[str], str, Optional[object]]:
+        """
+        Async version of _lookup_intent.
+        
+        The semantic cache lookup embeds the message (model inference), so it
+        runs in a worker thread instead of blocking the event loop.
+        
+        Args:
+            user_message: User's input message
+            
+        Returns:
+            Tuple of (intent or None, cache key, message embedding or None)
+        """
+        intent, cache_key, embedding = self._lookup_intent(user_message, semantic=False)
+        if not intent and self._intent_semantic_cache is not None:
+            intent, embedding = await asyncio.to_thread(self._lookup_intent_semantic, cache_key)
+        return intent, cache_key, embedding
+    
+    def _lookup_intent_semantic(self, cache_key: str) -> Tuple[Optional[str], Optional[object]]:
+        """
+        Look a message up in the semantic intent cache.
+        
+        Args:
+            cache_key: Normalized message
+            
+        Returns:
+            Tuple of (intent or None, message embedding or None)
+        """
+        if self._intent_semantic_cache is None:
+            return None, None
+        try:
+            embedding = self._intent_semantic_cache.embed(cache_key)
+            return self._intent_semantic_cache.get(embedding), embedding
+        except Exception:
+            return None, None
+    
+    def _remember_intent(self, cache_key: str, embedding, intent: str) -> None:
+        """
+        Cache an LLM-detected intent.
+        
+        Args:
+            cache_key: Normalized message
+            embedding: Message embedding (None if semantic cache is disabled)
+            intent: Detected intent
+        """
+        self._intent_cache.put(cache_key, intent)
+        if embedding is not None:
+            self._intent_semantic_cache.put(embedding, intent)
+    
+    def _classify_by_keywords(self, user_message: str) -> Optional[str]:
+        """
+        Classify intent with a single pass of the precompiled keyword regex.
+        
+        Args:
+            user_message: User's input message
+            
+        Returns:
+            Intent name if one intent has strictly the most keyword hits, else None
+        """
+        counts = {}
+        for match in self._intent_keyword_re.finditer(user_message):
+            intent = self._keyword_to_intent[match.group(0).lower()]
+            counts[intent] = counts.get(intent, 0) + 1
+        
+        if not counts:
+            return None
+        
+        ranked = sorted(counts.values(), reverse=True)
+        if len(ranked) > 1 and ranked[0] == ranked[1]:
+            return None  # Ambiguous - let the LLM decide
+        
+        return max(counts, key=counts.get)
+    
+    def _build_intent_prompt(self, user_message: str) -> str:
+        """
+        Build the LLM prompt for intent detection.
+        
+        Args:
+            user_message: User's input message
+            
+        Returns:
+            Prompt string
+        """
+        return f"""Analyze this user message and identify their intent. Choose ONE intent:
 
 User message: "{user_message}"
 
@@ -144,53 +575,81 @@ Possible intents:
 6. learn_coverage - User wants to learn about what's covered (keywords: what covers, explain, tell me about)
 
 Respond with ONLY the intent name (e.g., "get_quote"):"""
+    
+    def _resolve_intent(self, llm_output: str, user_message: str, user_id: str) -> Dict:
+        """
+        Validate the LLM's intent label (falling back to keywords) and record it.
         
-        try:
-            response = ollama.generate(
-                model=self.llm_model,
-                prompt=prompt,
-                options={'temperature': 0.1, 'num_predict': 20}
-            )
-            intent = response['response'].strip().lower()
-            
-            # Validate intent
-            valid_intents = ['get_quote', 'compare_policies', 'ask_question', 
-                           'check_eligibility', 'make_claim', 'learn_coverage']
-            if intent not in valid_intents:
-                # Fallback: simple keyword matching
-                message_lower = user_message.lower()
-                if any(kw in message_lower for kw in ['quote', 'price', 'cost', 'buy']):
-                    intent = 'get_quote'
-                elif any(kw in message_lower for kw in ['compare', 'difference']):
-                    intent = 'compare_policies'
-                elif any(kw in message_lower for kw in ['claim', 'file']):
-                    intent = 'make_claim'
-                else:
-                    intent = 'ask_question'
+        Args:
+            llm_output: Raw LLM response text
+            user_message: User's input message
+            user_id: User identifier
             
-            # Update session
-            if user_id in self.sessions:
-                self.sessions[user_id]['intent'] = intent
-                self.sessions[user_id]['updated_at'] = datetime.now().isoformat()
+        Returns:
+            Dictionary with detected intent and confidence
+        """
+        intent = llm_output.strip().strip('"\'`').lower()
+        
+        # Validate intent
+        if intent not in _VALID_INTENTS:
+            # Fallback: simple keyword matching
+            intent = self._match_fallback_intent(user_message)
+        
+        return self._record_intent(intent, 'high', user_message, user_id)
+    
+    def _record_intent(self, intent: str, confidence: str, user_message: str, user_id: str) -> Dict:
+        """
+        Store the detected intent in the user's session.
+        
+        Args:
+            intent: Detected intent
+            confidence: Confidence label ('high', 'medium')
+            user_message: User's input message
+            user_id: User identifier
             
-            return {
-                'intent': intent,
-                'confidence': 'high',
-                'message': user_message
-            }
-        except Exception as e:
-            # Fallback intent detection
-            message_lower = user_message.lower()
-            if any(kw in message_lower for kw in ['quote', 'price', 'buy']):
-                intent = 'get_quote'
-            else:
-                intent = 'ask_question'
+        Returns:
+            Dictionary with detected intent and confidence
+        """
+        # Update session
+        if user_id in self.sessions:
+            self.sessions[user_id]['intent'] = intent
+            self.sessions[user_id]['updated_at'] = datetime.now().isoformat()
+            self._session_json.pop(user_id)
+        
+        return {
+            'intent': intent,
+            'confidence': confidence,
+            'message': user_message
+        }
+    
+    def _fallback_intent(self, user_message: str) -> Dict:
+        """
+        Keyword-only intent detection used when the LLM is unavailable.
+        
+        Args:
+            user_message: User's input message
             
-            return {
-                'intent': intent,
-                'confidence': 'medium',
-                'message': user_message
-            }
+        Returns:
+            Dictionary with detected intent and confidence
+        """
+        return {
+            'intent': self._match_fallback_intent(user_message),
+            'confidence': 'medium',
+            'message': user_message
+        }
+    
+    def _match_fallback_intent(self, user_message: str) -> str:
+        """
+        Match fallback keywords with one precompiled regex.
+        
+        Args:
+            user_message: User's input message
+            
+        Returns:
+            Intent name ('ask_question' if no keyword matches)
+        """
+        match = _FALLBACK_INTENT_RE.search(user_message)
+        return match.lastgroup if match else 'ask_question'
     
     def extract_entities(self, user_message: str, user_id: str) -> Dict:
         """
@@ -211,7 +670,163 @@ Respond with ONLY the intent name (e.g., "get_quote"):"""
         Returns:
             Dictionary with extracted entities
         """
-        prompt = f"""Extract travel information from this message. Return as JSON:
+        cache_key = self._cache_key(user_message)
+        cached = self._entity_cache.get(cache_key)
+        if cached is not None:
+            return self._merge_entities(dict(cached), user_id)
+        
+        entities = self._extract_entities_local(user_message)
+        if entities is not None:
+            return self._merge_entities(entities, user_id)
+        
+        try:
+            response = self.client.generate(
+                model=self.llm_model,
+                prompt=self._build_entities_prompt(user_message),
+                format='json',
+                keep_alive=self.KEEP_ALIVE,
+                options={'temperature': 0.1, 'num_predict': 200, 'num_ctx': self.NUM_CTX}
+            )
+            entities = self._parse_entities(response['response'])
+            self._entity_cache.put(cache_key, dict(entities))
+            return self._merge_entities(entities, user_id)
+        except Exception:
+            # Return empty entities if extraction fails
+            return self._empty_entities()
+    
+    async def aextract_entities(self, user_message: str, user_id: str) -> Dict:
+        """
+        Async version of extract_entities (uses the async Ollama client).
+        
+        Args:
+            user_message: User's input message
+            user_id: User identifier
+            
+        Returns:
+            Dictionary with extracted entities
+        """
+        cache_key = self._cache_key(user_message)
+        cached = self._entity_cache.get(cache_key)
+        if cached is not None:
+            return self._merge_entities(dict(cached), user_id)
+        
+        entities = self._extract_entities_local(user_message)
+        if entities is not None:
+            return self._merge_entities(entities, user_id)
+        
+        try:
+            response = await self.async_client.generate(
+                model=self.llm_model,
+                prompt=self._build_entities_prompt(user_message),
+                format='json',
+                keep_alive=self.KEEP_ALIVE,
+                options={'temperature': 0.1, 'num_predict': 200, 'num_ctx': self.NUM_CTX}
+            )
+            entities = self._parse_entities(response['response'])
+            self._entity_cache.put(cache_key, dict(entities))
+            return self._merge_entities(entities, user_id)
+        except Exception:
+            return self._empty_entities()
+    
+    def _extract_entities_local(self, user_message: str) -> Optional[Dict]:
+        """
+        Extract entities with spaCy NER and rules instead of the LLM.
+        
+        - GPE/LOC -> destination
+        - DATE -> travel_date, return_date (parsed with dateparser if installed)
+        - "<N> days/weeks" -> duration
+        - CARDINAL followed by "travelers"/"people"/... -> travelers
+        - activity keywords (PhraseMatcher) -> activities
+        
+        Args:
+            user_message: User's input message
+            
+        Returns:
+            Dictionary with extracted entities, or None if the LLM should be used
+            (spaCy unavailable, or a long message with no place name)
+        """
+        if self.nlp is None:
+            return None
+        
+        doc = self.nlp(user_message)
+        entities = self._empty_entities()
+        
+        dates = []
+        for ent in doc.ents:
+            if ent.label_ in ('GPE', 'LOC'):
+                if entities['destination'] is None:
+                    entities['destination'] = ent.text
+            elif ent.label_ == 'DATE':
+                if not self._duration_re.search(ent.text):
+                    dates.append(ent.text)
+            elif ent.label_ == 'CARDINAL':
+                if ent.end < len(doc) and doc[ent.end].lower_ in self._traveler_words:
+                    entities['travelers'] = self._parse_number(ent.text)
+        
+        if entities['destination'] is None and len(doc) > 50:
+            return None  # Long message without a clear place - let the LLM handle it
+        
+        if dates:
+            entities['travel_date'] = self._parse_date(dates[0])
+        if len(dates) > 1:
+            entities['return_date'] = self._parse_date(dates[1])
+        
+        match = self._duration_re.search(user_message)
+        if match:
+            entities['duration'] = int(match.group(1)) * self._duration_days[match.group(2).lower()]
+        elif dateparser is not None and len(dates) > 1:
+            departure, return_ = dateparser.parse(dates[0]), dateparser.parse(dates[1])
+            if departure and return_ and return_ > departure:
+                entities['duration'] = (return_ - departure).days
+        
+        # filter_spans keeps the longest match ("scuba diving", not also "diving")
+        spans = spacy.util.filter_spans(self._activity_matcher(doc, as_spans=True))
+        entities['activities'] = list(dict.fromkeys(span.text.lower() for span in spans))
+        
+        return entities
+    
+    def _parse_date(self, text: str) -> str:
+        """
+        Normalize a date mention to YYYY-MM-DD if dateparser is available.
+        
+        Args:
+            text: Date text (e.g., "March 3rd", "next Friday")
+            
+        Returns:
+            ISO date string, or the original text if it can't be parsed
+        """
+        if dateparser is not None:
+            parsed = dateparser.parse(text, settings={'PREFER_DATES_FROM': 'future'})
+            if parsed:
+                return parsed.date().isoformat()
+        return text
+    
+    def _parse_number(self, text: str) -> Optional[int]:
+        """
+        Convert a cardinal ("3", "three") to an integer.
+        
+        Args:
+            text: Number text
+            
+        Returns:
+            Integer value, or None if not recognized
+        """
+        text = text.strip().lower()
+        if text.isdigit():
+            return int(text)
+        return self._number_words.get(text)
+    
+    def _build_entities_prompt(self, user_message: str) -> str:
+        """
+        Build the LLM prompt for entity extraction.
+        
+        Args:
+            user_message: User's input message
+            
+        Returns:
+            Prompt string
+        """
+        return f"""Extract travel information from this message. Return as JSON:
 
 User message: "{user_message}"
 
@@ -225,40 +840,201 @@ Extract:
 
 Return ONLY valid JSON, use null for missing values:
 {{"destination": "...", "travel_date": "...", "return_date": "...", "duration": ..., "travelers": ..., "activities": [...]}}"""
+    
+    def _parse_entities(self, llm_output: str) -> Dict:
+        """
+        Parse the LLM's JSON entity output.
+        
+        Requests are sent with format='json', so Ollama constrains the output
+        to valid JSON (no markdown fences to strip).
+        
+        Args:
+            llm_output: Raw LLM response text
+            
+        Returns:
+            Dictionary with extracted entities
+        """
+        return _json_loads(llm_output)
+    
+    def _merge_entities(self, entities: Dict, user_id: str) -> Dict:
+        """
+        Merge extracted entities into the user's session.
+        
+        Args:
+            entities: Extracted entities
+            user_id: User identifier
+            
+        Returns:
+            The same entities dictionary
+        """
+        # Update session with extracted entities
+        if user_id in self.sessions:
+            self.sessions[user_id]['entities'].update(entities)
+            self.sessions[user_id]['updated_at'] = datetime.now().isoformat()
+            self._session_json.pop(user_id)
+        
+        return entities
+    
+    def _empty_entities(self) -> Dict:
+        """
+        Entities returned when extraction fails.
+        
+        Returns:
+            Dictionary with all entities unset
+        """
+        return {
+            'destination': None,
+            'travel_date': None,
+            'return_date': None,
+            'duration': None,
+            'travelers': None,
+            'activities': []
+        }
+    
+    def _analyze_message(self, user_message: str, user_id: str) -> Tuple[Dict, Dict]:
+        """
+        Detect intent and extract entities with a single LLM call.
+        
+        The combined prompt is prefilled once and returns {"intent", "entities"}
+        as JSON. If the intent is already known (cache or keywords), only the
+        entities are extracted; if spaCy can extract the entities locally, only
+        the intent goes to the LLM.
+        
+        Args:
+            user_message: User's input message
+            user_id: User identifier
+            
+        Returns:
+            Tuple of (intent result, entities)
+        """
+        intent, cache_key, embedding = self._lookup_intent(user_message)
+        if intent:
+            return (
+                self._record_intent(intent, 'high', user_message, user_id),
+                self.extract_entities(user_message, user_id)
+            )
+        
+        entities = self._extract_entities_local(user_message)
+        if entities is not None:
+            return (
+                self._query_intent_llm(user_message, user_id, cache_key, embedding),
+                self._merge_entities(entities, user_id)
+            )
         
         try:
-            response = ollama.generate(
+            response = self.client.generate(
                 model=self.llm_model,
-                prompt=prompt,
-                options={'temperature': 0.1, 'num_predict': 200}
+                prompt=self._build_analysis_prompt(user_message),
+                format='json',
+                keep_alive=self.KEEP_ALIVE,
+                options={'temperature': 0.1, 'num_predict': 250, 'num_ctx': self.NUM_CTX}
             )
+            return self._parse_analysis(response['response'], user_message, user_id, cache_key, embedding)
+        except Exception:
+            return self._fallback_intent(user_message), self._empty_entities()
+    
+    async def _aanalyze_message(self, user_message: str, user_id: str) -> Tuple[Dict, Dict]:
+        """
+        Async version of _analyze_message (uses the async Ollama client).
+        
+        Args:
+            user_message: User's input message
+            user_id: User identifier
             
-            # Parse JSON response
-            response_text = response['response'].strip()
-            # Remove markdown code blocks if present
-            if '```json' in response_text:
-                response_text = response_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in response_text:
-                response_text = response_text.split('```')[1].split('```')[0].strip()
-            
-            entities = json.loads(response_text)
+        Returns:
+            Tuple of (intent result, entities)
+        """
+        intent, cache_key, embedding = await self._alookup_intent(user_message)
+        if intent:
+            return (
+                self._record_intent(intent, 'high', user_message, user_id),
+                await self.aextract_entities(user_message, user_id)
+            )
+        
+        entities = self._extract_entities_local(user_message)
+        if entities is not None:
+            return (
+                await self._aquery_intent_llm(user_message, user_id, cache_key, embedding),
+                self._merge_entities(entities, user_id)
+            )
+        
+        try:
+            response = await self.async_client.generate(
+                model=self.llm_model,
+                prompt=self._build_analysis_prompt(user_message),
+                format='json',
+                keep_alive=self.KEEP_ALIVE,
+                options={'temperature': 0.1, 'num_predict': 250, 'num_ctx': self.NUM_CTX}
+            )
+            return self._parse_analysis(response['response'], user_message, user_id, cache_key, embedding)
+        except Exception:
+            return self._fallback_intent(user_message), self._empty_entities()
+    
+    def _build_analysis_prompt(self, user_message: str) -> str:
+        """
+        Build the combined intent + entity extraction prompt.
+        
+        Args:
+            user_message: User's input message
             
-            # Update session with extracted entities
-            if user_id in self.sessions:
-                self.sessions[user_id]['entities'].update(entities)
-                self.sessions[user_id]['updated_at'] = datetime.now().isoformat()
+        Returns:
+            Prompt string
+        """
+        return f"""Analyze this travel insurance message. Return as JSON with keys "intent" and "entities":
+
+User message: "{user_message}"
+
+intent - choose ONE:
+- get_quote: wants an insurance quote (quote, price, cost, buy, purchase)
+- compare_policies: wants to compare insurance plans
+- ask_question: question about coverage (does it cover, what about, can i)
+- check_eligibility: whether insurance covers a country (eligible, available in)
+- make_claim: wants to make a claim (claim, file claim, reimbursement)
+- learn_coverage: wants to learn what's covered (what covers, explain, tell me about)
+
+entities:
+- destination: Country or city (if mentioned)
+- travel_date: Departure date (if mentioned)
+- return_date: Return date (if mentioned)
+- duration: Trip duration in days (if mentioned or can be calculated)
+- travelers: Number of travelers (if mentioned)
+- activities: Activities mentioned (e.g., "skiing", "scuba diving")
+
+Return ONLY valid JSON, use null for missing values:
+{{"intent": "...", "entities": {{"destination": "...", "travel_date": "...", "return_date": "...", "duration": ..., "travelers": ..., "activities": [...]}}}}"""
+    
+    def _parse_analysis(
+        self,
+        llm_output: str,
+        user_message: str,
+        user_id: str,
+        cache_key: str,
+        embedding
+    ) -> Tuple[Dict, Dict]:
+        """
+        Parse the combined analysis output, cache it, and update the session.
+        
+        Args:
+            llm_output: Raw LLM response text
+            user_message: User's input message
+            user_id: User identifier
+            cache_key: Normalized message (from _lookup_intent)
+            embedding: Message embedding (from _lookup_intent)
             
-            return entities
-        except Exception as e:
-            # Return empty entities if extraction fails
-            return {
-                'destination': None,
-                'travel_date': None,
-                'return_date': None,
-                'duration': None,
-                'travelers': None,
-                'activities': []
-            }
+        Returns:
+            Tuple of (intent result, entities)
+        """
+        analysis = self._parse_entities(llm_output)
+        
+        intent_result = self._resolve_intent(str(analysis.get('intent') or ''), user_message, user_id)
+        self._remember_intent(cache_key, embedding, intent_result['intent'])
+        
+        entities = analysis.get('entities')
+        if not isinstance(entities, dict):
+            entities = self._empty_entities()
+        self._entity_cache.put(cache_key, dict(entities))
+        
+        return intent_result, self._merge_entities(entities, user_id)
     
     def generate_response(
         self, 
@@ -280,75 +1056,274 @@ Return ONLY valid JSON, use null for missing values:
             Dictionary with bot response, suggestions, and metadata
         """
         # Get or create session
-        if user_id not in self.sessions:
+        session = self.sessions.get(user_id)
+        if session is None:
             self.start_conversation(user_id)
+            session = self.sessions[user_id]
         
-        session = self.sessions[user_id]
-        
-        # Detect intent
-        intent_result = self.detect_intent(user_message, user_id)
+        # Detect intent and extract entities (one LLM call)
+        intent_result, entities = self._analyze_message(user_message, user_id)
         intent = intent_result['intent']
         
-        # Extract entities
-        entities = self.extract_entities(user_message, user_id)
-        
         # Get persona info
         persona = self.personas.get(session['persona'], self.personas['travel_guru'])
         
         # Handle different intents
+        response = self._handle_intent(intent, user_message, session, persona, use_qa_system)
+        
+        if response is None:
+            # Generate general conversational response (cached per exact prompt)
+            prompt = self._build_response_prompt(session, persona, user_message)
+            response = self._response_cache.get(prompt)
+            if response is None:
+                try:
+                    llm_response = self.client.generate(
+                        model=self.llm_model,
+                        prompt=prompt,
+                        keep_alive=self.KEEP_ALIVE,
+                        options=self._response_options[persona['name']]
+                    )
+                    response = llm_response['response'].strip()
+                    self._response_cache.put(prompt, response)
+                except:
+                    response = "I'm here to help! Could you tell me more about what you need?"
+        
+        return self._finish_turn(session, user_message, response, intent, entities, persona)
+    
+    async def agenerate_response(
+        self, 
+        user_message: str, 
+        user_id: str,
+        use_qa_system: bool = True
+    ) -> Dict:
+        """
+        Async version of generate_response.
+        
+        Intent detection and entity extraction share one LLM call, and the
+        blocking Q&A lookup runs in a worker thread.
+        
+        Args:
+            user_message: User's input message
+            user_id: User identifier
+            use_qa_system: Whether to use Q&A system for policy questions
+            
+        Returns:
+            Dictionary with bot response, suggestions, and metadata
+        """
+        # One turn at a time per user: turns read and update the same session
+        lock = self._session_locks.get(user_id)
+        if lock is None:
+            lock = self._session_locks[user_id] = asyncio.Lock()
+        
+        async with lock:
+            # Get or create session
+            session = self.sessions.get(user_id)
+            if session is None:
+                self.start_conversation(user_id)
+                session = self.sessions[user_id]
+            
+            # Detect intent and extract entities (one LLM call)
+            intent_result, entities = await self._aanalyze_message(user_message, user_id)
+            intent = intent_result['intent']
+            
+            # Get persona info
+            persona = self.personas.get(session['persona'], self.personas['travel_guru'])
+            
+            # Handle different intents (Q&A system is blocking, so run it in a thread)
+            response = await asyncio.to_thread(
+                self._handle_intent, intent, user_message, session, persona, use_qa_system
+            )
+            
+            if response is None:
+                # Generate general conversational response (cached per exact prompt)
+                prompt = self._build_response_prompt(session, persona, user_message)
+                response = self._response_cache.get(prompt)
+                if response is None:
+                    try:
+                        llm_response = await self.async_client.generate(
+                            model=self.llm_model,
+                            prompt=prompt,
+                            keep_alive=self.KEEP_ALIVE,
+                            options=self._response_options[persona['name']]
+                        )
+                        response = llm_response['response'].strip()
+                        self._response_cache.put(prompt, response)
+                    except:
+                        response = "I'm here to help! Could you tell me more about what you need?"
+            
+            return self._finish_turn(session, user_message, response, intent, entities, persona)
+    
+    async def agenerate_response_stream(
+        self,
+        user_message: str,
+        user_id: str,
+        use_qa_system: bool = True
+    ) -> AsyncIterator[Dict]:
+        """
+        Streaming version of agenerate_response.
+        
+        Free-form LLM replies are yielded token by token as Ollama produces
+        them, so the client can render from the first token instead of
+        waiting for the full reply. Other intents yield their response once.
+        
+        Args:
+            user_message: User's input message
+            user_id: User identifier
+            use_qa_system: Whether to use Q&A system for policy questions
+            
+        Yields:
+            {'type': 'token', 'content': str} for each piece of the reply, then
+            {'type': 'done', ...} with the same fields as agenerate_response
+        """
+        lock = self._session_locks.get(user_id)
+        if lock is None:
+            lock = self._session_locks[user_id] = asyncio.Lock()
+        
+        async with lock:
+            # Get or create session
+            session = self.sessions.get(user_id)
+            if session is None:
+                self.start_conversation(user_id)
+                session = self.sessions[user_id]
+            
+            # Detect intent and extract entities (one LLM call)
+            intent_result, entities = await self._aanalyze_message(user_message, user_id)
+            intent = intent_result['intent']
+            
+            # Get persona info
+            persona = self.personas.get(session['persona'], self.personas['travel_guru'])
+            
+            response = await asyncio.to_thread(
+                self._handle_intent, intent, user_message, session, persona, use_qa_system
+            )
+            
+            if response is None:
+                prompt = self._build_response_prompt(session, persona, user_message)
+                response = self._response_cache.get(prompt)
+                if response is None:
+                    # Stream the reply, buffering it for the session history
+                    parts = []
+                    try:
+                        async for chunk in await self.async_client.generate(
+                            model=self.llm_model,
+                            prompt=prompt,
+                            stream=True,
+                            keep_alive=self.KEEP_ALIVE,
+                            options=self._response_options[persona['name']]
+                        ):
+                            if chunk['response']:
+                                parts.append(chunk['response'])
+                                yield {'type': 'token', 'content': chunk['response']}
+                        response = ''.join(parts).strip()
+                        self._response_cache.put(prompt, response)
+                    except Exception:
+                        if not parts:
+                            response = "I'm here to help! Could you tell me more about what you need?"
+                            yield {'type': 'token', 'content': response}
+                        else:
+                            response = ''.join(parts).strip()
+                else:
+                    yield {'type': 'token', 'content': response}
+            else:
+                yield {'type': 'token', 'content': response}
+            
+            yield {'type': 'done', **self._finish_turn(session, user_message, response, intent, entities, persona)}
+    
+    def _handle_intent(
+        self,
+        intent: str,
+        user_message: str,
+        session: Dict,
+        persona: Dict,
+        use_qa_system: bool
+    ) -> Optional[str]:
+        """
+        Build the response for intents that don't need a free-form LLM reply.
+        
+        Args:
+            intent: Detected intent
+            user_message: User's input message
+            session: User session dictionary
+            persona: Persona information
+            use_qa_system: Whether to use Q&A system for policy questions
+            
+        Returns:
+            Response string, or None if a general conversational response is needed
+        """
         if intent == 'ask_question' and use_qa_system and self.qa_system:
             # Use Q&A system for policy questions
             qa_result = self.qa_system.answer_question(user_message)
             response = qa_result['answer']
             
             # Make it more conversational
-            response = self._make_conversational(response, persona)
-            
+            return self._make_conversational(response, persona)
+        
         elif intent == 'get_quote':
             # Guide user through quote process
             missing_info = self._check_missing_quote_info(session['entities'])
             
             if missing_info:
-                response = self._generate_quote_question(missing_info[0], persona)
+                return self._generate_quote_question(missing_info[0], persona)
             else:
-                response = "Great! I have all the info I need. Let me find the best policies for you..."
+                return "Great! I have all the info I need. Let me find the best policies for you..."
                 # (In production, call quote generation service)
         
         elif intent == 'compare_policies':
-            response = "I'd be happy to help you compare policies! What would you like to compare? For example, coverage limits, prices, or specific benefits?"
+            return "I'd be happy to help you compare policies! What would you like to compare? For example, coverage limits, prices, or specific benefits?"
         
-        else:
-            # Generate general conversational response
-            context = self._build_context(session, user_message)
-            prompt = f"""You are a {persona['tone']} travel insurance assistant. {persona['name']} {persona['emoji']}
-
-Conversation context:
-{context}
-
-User message: "{user_message}"
-
-Respond in a {persona['tone']} way. Be helpful, concise, and friendly. Ask follow-up questions if needed to help the user.
-
-Response:"""
+        return None
+    
+    def _build_response_prompt(self, session: Dict, persona: Dict, user_message: str) -> str:
+        """
+        Build the LLM prompt for a general conversational response.
+        
+        Args:
+            session: User session dictionary
+            persona: Persona information
+            user_message: User's input message
             
-            try:
-                llm_response = ollama.generate(
-                    model=self.llm_model,
-                    prompt=prompt,
-                    options={'temperature': 0.7, 'num_predict': 300}
-                )
-                response = llm_response['response'].strip()
-            except:
-                response = "I'm here to help! Could you tell me more about what you need?"
+        Returns:
+            Prompt string
+        """
+        context = self._build_context(session, user_message)
+        return self._response_prefixes[persona['name']] + self._response_suffix.substitute(
+            context=context, message=user_message
+        )
+    
+    def _finish_turn(
+        self,
+        session: Dict,
+        user_message: str,
+        response: str,
+        intent: str,
+        entities: Dict,
+        persona: Dict
+    ) -> Dict:
+        """
+        Record the turn in the session history and build the API response.
         
+        Args:
+            session: User session dictionary
+            user_message: User's input message
+            response: Bot response text
+            intent: Detected intent
+            entities: Extracted entities
+            persona: Persona information
+            
+        Returns:
+            Dictionary with bot response, suggestions, and metadata
+        """
         # Update conversation history
+        timestamp = datetime.now().isoformat()
         session['conversation_history'].append({
             'user': user_message,
             'bot': response,
             'intent': intent,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp
         })
-        session['updated_at'] = datetime.now().isoformat()
+        session['recent_context'].append(f"User: {user_message}\nBot: {response}")
+        session['updated_at'] = timestamp
+        self._session_json.pop(session['user_id'])
         
         # Generate suggestions based on intent
         suggestions = self._generate_suggestions(intent, session)
@@ -414,33 +1389,10 @@ Response:"""
         Returns:
             Natural question string
         """
-        questions = {
-            'destination': {
-                'travel_guru': "Where are you planning to go? 🌍",
-                'advisor': "Which country or region will you be traveling to?",
-                'companion': "Tell me your destination and I'll find the perfect coverage!"
-            },
-            'travel_date': {
-                'travel_guru': "When does your adventure begin? 📅",
-                'advisor': "What is your departure date?",
-                'companion': "When are you planning to leave?"
-            },
-            'duration': {
-                'travel_guru': "How long will you be away? 🗓️",
-                'advisor': "What is the duration of your trip?",
-                'companion': "How many days will you be traveling?"
-            },
-            'travelers': {
-                'travel_guru': "How many travelers? (Including yourself!) 👥",
-                'advisor': "How many people will be covered under this policy?",
-                'companion': "Just yourself or traveling with others?"
-            }
-        }
-        
-        field_questions = questions.get(missing_field, {})
-        return field_questions.get(persona['name'].lower().replace(' ', '_'), 
-                                  field_questions.get('travel_guru', 
-                                  f"Could you provide your {missing_field}?"))
+        question = _QUOTE_QUESTIONS.get((missing_field, persona['key']))
+        if question is None:
+            question = _QUOTE_QUESTIONS.get((missing_field, 'travel_guru'), f"Could you provide your {missing_field}?")
+        return question
     
     def _build_context(self, session: Dict, current_message: str) -> str:
         """
@@ -459,20 +1411,16 @@ Response:"""
         entities = session.get('entities', {})
         if entities:
             context_parts.append("Information gathered so far:")
-            if entities.get('destination'):
-                context_parts.append(f"- Destination: {entities['destination']}")
-            if entities.get('travel_date'):
-                context_parts.append(f"- Travel date: {entities['travel_date']}")
-            if entities.get('travelers'):
-                context_parts.append(f"- Travelers: {entities['travelers']}")
-        
-        # Add recent conversation history
-        history = session.get('conversation_history', [])
-        if history:
+            context_parts.extend(
+                f"- {label}: {entities[key]}"
+                for key, label in self._context_entity_fields if entities.get(key)
+            )
+        
+        # Add recent conversation history (last 3 exchanges, formatted when recorded)
+        recent = session.get('recent_context')
+        if recent:
             context_parts.append("\nRecent conversation:")
-            for entry in history[-3:]:  # Last 3 exchanges
-                context_parts.append(f"User: {entry['user']}")
-                context_parts.append(f"Bot: {entry['bot']}")
+            context_parts.extend(recent)
         
         return "\n".join(context_parts) if context_parts else "New conversation"
     
@@ -487,16 +1435,7 @@ Response:"""
         Returns:
             List of suggestion strings
         """
-        suggestions_map = {
-            'get_quote': ["Tell me more about coverage", "Compare with other plans"],
-            'compare_policies': ["Show me prices", "What's the difference?"],
-            'ask_question': ["Get a quote", "Compare policies"],
-            'check_eligibility': ["Ask another question", "Get a quote"],
-            'make_claim': ["File a claim", "Check claim status"],
-            'learn_coverage': ["Get a quote", "Compare policies"]
-        }
-        
-        return suggestions_map.get(intent, ["How can I help?"])
+        return list(_SUGGESTIONS_MAP.get(intent, _DEFAULT_SUGGESTIONS))
     
     def get_session(self, user_id: str) -> Optional[Dict]:
         """
@@ -506,9 +1445,39 @@ Response:"""
             user_id: User identifier
             
         Returns:
-            Session dictionary or None
+            Session dictionary (JSON-serializable copy) or None
+        """
+        session = self.sessions.get(user_id)
+        if session is None:
+            return None
+        copy = {**session, 'conversation_history': list(session['conversation_history'])}
+        copy.pop('recent_context', None)  # Internal prompt cache, duplicates the history
+        return copy
+    
+    def get_session_json(self, user_id: str) -> Optional[bytes]:
+        """
+        Get user session information, serialized as JSON.
+        
+        The JSON is kept until the session changes, so polling a session
+        doesn't copy and serialize its whole history every time.
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            get_session() result as UTF-8 JSON, or None
         """
-        return self.sessions.get(user_id)
+        session = self.sessions.get(user_id)
+        if session is None:
+            self._session_json.pop(user_id)
+            return None
+        cached = self._session_json.get(user_id)
+        # A restarted conversation is a new session dict
+        if cached is not None and cached[0] is session:
+            return cached[1]
+        body = _json_dumps(self.get_session(user_id))
+        self._session_json.put(user_id, (session, body))
+        return body
     
     def update_persona(self, user_id: str, persona: str) -> bool:
         """
@@ -523,6 +1492,7 @@ Response:"""
         """
         if user_id in self.sessions and persona in self.personas:
             self.sessions[user_id]['persona'] = persona
+            self._session_json.pop(user_id)
             return True
         return False
 
@@ -6,13 +6,56 @@ and checks country eligibility for each policy.
 """
 
 import os
-from typing import List, Dict, Optional
+import sys
+import atexit
+import logging
+import logging.handlers
+import queue
+from typing import Callable, List, Dict, Optional
 from pathlib import Path
 from .pipeline import PolicyPipeline
-from .vector_store import VectorStore
+from .vector_store import create_vector_store
 from .rag_qa import PolicyQASystem
 from .country_eligibility import CountryEligibilityChecker
+import asyncio
+import hashlib
 import json
+import shelve
+
+# Optional: orjson serializes straight to UTF-8 bytes in C (faster, no pure-Python
+# indenting encoder, no intermediate str)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+_log_listener = None
+
+
+def _enable_queued_logging() -> None:
+    """
+    Write this module's progress messages from a background thread.
+    
+    Records go onto a queue and a QueueListener writes them to stderr, so a
+    slow console or log file never stalls the per-file loop. Skipped if the
+    application has configured logging itself.
+    """
+    global _log_listener
+    if _log_listener is not None or logger.handlers or logging.getLogger().handlers:
+        return
+    
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)  # Flush remaining messages on exit
+    
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
 
 
 class BatchPolicyProcessor:
@@ -21,11 +64,23 @@ class BatchPolicyProcessor:
     
     Workflow:
     1. Load all PDFs from a directory
-    2. Process each PDF (extract, chunk, embed, store)
+    2. Extract and chunk each PDF (in parallel), then embed and store all chunks in one batch
     3. Analyze each policy for country eligibility
     4. Generate comprehensive report
+    
+    Policy summaries and country checks are cached on disk, keyed by the PDF's
+    content hash, so unchanged policies skip their LLM calls on re-runs.
     """
     
+    # Bump when the summary questions or eligibility prompts change
+    CACHE_VERSION = "v1"
+    
+    # Summary answer for a question that raised
+    UNAVAILABLE_ANSWER = "Information not available"
+    
+    # Maximum concurrent Ollama requests per policy
+    MAX_CONCURRENT_LLM_CALLS = 4
+    
     def __init__(self, db_path: str = "./chroma_db", llm_model: str = "llama3"):
         """
         Initialize the batch processor.
@@ -34,14 +89,20 @@ class BatchPolicyProcessor:
             db_path: Path to ChromaDB database
             llm_model: Ollama model to use
         """
+        _enable_queued_logging()
+        
         # Initialize components
-        self.vector_store = VectorStore(db_path=db_path)
+        self.vector_store = create_vector_store(db_path=db_path)
         self.pipeline = PolicyPipeline(self.vector_store)
         self.qa_system = PolicyQASystem(self.vector_store, llm_model=llm_model)
         self.country_checker = CountryEligibilityChecker(self.vector_store, self.qa_system)
+        
+        # Load the model once up front and keep it loaded for the whole batch
+        self.qa_system.warmup()
         self.llm_model = llm_model
+        self.cache_path = os.path.join(db_path, "analysis_cache")
         
-        print(f"✓ Batch processor initialized with model: {llm_model}")
+        logger.info(f"✓ Batch processor initialized with model: {llm_model}")
     
     def process_batch(
         self, 
@@ -70,9 +131,9 @@ class BatchPolicyProcessor:
                 'files_found': 0
             }
         
-        print(f"\n{'='*60}")
-        print(f"Batch Processing: {len(pdf_files)} PDFs found")
-        print(f"{'='*60}\n")
+        logger.info(f"\n{'='*60}")
+        logger.info(f"Batch Processing: {len(pdf_files)} PDFs found")
+        logger.info(f"{'='*60}\n")
         
         results = {
             'total_files': len(pdf_files),
@@ -82,38 +143,99 @@ class BatchPolicyProcessor:
             'country_eligibility': {}
         }
         
-        # Process each PDF
-        for i, pdf_file in enumerate(pdf_files, 1):
-            print(f"[{i}/{len(pdf_files)}] Processing: {pdf_file.name}")
-            
+        # Phase 1: Extract and chunk every new or changed PDF (nothing stored yet)
+        # Extraction/OCR runs in parallel worker processes; PDFs already indexed
+        # with the same content hash are skipped
+        policy_names = []
+        doc_hashes = []
+        indexed_counts = []
+        for pdf_file in pdf_files:
             # Generate policy name from filename
             policy_name = policy_name_prefix + "_" + Path(pdf_file).stem if policy_name_prefix else Path(pdf_file).stem
             policy_name = policy_name.replace("_", " ").title()  # Clean up name
+            policy_names.append(policy_name)
             
-            try:
-                # Step 1: Process document (extract, chunk, embed, store)
-                process_result = self.pipeline.process_document(str(pdf_file), policy_name)
-                
-                print(f"  ✓ Processed: {process_result['chunks_count']} chunks created")
-                
-                results['processed_files'].append({
+            doc_hash = self._file_hash(pdf_file)
+            doc_hashes.append(doc_hash)
+            indexed_counts.append(self.vector_store.count_chunks(policy_name, file_hash=doc_hash))
+        
+        to_extract = [i for i, count in enumerate(indexed_counts) if not count]
+        chunk_results = {}
+        if to_extract:
+            chunk_results = dict(zip(to_extract, self.pipeline.extract_and_chunk_many(
+                [str(pdf_files[i]) for i in to_extract],
+                [policy_names[i] for i in to_extract]
+            )))
+        
+        extracted = []  # (pdf_file, policy_name, doc_hash, chunks, stats); chunks is None if already indexed
+        for i, pdf_file in enumerate(pdf_files):
+            logger.info(f"[{i + 1}/{len(pdf_files)}] Processed: {pdf_file.name}")
+            
+            if indexed_counts[i]:
+                logger.info("  ✓ Already indexed (unchanged), skipping extraction")
+                extracted.append((pdf_file, policy_names[i], doc_hashes[i], None, {'chunks_count': indexed_counts[i]}))
+                continue
+            
+            chunk_result = chunk_results[i]
+            if 'error' in chunk_result:
+                logger.error(f"  ✗ Error: {chunk_result['error']}\n")
+                results['failed_files'].append({
                     'file': pdf_file.name,
-                    'policy_name': policy_name,
-                    'chunks': process_result['chunks_count'],
-                    'pages': process_result.get('pages', 'N/A')
+                    'error': chunk_result['error']
                 })
+            else:
+                # Tag chunks with the file hash so an unchanged file is recognized next run
+                for chunk in chunk_result['chunks']:
+                    chunk['file_hash'] = doc_hashes[i]
+                extracted.append((pdf_file, chunk_result['policy_name'], doc_hashes[i], chunk_result['chunks'], chunk_result['stats']))
+        
+        # Phase 2: Embed and store all new chunks in one batch
+        # (one embedding pass and a few large ChromaDB writes instead of one per PDF)
+        new_documents = [item for item in extracted if item[3] is not None]
+        if new_documents:
+            try:
+                # Changed files: drop the chunks of the previous version first
+                for _, policy_name, _, _, _ in new_documents:
+                    if self.vector_store.count_chunks(policy_name):
+                        self.vector_store.delete_policy(policy_name)
                 
-                # Step 2: Extract key information about the policy
-                policy_info = self._extract_policy_summary(policy_name)
+                self.pipeline.bulk_store([(chunks, policy_name) for _, policy_name, _, chunks, _ in new_documents])
+                # Cached answers were generated from the old excerpts
+                self.qa_system.clear_answer_cache()
+            except Exception as e:
+                logger.error(f"  ✗ Error storing chunks: {str(e)}\n")
+                for pdf_file, _, _, _, _ in new_documents:
+                    results['failed_files'].append({
+                        'file': pdf_file.name,
+                        'error': f"Storage failed: {str(e)}"
+                    })
+                extracted = [item for item in extracted if item[3] is None]
+        
+        # Phase 3: Analyze each stored policy
+        # (summaries and country checks of unchanged files come from the cache)
+        for pdf_file, policy_name, doc_hash, chunks, process_result in extracted:
+            logger.info(f"Analyzing: {policy_name}")
+            if chunks is None:
+                logger.info(f"  ✓ Already indexed: {process_result['chunks_count']} chunks")
+            else:
+                logger.info(f"  ✓ Processed: {process_result['chunks_count']} chunks created")
+            
+            results['processed_files'].append({
+                'file': pdf_file.name,
+                'policy_name': policy_name,
+                'chunks': process_result['chunks_count'],
+                'pages': process_result.get('pages', 'N/A')
+            })
+            
+            try:
+                # Extract key information about the policy
+                policy_info = self._extract_policy_summary(policy_name, doc_hash)
                 
-                # Step 3: Check country eligibility if countries provided
+                # Check country eligibility if countries provided
                 country_eligibility = None
                 if countries_to_check:
-                    print(f"  Checking country eligibility...")
-                    country_eligibility = self.country_checker.check_multiple_countries(
-                        policy_name, 
-                        countries_to_check
-                    )
+                    logger.info("  Checking country eligibility...")
+                    country_eligibility = self._check_countries(policy_name, doc_hash, countries_to_check)
                 
                 # Store results
                 results['policies'][policy_name] = {
@@ -125,10 +247,10 @@ class BatchPolicyProcessor:
                 if country_eligibility:
                     results['country_eligibility'][policy_name] = country_eligibility
                 
-                print(f"  ✓ Completed\n")
+                logger.info("  ✓ Completed\n")
                 
             except Exception as e:
-                print(f"  ✗ Error: {str(e)}\n")
+                logger.error(f"  ✗ Error: {str(e)}\n")
                 results['failed_files'].append({
                     'file': pdf_file.name,
                     'error': str(e)
@@ -139,16 +261,123 @@ class BatchPolicyProcessor:
         
         return results
     
-    def _extract_policy_summary(self, policy_name: str) -> Dict:
+    def _file_hash(self, file_path) -> str:
+        """
+        Hash a file's contents.
+        
+        Args:
+            file_path: Path to the file
+            
+        Returns:
+            Hex SHA-256 digest
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _cache_key(self, key: str) -> str:
+        """
+        Qualify a cache key with the LLM model and prompt version.
+        
+        Args:
+            key: Base key (should include the document hash)
+            
+        Returns:
+            Full cache key
+        """
+        return f"{key}:{self.llm_model}:{self.CACHE_VERSION}"
+    
+    def _cached(self, key: str, compute: Callable[[], Dict],
+                cacheable: Optional[Callable[[Dict], bool]] = None) -> Dict:
+        """
+        Return a result from the on-disk cache, computing and storing it on a miss.
+        
+        Args:
+            key: Cache key (should include the document hash)
+            compute: Function producing the result
+            cacheable: Optional check of a fresh result; results failing it
+                (e.g. built from LLM errors) are returned but not stored
+            
+        Returns:
+            Cached or freshly computed result
+        """
+        key = self._cache_key(key)
+        with shelve.open(self.cache_path) as cache:
+            if key in cache:
+                return cache[key]
+        
+        result = compute()
+        if cacheable is None or cacheable(result):
+            with shelve.open(self.cache_path) as cache:
+                cache[key] = result
+        return result
+    
+    def _check_countries(self, policy_name: str, doc_hash: str, countries: List[str]) -> Dict:
+        """
+        Check country eligibility, reusing cached per-country results.
+        
+        Only countries without a cached result are sent to the checker
+        (in one grid call).
+        
+        Args:
+            policy_name: Name of the policy
+            doc_hash: Content hash of the policy PDF
+            countries: Countries to check
+            
+        Returns:
+            Same structure as CountryEligibilityChecker.check_multiple_countries
+        """
+        keys = {
+            country: self._cache_key(
+                f"{doc_hash}:{policy_name}:country:{self.country_checker._normalize_country_name(country).lower()}"
+            )
+            for country in countries
+        }
+        
+        results = {}
+        with shelve.open(self.cache_path) as cache:
+            for country, key in keys.items():
+                if key in cache:
+                    results[country] = cache[key]
+        
+        missing = [country for country in countries if country not in results]
+        if missing:
+            checked = self.country_checker.check_multiple_countries(policy_name, missing)['results']
+            with shelve.open(self.cache_path) as cache:
+                for country in missing:
+                    results[country] = checked[country]
+                    # Verdicts from a failed LLM call are retried next run
+                    if not checked[country]['details'].startswith(self.country_checker.ERROR_PREFIX):
+                        cache[keys[country]] = checked[country]
+        
+        results = {country: results[country] for country in countries}
+        return {
+            'policy_name': policy_name,
+            'countries_checked': countries,
+            'results': results,
+            'summary': self.country_checker._generate_country_summary(results)
+        }
+    
+    def _extract_policy_summary(self, policy_name: str, doc_hash: Optional[str] = None) -> Dict:
         """
         Extract key information about a policy.
         
         Args:
             policy_name: Name of the policy
+            doc_hash: Optional content hash of the policy PDF (enables the on-disk cache)
             
         Returns:
             Dictionary with policy summary information
         """
+        if doc_hash:
+            return self._cached(
+                f"{doc_hash}:{policy_name}:summary",
+                lambda: self._extract_policy_summary(policy_name),
+                cacheable=self._summary_is_complete
+            )
+        
         # Ask key questions about the policy
         questions = {
             "coverage_type": "What type of insurance does this policy provide? (travel, health, etc.)",
@@ -158,20 +387,60 @@ class BatchPolicyProcessor:
             "duration": "What is the policy duration or validity period?"
         }
         
-        summary = {}
-        for key, question in questions.items():
-            try:
-                result = self.qa_system.answer_question(
+        # Ask all questions concurrently (Ollama serves them in parallel)
+        return asyncio.run(self._ask_summary_questions(policy_name, questions))
+    
+    async def _ask_summary_questions(self, policy_name: str, questions: Dict[str, str]) -> Dict:
+        """
+        Answer the summary questions concurrently.
+        
+        Args:
+            policy_name: Name of the policy
+            questions: Dictionary of summary key -> question
+            
+        Returns:
+            Dictionary of summary key -> answer
+        """
+        # Cap in-flight requests so Ollama isn't flooded
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_LLM_CALLS)
+        
+        async def ask(question: str) -> Dict:
+            async with semaphore:
+                return await self.qa_system.answer_question_async(
                     question=question,
                     policy_filter=policy_name,
                     include_citations=False
                 )
+        
+        answers = await asyncio.gather(
+            *(ask(question) for question in questions.values()),
+            return_exceptions=True
+        )
+        
+        summary = {}
+        for key, result in zip(questions, answers):
+            if isinstance(result, BaseException):
+                summary[key] = self.UNAVAILABLE_ANSWER
+            else:
                 summary[key] = result['answer']
-            except:
-                summary[key] = "Information not available"
         
         return summary
     
+    def _summary_is_complete(self, summary: Dict) -> bool:
+        """
+        Check that no summary answer is an LLM-failure fallback (those aren't cached).
+        
+        Args:
+            summary: Dictionary of summary key -> answer
+            
+        Returns:
+            True if every answer came from the LLM
+        """
+        return not any(
+            answer == self.UNAVAILABLE_ANSWER or answer.startswith(self.qa_system.FALLBACK_PREFIX)
+            for answer in summary.values()
+        )
+    
     def _generate_summary_report(self, results: Dict) -> str:
         """
         Generate a human-readable summary report.
@@ -236,16 +505,19 @@ Processed Policies:
             if policy_data.get('country_eligibility'):
                 exportable_results['policies'][policy_name]['country_eligibility'] = policy_data['country_eligibility']
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(exportable_results, f, indent=2, ensure_ascii=False)
+        if orjson is not None:
+            # UTF-8 output without escaping, same as ensure_ascii=False
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(exportable_results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(exportable_results, f, indent=2, ensure_ascii=False)
         
-        print(f"\n✓ Results exported to: {output_file}")
+        logger.info(f"\n✓ Results exported to: {output_file}")
 
 
 # Command-line usage
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) < 2:
         print("Usage: python batch_processor.py <pdf_directory> [countries...]")
         print("\nExample:")
@@ -255,6 +527,9 @@ if __name__ == "__main__":
         print("  2. Check eligibility for Singapore, Malaysia, Thailand")
         sys.exit(1)
     
+    # Block-buffer the final report (progress goes through the log queue)
+    sys.stdout.reconfigure(line_buffering=False)
+    
     pdf_dir = sys.argv[1]
     countries = sys.argv[2:] if len(sys.argv) > 2 else None
     
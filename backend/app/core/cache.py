@@ -0,0 +1,453 @@
+"""
+Caching Utilities
+=================
+Small in-process caches used to skip repeated LLM and embedding work.
+
+- LRUCache: exact-match cache with least-recently-used eviction
+- TTLCache: dict-like store whose entries expire when idle (e.g. sessions)
+- SemanticCache: nearest-neighbour cache over text embeddings
+  (near-duplicate inputs reuse a previous result)
+- EmbeddingCache: persistent (SQLite) text -> embedding cache, so unchanged
+  text is never re-embedded across runs
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import numpy as np
+
+
+class LRUCache:
+    """
+    Thread-safe exact-match cache with a fixed maximum size.
+    
+    When full, the least recently used entry is evicted.
+    """
+    
+    def __init__(self, maxsize: int = 4096):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries to keep
+        """
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value and mark it as recently used.
+        
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+        
+        Returns:
+            Cached value, or default if not cached
+        """
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+                return self._data[key]
+            except KeyError:
+                return default
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry if full.
+        
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove an entry.
+        
+        Args:
+            key: Cache key
+            default: Value returned if the key is not cached
+        
+        Returns:
+            Removed value, or default
+        """
+        with self._lock:
+            return self._data.pop(key, default)
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+    
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache:
+    """
+    Thread-safe dict-like store with idle expiry and a maximum size.
+    
+    Each read or write pushes an entry's expiry back by ttl seconds, so
+    entries are kept in access order and the stale ones are always at the
+    front, where they're dropped in O(1) on insert.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0):
+        """
+        Initialize the store.
+        
+        Args:
+            maxsize: Maximum number of entries (least recently used are evicted)
+            ttl: Seconds an entry lives without being accessed
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+    
+    def __getitem__(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            value, expires_at = self._data[key]
+            if expires_at <= now:
+                del self._data[key]
+                raise KeyError(key)
+            self._data[key] = (value, now + self.ttl)
+            self._data.move_to_end(key)
+            return value
+    
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (value, now + self.ttl)
+            self._data.move_to_end(key)
+            # Drop expired entries and overflow from the least recently used end
+            while self._data:
+                oldest_key, (_, expires_at) = next(iter(self._data.items()))
+                if expires_at > now and len(self._data) <= self.maxsize:
+                    break
+                del self._data[oldest_key]
+    
+    def __delitem__(self, key: Hashable) -> None:
+        with self._lock:
+            del self._data[key]
+    
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a value (refreshing its expiry).
+        
+        Args:
+            key: Entry key
+            default: Value returned if missing or expired
+        
+        Returns:
+            Stored value, or default
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove an entry.
+        
+        Args:
+            key: Entry key
+            default: Value returned if the key is not stored
+        
+        Returns:
+            Removed value, or default
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+
+class SemanticCache:
+    """
+    Cache keyed by text meaning instead of exact text.
+    
+    How it works:
+    1. Each cached text is stored as an L2-normalized embedding
+    2. A lookup embeds the new text and finds the most similar cached one
+    3. If cosine similarity is above the threshold, its value is reused
+    
+    Entries live in a preallocated matrix, so a lookup is a single
+    matrix-vector product. When full, the least recently used slot is reused.
+    An optional tag partitions entries (e.g. one partition per policy filter):
+    a lookup only matches entries stored with the same tag.
+    """
+    
+    def __init__(
+        self,
+        embed_fn: Callable[[str], List[float]],
+        threshold: float = 0.95,
+        maxsize: int = 1024
+    ):
+        """
+        Initialize the semantic cache.
+        
+        Args:
+            embed_fn: Function converting text to an embedding vector
+                      (e.g. VectorStore.generate_embedding)
+            threshold: Minimum cosine similarity for a cache hit
+            maxsize: Maximum number of entries (least recently used are overwritten)
+        """
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.maxsize = maxsize
+        
+        self._matrix = None  # Allocated on first insert (dimension unknown until then)
+        self._values = [None] * maxsize
+        self._tags = np.full(maxsize, "", dtype=object)
+        self._last_used = np.zeros(maxsize, dtype=np.int64)
+        self._tick = 0
+        self._count = 0
+        self._lock = threading.Lock()
+    
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed and L2-normalize text for use with get/put.
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            Normalized embedding vector
+        """
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def get(self, embedding: np.ndarray, tag: str = "") -> Optional[Any]:
+        """
+        Find the cached value for the most similar embedding.
+        
+        Args:
+            embedding: Normalized embedding (from embed())
+            tag: Only entries stored with this tag can match
+        
+        Returns:
+            Cached value if similarity >= threshold, else None
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            similarities = self._matrix[:self._count] @ embedding
+            similarities[self._tags[:self._count] != tag] = -np.inf
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                self._tick += 1
+                self._last_used[best] = self._tick
+                return self._values[best]
+        return None
+    
+    def put(self, embedding: np.ndarray, value: Any, tag: str = "") -> None:
+        """
+        Store a value for an embedding.
+        
+        Args:
+            embedding: Normalized embedding (from embed())
+            value: Value to cache
+            tag: Partition the entry belongs to
+        """
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.maxsize, embedding.shape[0]), dtype=np.float32)
+            if self._count < self.maxsize:
+                slot = self._count
+                self._count += 1
+            else:
+                slot = int(np.argmin(self._last_used))  # Least recently used
+            self._tick += 1
+            self._matrix[slot] = embedding
+            self._values[slot] = value
+            self._tags[slot] = tag
+            self._last_used[slot] = self._tick
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._values = [None] * self.maxsize
+            self._tags[:] = ""
+            self._last_used[:] = 0
+            self._count = 0
+    
+    def save(self, path: str) -> None:
+        """
+        Write the cache to disk (so a restart starts warm).
+        
+        Args:
+            path: File path (written atomically, so several processes can save)
+        """
+        with self._lock:
+            state = {
+                'maxsize': self.maxsize,
+                'matrix': self._matrix,
+                'values': self._values,
+                'tags': self._tags,
+                'last_used': self._last_used,
+                'tick': self._tick,
+                'count': self._count
+            }
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+    
+    def load(self, path: str) -> bool:
+        """
+        Restore entries saved with save().
+        
+        Args:
+            path: File path
+        
+        Returns:
+            True if entries were loaded
+        """
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except Exception:
+            return False
+        
+        if state.get('maxsize') != self.maxsize or state.get('matrix') is None:
+            return False
+        
+        with self._lock:
+            self._matrix = state['matrix']
+            self._values = state['values']
+            self._tags = state['tags']
+            self._last_used = state['last_used']
+            self._tick = state['tick']
+            self._count = state['count']
+        return True
+    
+    def __len__(self) -> int:
+        return self._count
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache stored in SQLite.
+    
+    Keyed by (sha256 of the text, model name), so a model change never
+    returns stale vectors. Vectors are stored as raw float32 bytes.
+    """
+    
+    # SQLite limits the number of "?" parameters per statement
+    _QUERY_BATCH = 500
+    
+    def __init__(self, path: str, model_name: str):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            path: SQLite file path
+            model_name: Embedding model name (part of the cache key)
+        """
+        self.model_name = model_name
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "hash TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (hash, model))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """
+        Hash text for use as a cache key.
+        
+        Args:
+            text: Text that was embedded
+        
+        Returns:
+            Hex SHA-256 digest
+        """
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached embeddings.
+        
+        Args:
+            hashes: Text hashes (from text_hash())
+        
+        Returns:
+            Dictionary of hash -> embedding for the hashes that are cached
+        """
+        hashes = list(hashes)
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), self._QUERY_BATCH):
+                batch = hashes[start:start + self._QUERY_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? "
+                    f"AND hash IN ({','.join('?' * len(batch))})",
+                    [self.model_name, *batch]
+                )
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+        return found
+    
+    def put_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        """
+        Store embeddings.
+        
+        Args:
+            vectors: Dictionary of hash -> embedding
+        """
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, model, vector) VALUES (?, ?, ?)",
+                [
+                    (text_hash, self.model_name, np.asarray(vector, dtype=np.float32).tobytes())
+                    for text_hash, vector in vectors.items()
+                ]
+            )
+            self._conn.commit()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model_name,)
+            ).fetchone()[0]
@@ -6,6 +6,12 @@ Supports: PDF, Word (.docx), and scanned documents (with OCR).
 """
 
 import os
+import hashlib
+import json
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 import fitz  # PyMuPDF
 from docx import Document
@@ -13,6 +19,73 @@ import pytesseract
 from PIL import Image
 import io
 
+# Optional: in-process Tesseract API (avoids a tesseract subprocess per page)
+try:
+    from tesserocr import PyTessBaseAPI, PSM
+except ImportError:
+    PyTessBaseAPI = None
+
+# Optional: faster JSON for the extraction cache
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Pages are rendered at 2x (144 DPI) grayscale for OCR: readable for
+# Tesseract, and a third of the bytes of an RGB render
+_OCR_MATRIX = fitz.Matrix(2, 2)
+
+# Rendered pages waiting for or in OCR, per OCR thread (bounds the memory
+# held in pixmaps however many pages are scanned)
+_OCR_PAGES_PER_THREAD = 2
+
+# One Tesseract API per OCR thread (PyTessBaseAPI is not thread-safe)
+_tess_local = threading.local()
+
+# Files read ahead while the current one is parsed (sequential ingestion)
+_PREFETCH_DEPTH = 8
+
+# Bump when extraction output changes, so cached results are not reused
+# (the PyMuPDF version is part of the key as well)
+_EXTRACTION_CACHE_VERSION = "v1"
+
+
+def _read_file(file_path: str) -> bytes:
+    """
+    Read a whole file into memory.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        File contents
+    """
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def _ocr_page(image: tuple) -> str:
+    """
+    OCR one rendered grayscale page.
+    
+    Args:
+        image: (samples, width, height, stride) of a grayscale pixmap
+        
+    Returns:
+        Recognized text
+    """
+    samples, width, height, stride = image
+    
+    if PyTessBaseAPI is not None:
+        api = getattr(_tess_local, 'api', None)
+        if api is None:
+            api = _tess_local.api = PyTessBaseAPI(psm=PSM.AUTO)
+        api.SetImageBytes(samples, width, height, 1, stride)
+        return api.GetUTF8Text()
+    
+    # Fallback: pytesseract (raw pixels wrapped directly, no PNG round trip)
+    return pytesseract.image_to_string(Image.frombytes('L', (width, height), samples, 'raw', 'L', stride))
+
 
 class DocumentIngester:
     """
@@ -20,16 +93,22 @@ class DocumentIngester:
     Each method is clearly explained for easy understanding.
     """
     
-    def __init__(self, use_ocr: bool = True):
+    def __init__(self, use_ocr: bool = True, cache_dir: Optional[str] = None):
         """
         Initialize the document ingester.
         
         Args:
             use_ocr: If True, uses OCR for scanned PDFs when text extraction fails
+            cache_dir: Directory for cached extraction results, keyed by file
+                       content (default: EXTRACTION_CACHE_DIR or ~/.policy_cache;
+                       empty string disables the cache)
         """
         self.use_ocr = use_ocr
+        if cache_dir is None:
+            cache_dir = os.getenv("EXTRACTION_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".policy_cache"))
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
     
-    def extract_from_pdf(self, file_path: str) -> Dict[str, any]:
+    def extract_from_pdf(self, file_path: str, data: Optional[bytes] = None) -> Dict[str, any]:
         """
         Extract text from a PDF file.
         
@@ -41,12 +120,13 @@ class DocumentIngester:
         
         Args:
             file_path: Path to the PDF file
+            data: Optional file contents already read into memory
             
         Returns:
             Dictionary with 'text', 'pages', 'file_name', 'total_pages'
         """
-        # Open the PDF document
-        pdf_document = fitz.open(file_path)
+        # Open the PDF document (from memory if prefetched)
+        pdf_document = fitz.open(stream=data, filetype='pdf') if data is not None else fitz.open(file_path)
         
         # Get file name for reference
         file_name = os.path.basename(file_path)
@@ -55,25 +135,32 @@ class DocumentIngester:
         all_text = []
         total_pages = len(pdf_document)
         
-        # Extract text from each page
-        for page_num in range(total_pages):
-            # Get the page object
-            page = pdf_document[page_num]
-            
-            # Try to extract text directly (works for text-based PDFs)
-            page_text = page.get_text()
-            
-            # If no text found and OCR is enabled, try OCR
-            if not page_text.strip() and self.use_ocr:
-                # Convert page to image for OCR
-                pix = page.get_pixmap()
-                img_bytes = pix.tobytes("png")
-                image = Image.open(io.BytesIO(img_bytes))
-                
-                # Use pytesseract to extract text from image
-                page_text = pytesseract.image_to_string(image)
-            
-            # Store page text with page number
+        # Extract text from each page directly (works for text-based PDFs)
+        page_texts = [page.get_text() for page in pdf_document]
+        
+        # If no text found and OCR is enabled, OCR those pages
+        if self.use_ocr:
+            scanned = [i for i, text in enumerate(page_texts) if not text.strip()]
+            if scanned:
+                # Render pages here (PyMuPDF objects can't be shared), then OCR
+                # in parallel: tesseract runs as a subprocess, so threads suffice
+                # and this also works inside ingestion worker processes.
+                # Pages are rendered as OCR slots free up, so only a few
+                # pixmaps are held at a time
+                workers = os.cpu_count() or 1
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    pending = deque()  # (page index, OCR future), in page order
+                    for i in scanned:
+                        if len(pending) >= workers * _OCR_PAGES_PER_THREAD:
+                            page_num, future = pending.popleft()
+                            page_texts[page_num] = future.result()
+                        pix = pdf_document[i].get_pixmap(matrix=_OCR_MATRIX, colorspace=fitz.csGRAY)
+                        pending.append((i, executor.submit(_ocr_page, (pix.samples, pix.width, pix.height, pix.stride))))
+                    for page_num, future in pending:
+                        page_texts[page_num] = future.result()
+        
+        # Store page text with page number
+        for page_num, page_text in enumerate(page_texts):
             all_text.append({
                 'page_num': page_num + 1,
                 'text': page_text
@@ -82,8 +169,8 @@ class DocumentIngester:
         # Close the PDF
         pdf_document.close()
         
-        # Combine all text into one string
-        full_text = '\n\n'.join([page['text'] for page in all_text])
+        # Combine all text into one string (page_texts is already a list of str)
+        full_text = '\n\n'.join(page_texts)
         
         # Return structured data
         return {
@@ -94,7 +181,7 @@ class DocumentIngester:
             'file_type': 'pdf'
         }
     
-    def extract_from_docx(self, file_path: str) -> Dict[str, any]:
+    def extract_from_docx(self, file_path: str, data: Optional[bytes] = None) -> Dict[str, any]:
         """
         Extract text from a Word document (.docx).
         
@@ -105,12 +192,13 @@ class DocumentIngester:
         
         Args:
             file_path: Path to the .docx file
+            data: Optional file contents already read into memory
             
         Returns:
             Dictionary with 'text', 'paragraphs', 'file_name'
         """
-        # Open the Word document
-        doc = Document(file_path)
+        # Open the Word document (from memory if prefetched)
+        doc = Document(io.BytesIO(data) if data is not None else file_path)
         
         # Get file name
         file_name = os.path.basename(file_path)
@@ -132,56 +220,193 @@ class DocumentIngester:
             'file_type': 'docx'
         }
     
-    def ingest_document(self, file_path: str) -> Dict[str, any]:
+    def ingest_document(self, file_path: str, data: Optional[bytes] = None) -> Dict[str, any]:
         """
         Main method to ingest any supported document type.
         Automatically detects file type and calls appropriate extractor.
         
         Args:
             file_path: Path to the document file
+            data: Optional file contents already read into memory
             
         Returns:
             Dictionary with extracted text and metadata
         """
         # Get file extension to determine type
         file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext not in ('.pdf', '.docx'):
+            raise ValueError(f"Unsupported file type: {file_ext}. Supported: .pdf, .docx")
+        
+        # Same file content seen before: skip extraction (and OCR)
+        cache_path = None
+        if self.cache_dir:
+            if data is None:
+                data = _read_file(file_path)
+            cache_path = self._cache_path(data, file_ext)
+            cached = self._load_cached(cache_path)
+            if cached is not None:
+                cached['file_name'] = os.path.basename(file_path)
+                return cached
         
         # Route to appropriate extractor
         if file_ext == '.pdf':
-            return self.extract_from_pdf(file_path)
-        elif file_ext == '.docx':
-            return self.extract_from_docx(file_path)
+            extracted = self.extract_from_pdf(file_path, data)
         else:
-            raise ValueError(f"Unsupported file type: {file_ext}. Supported: .pdf, .docx")
+            extracted = self.extract_from_docx(file_path, data)
+        
+        if cache_path:
+            self._store_cached(cache_path, extracted)
+        return extracted
+    
+    def _cache_path(self, data: bytes, file_ext: str) -> str:
+        """
+        Cache file for a document's extraction result.
+        
+        Args:
+            data: File contents
+            file_ext: File extension (extractor used)
+            
+        Returns:
+            Path of the cache file (content hash + extraction settings)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        settings = f"{_EXTRACTION_CACHE_VERSION}-{fitz.VersionBind}-{file_ext[1:]}-ocr{int(self.use_ocr)}"
+        return os.path.join(self.cache_dir, f"{digest}-{settings}.json")
+    
+    def _load_cached(self, cache_path: str) -> Optional[Dict[str, any]]:
+        """
+        Read a cached extraction result.
+        
+        Args:
+            cache_path: Path from _cache_path()
+            
+        Returns:
+            Extracted document dictionary, or None if not cached (or unreadable)
+        """
+        try:
+            with open(cache_path, 'rb') as f:
+                raw = f.read()
+            return orjson.loads(raw) if orjson is not None else json.loads(raw)
+        except (OSError, ValueError):
+            return None
+    
+    def _store_cached(self, cache_path: str, extracted: Dict[str, any]) -> None:
+        """
+        Write an extraction result to the cache (failures are ignored).
+        
+        Args:
+            cache_path: Path from _cache_path()
+            extracted: Extracted document dictionary
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            raw = orjson.dumps(extracted) if orjson is not None else json.dumps(extracted).encode('utf-8')
+            # Write then rename, so parallel workers never read a partial file
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(raw)
+            os.replace(temp_path, cache_path)
+        except (OSError, TypeError) as e:
+            print(f"⚠ Could not cache extraction result: {e}")
     
     def ingest_multiple_documents(self, file_paths: List[str]) -> List[Dict[str, any]]:
         """
         Process multiple documents at once.
         Useful when uploading multiple policy files.
         
+        Extraction (and OCR) is CPU-bound, so files are processed in parallel
+        worker processes. Set LOAD_DOCUMENTS_NUMBER_OF_THREADS to control the
+        number of workers (default: CPU count - 1).
+        
         Args:
             file_paths: List of file paths to process
             
         Returns:
-            List of extracted document dictionaries
+            List of extracted document dictionaries (same order as file_paths)
+        """
+        workers = min(self._worker_count(), len(file_paths))
+        
+        # Not worth starting processes for a single file
+        if workers <= 1:
+            if len(file_paths) <= 1:
+                return [self._ingest_safe(file_path) for file_path in file_paths]
+            return self._ingest_prefetched(file_paths)
+        
+        with multiprocessing.Pool(workers) as pool:
+            return pool.map(self._ingest_safe, file_paths)
+    
+    def _ingest_prefetched(self, file_paths: List[str]) -> List[Dict[str, any]]:
+        """
+        Ingest documents one by one while reading the next files in the background.
+        
+        Up to _PREFETCH_DEPTH reads are in flight, so the disk stays busy while
+        the current file is parsed (instead of one blocking read per file).
+        
+        Args:
+            file_paths: List of file paths to process
+            
+        Returns:
+            List of extracted document dictionaries (same order as file_paths)
         """
         results = []
+        remaining = iter(file_paths)
         
-        # Process each file
-        for file_path in file_paths:
-            try:
-                # Extract text from document
-                extracted = self.ingest_document(file_path)
-                results.append(extracted)
-            except Exception as e:
-                # Log error but continue with other files
-                print(f"Error processing {file_path}: {str(e)}")
-                results.append({
-                    'file_name': os.path.basename(file_path),
-                    'error': str(e)
-                })
+        with ThreadPoolExecutor(max_workers=_PREFETCH_DEPTH) as reader:
+            pending = deque(
+                (file_path, reader.submit(_read_file, file_path))
+                for file_path, _ in zip(remaining, range(_PREFETCH_DEPTH))
+            )
+            
+            while pending:
+                file_path, future = pending.popleft()
+                
+                # Keep the read-ahead queue full
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    pending.append((next_path, reader.submit(_read_file, next_path)))
+                
+                try:
+                    data = future.result()
+                except OSError:
+                    data = None  # Let the normal path open (and report) it
+                
+                results.append(self._ingest_safe(file_path, data))
         
         return results
+    
+    def _ingest_safe(self, file_path: str, data: Optional[bytes] = None) -> Dict[str, any]:
+        """
+        Ingest one document, returning an error entry instead of raising.
+        
+        Args:
+            file_path: Path to the document file
+            data: Optional file contents already read into memory
+            
+        Returns:
+            Extracted document dictionary, or {'file_name', 'error'} on failure
+        """
+        try:
+            # Extract text from document
+            return self.ingest_document(file_path, data)
+        except Exception as e:
+            # Log error but continue with other files
+            print(f"Error processing {file_path}: {str(e)}")
+            return {
+                'file_name': os.path.basename(file_path),
+                'error': str(e)
+            }
+    
+    def _worker_count(self) -> int:
+        """
+        Number of worker processes for multi-document ingestion.
+        
+        Returns:
+            LOAD_DOCUMENTS_NUMBER_OF_THREADS if set, else CPU count - 1 (at least 1)
+        """
+        configured = os.getenv("LOAD_DOCUMENTS_NUMBER_OF_THREADS")
+        if configured:
+            return max(1, int(configured))
+        return max(1, (os.cpu_count() or 1) - 1)
 
 
 # Example usage (for testing)
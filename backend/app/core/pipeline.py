@@ -5,13 +5,69 @@ Orchestrates the entire document processing workflow:
 Upload → Extract → Chunk → Embed → Store
 """
 
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
 from .document_ingestion import DocumentIngester
 from .text_chunking import TextChunker
 from .vector_store import VectorStore
 import os
 
 
+# Pipeline used inside each worker process (built once per process by _init_worker)
+_worker_pipeline = None
+
+
+def _init_worker(use_ocr: bool, chunk_size: int, chunk_overlap: int) -> None:
+    """
+    Build the worker's own ingester and chunker (pipelines holding a vector
+    store can't be sent to other processes).
+    """
+    global _worker_pipeline
+    _worker_pipeline = PolicyPipeline(
+        vector_store=None,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        use_ocr=use_ocr
+    )
+    # Documents are already spread over all cores, one per worker
+    _worker_pipeline.chunker.num_threads = 1
+
+
+def _process_one(file_path: str, policy_name: str) -> Dict:
+    """
+    Extract and chunk one document in a worker process.
+    
+    Args:
+        file_path: Path to policy document
+        policy_name: Name to identify this policy
+        
+    Returns:
+        Result dictionary (see PolicyPipeline.extract_and_chunk_many)
+    """
+    extracted = _worker_pipeline.ingester._ingest_safe(file_path)
+    return _worker_pipeline._chunk_result(file_path, policy_name, extracted)
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    """
+    Group an iterable into lists of up to size items.
+    
+    Args:
+        items: Items to group
+        size: Maximum items per list
+        
+    Yields:
+        Lists of items
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
 class PolicyPipeline:
     """
     Main pipeline that orchestrates document processing.
@@ -22,6 +78,10 @@ class PolicyPipeline:
     3. Embedding & Storage: Convert to vectors and store
     """
     
+    # Chunks embedded and stored together by process_document (bounds how
+    # many chunks and embeddings are in memory at once)
+    STORE_BATCH_SIZE = 1024
+    
     def __init__(
         self, 
         vector_store: VectorStore,
@@ -69,14 +129,172 @@ class PolicyPipeline:
         # Step 1: Extract text from document
         print(f"Step 1: Extracting text from {file_path}...")
         extracted = self.ingester.ingest_document(file_path)
+        metadata = self._chunk_metadata(extracted, policy_name)
         
-        if 'error' in extracted:
-            raise ValueError(f"Document extraction failed: {extracted['error']}")
+        # Step 2-3: Chunk, generate embeddings and store batch by batch as
+        # chunks are produced, so the full chunk list is never built
+        print("Step 2-3: Chunking text, generating embeddings and storing in vector database...")
+        chunks_count = 0
+        for batch in _batched(self.chunker.iter_chunks(extracted['text'], metadata), self.STORE_BATCH_SIZE):
+            self.vector_store.store_chunks(batch, policy_name=policy_name)
+            chunks_count += len(batch)
         
-        print(f"  ✓ Extracted {len(extracted['text'])} characters from {extracted['file_name']}")
+        print(f"  ✓ Stored {chunks_count} chunks for policy '{policy_name}'")
+        
+        return self._stats(extracted, policy_name, chunks_count)
+    
+    def extract_and_chunk(self, file_path: str, policy_name: str) -> Tuple[List[Dict], Dict]:
+        """
+        Run the extract and chunk steps without storing anything.
+        
+        Used for bulk processing, where chunks from many documents are
+        stored together with bulk_store().
+        
+        Args:
+            file_path: Path to policy document
+            policy_name: Name to identify this policy
+            
+        Returns:
+            Tuple of (chunks, processing statistics)
+        """
+        # Step 1: Extract text from document
+        print(f"Step 1: Extracting text from {file_path}...")
+        extracted = self.ingester.ingest_document(file_path)
+        
+        return self._chunk_extracted(extracted, policy_name)
+    
+    def extract_and_chunk_many(
+        self,
+        file_paths: List[str],
+        policy_names: List[str],
+        workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int, str], None]] = None
+    ) -> List[Dict]:
+        """
+        Extract and chunk several documents in parallel.
+        
+        Each worker process extracts and chunks whole files with its own
+        ingester and chunker; nothing is stored (the caller stores the chunks
+        from this process, so there is a single database writer).
+        
+        Args:
+            file_paths: List of file paths
+            policy_names: Policy name for each file
+            workers: Number of worker processes (default: LOAD_DOCUMENTS_NUMBER_OF_THREADS
+                     or CPU count - 1; 1 = process files here, one by one)
+            progress_callback: Optional function called as (done, total, policy_name)
+                               after each file
+            
+        Returns:
+            One dictionary per file (same order): {'policy_name', 'file_path',
+            'chunks', 'stats'} on success, {'policy_name', 'file_path', 'error'}
+            on failure
+        """
+        print(f"Step 1: Extracting text from {len(file_paths)} documents...")
+        total = len(file_paths)
+        workers = min(workers or self.ingester._worker_count(), total)
+        
+        # Not worth starting processes for a single worker
+        if workers <= 1:
+            results = []
+            # Files are read ahead in the background while the current one is parsed
+            extracted_docs = self.ingester._ingest_prefetched(file_paths)
+            for done, (file_path, policy_name, extracted) in enumerate(zip(file_paths, policy_names, extracted_docs), 1):
+                results.append(self._chunk_result(file_path, policy_name, extracted))
+                if progress_callback:
+                    progress_callback(done, total, policy_name)
+            return results
+        
+        results = [None] * total
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.ingester.use_ocr, self.chunker.chunk_size, self.chunker.chunk_overlap)
+        ) as executor:
+            futures = {
+                executor.submit(_process_one, file_path, policy_name): i
+                for i, (file_path, policy_name) in enumerate(zip(file_paths, policy_names))
+            }
+            
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    # e.g. the worker process died
+                    results[i] = {
+                        'policy_name': policy_names[i],
+                        'file_path': file_paths[i],
+                        'error': str(e)
+                    }
+                if progress_callback:
+                    progress_callback(done, total, policy_names[i])
+        
+        return results
+    
+    def _chunk_result(self, file_path: str, policy_name: str, extracted: Dict) -> Dict:
+        """
+        Chunk an extracted document, returning an error entry instead of raising.
+        
+        Args:
+            file_path: Path to policy document
+            policy_name: Name to identify this policy
+            extracted: Output of DocumentIngester.ingest_document()
+            
+        Returns:
+            Result dictionary (see extract_and_chunk_many)
+        """
+        try:
+            chunks, stats = self._chunk_extracted(extracted, policy_name)
+            return {
+                'policy_name': policy_name,
+                'file_path': file_path,
+                'chunks': chunks,
+                'stats': stats
+            }
+        except Exception as e:
+            return {
+                'policy_name': policy_name,
+                'file_path': file_path,
+                'error': str(e)
+            }
+    
+    def _chunk_extracted(self, extracted: Dict, policy_name: str) -> Tuple[List[Dict], Dict]:
+        """
+        Chunk an extracted document (step 2 of the pipeline).
+        
+        Args:
+            extracted: Output of DocumentIngester.ingest_document()
+            policy_name: Name to identify this policy
+            
+        Returns:
+            Tuple of (chunks, processing statistics)
+        """
+        metadata = self._chunk_metadata(extracted, policy_name)
         
         # Step 2: Chunk the text
         print(f"Step 2: Chunking text...")
+        chunks = self.chunker.chunk_text(extracted['text'], metadata)
+        
+        print(f"  ✓ Created {len(chunks)} chunks")
+        
+        return chunks, self._stats(extracted, policy_name, len(chunks))
+    
+    def _chunk_metadata(self, extracted: Dict, policy_name: str) -> Dict:
+        """
+        Check an extracted document and build the metadata for its chunks.
+        
+        Args:
+            extracted: Output of DocumentIngester.ingest_document()
+            policy_name: Name to identify this policy
+            
+        Returns:
+            Metadata dictionary for TextChunker
+        """
+        if 'error' in extracted:
+            raise ValueError(f"Document extraction failed: {extracted['error']}")
+        
+        print(f"  ✓ Extracted {len(extracted['text'])} characters from {extracted['file_name']}")
         
         # Prepare metadata for chunks
         metadata = {
@@ -89,59 +307,86 @@ class PolicyPipeline:
         if 'pages' in extracted:
             metadata['pages'] = extracted['pages']
         
-        # Chunk the text
-        chunks = self.chunker.chunk_text(extracted['text'], metadata)
-        
-        print(f"  ✓ Created {len(chunks)} chunks")
-        
-        # Step 3: Generate embeddings and store
-        print(f"Step 3: Generating embeddings and storing in vector database...")
-        self.vector_store.store_chunks(chunks, policy_name=policy_name)
-        
-        print(f"  ✓ Stored {len(chunks)} chunks for policy '{policy_name}'")
+        return metadata
+    
+    def _stats(self, extracted: Dict, policy_name: str, chunks_count: int) -> Dict:
+        """
+        Build the processing statistics for a document.
         
-        # Return processing statistics
+        Args:
+            extracted: Output of DocumentIngester.ingest_document()
+            policy_name: Name to identify this policy
+            chunks_count: Number of chunks created
+            
+        Returns:
+            Statistics dictionary
+        """
         return {
             'policy_name': policy_name,
             'file_name': extracted['file_name'],
             'total_characters': len(extracted['text']),
-            'chunks_count': len(chunks),
+            'chunks_count': chunks_count,
             'pages': extracted.get('total_pages', 'N/A')
         }
     
+    def bulk_store(self, chunk_groups: List[Tuple[List[Dict], str]]) -> int:
+        """
+        Embed and store chunks from several documents in one batch.
+        
+        Args:
+            chunk_groups: List of (chunks, policy_name) pairs from extract_and_chunk()
+            
+        Returns:
+            Number of chunks stored
+        """
+        print(f"Generating embeddings and storing {len(chunk_groups)} documents in vector database...")
+        return self.vector_store.store_chunks_bulk(chunk_groups)
+    
     def process_multiple_documents(
         self, 
         file_paths: list, 
-        policy_names: Optional[list] = None
+        policy_names: Optional[list] = None,
+        workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int, str], None]] = None
     ) -> Dict:
         """
         Process multiple documents at once.
         Useful for bulk uploads.
         
+        Files are extracted and chunked in parallel worker processes, then
+        all chunks are embedded and stored here in one batch.
+        
         Args:
             file_paths: List of file paths
             policy_names: Optional list of policy names (uses file names if not provided)
+            workers: Number of worker processes (see extract_and_chunk_many)
+            progress_callback: Optional function called as (done, total, policy_name)
+                               after each file is chunked
             
         Returns:
             Dictionary with results for each document
         """
-        results = []
-        
         # Use file names as policy names if not provided
         if policy_names is None:
             policy_names = [os.path.splitext(os.path.basename(f))[0] for f in file_paths]
         
-        # Process each document
-        for file_path, policy_name in zip(file_paths, policy_names):
+        chunk_results = self.extract_and_chunk_many(file_paths, policy_names, workers, progress_callback)
+        
+        # Store every successfully chunked document in one batch
+        chunked = [r for r in chunk_results if 'error' not in r]
+        if chunked:
             try:
-                result = self.process_document(file_path, policy_name)
-                results.append(result)
+                self.bulk_store([(r['chunks'], r['policy_name']) for r in chunked])
+                print(f"  ✓ Stored {sum(len(r['chunks']) for r in chunked)} chunks for {len(chunked)} policies")
             except Exception as e:
-                results.append({
-                    'policy_name': policy_name,
-                    'file_path': file_path,
-                    'error': str(e)
-                })
+                for r in chunked:
+                    r['error'] = str(e)
+        
+        results = [
+            r['stats'] if 'error' not in r else
+            {'policy_name': r['policy_name'], 'file_path': r['file_path'], 'error': r['error']}
+            for r in chunk_results
+        ]
         
         return {
             'total_processed': len(results),
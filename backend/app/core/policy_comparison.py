@@ -5,25 +5,80 @@ This module compares multiple insurance policies side-by-side,
 extracting key coverage details and presenting them clearly.
 """
 
-from typing import List, Dict, Optional
+from typing import Any, Awaitable, Callable, List, Dict, Hashable, Optional, Tuple
 from .rag_qa import PolicyQASystem
-import pandas as pd
-import ollama
+from .cache import LRUCache
 from dotenv import load_dotenv
+import asyncio
+import hashlib
+import json
 import os
 
+# Optional: faster JSON for the comparison cache
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
+# Bump when comparison output changes, so cached results are not reused
+_COMPARISON_CACHE_VERSION = "v1"
+
 
 class PolicyComparator:
     """
     Compares multiple insurance policies by extracting and normalizing
     coverage categories, benefits, and limits.
     
-    Uses Ollama for local LLM inference.
+    Uses Ollama for local LLM inference. Every method has an async version
+    (e.g. compare_policies_async) that sends its LLM calls concurrently; the
+    sync methods run it with asyncio.run().
     """
     
-    def __init__(self, vector_store, qa_system: Optional[PolicyQASystem] = None, llm_model: str = "llama3"):
+    # Standard questions for each category
+    CATEGORY_QUESTIONS = {
+        "Medical": "What is the medical expense coverage limit and what does it cover?",
+        "Baggage": "What is the baggage loss or damage coverage limit?",
+        "Trip Delay": "What is the trip delay coverage and conditions?",
+        "Trip Cancellation": "What is the trip cancellation coverage limit and conditions?",
+        "Emergency Evacuation": "What is the emergency evacuation coverage?",
+        "Personal Accident": "What is the personal accident death benefit coverage?",
+        "Exclusions": "What are the main exclusions in this policy?"
+    }
+    
+    STRUCTURED_INFO_PROMPT = """Extract the key coverage details from this text. Focus on:
+- Coverage amounts/limits (currency and numbers)
+- Main conditions or restrictions
+- What is covered
+
+Category: {category}
+Description: {description}
+
+Provide a concise summary (2-3 sentences max) with specific numbers:"""
+    
+    # All of a policy's categories in one JSON-mode call
+    STRUCTURED_INFO_BATCH_PROMPT = """Extract the key coverage details from each description below. Focus on:
+- Coverage amounts/limits (currency and numbers)
+- Main conditions or restrictions
+- What is covered
+
+Return a JSON object with exactly these keys: {keys}
+The value for each key is a concise summary (2-3 sentences max) of that category's description, with specific numbers.
+
+{descriptions}"""
+    
+    # Descriptions shorter than this are already concise (e.g. "N/A")
+    MIN_SUMMARIZE_LENGTH = 40
+    
+    def __init__(
+        self,
+        vector_store,
+        qa_system: Optional[PolicyQASystem] = None,
+        llm_model: str = "llama3",
+        max_concurrent_llm_tasks: int = 4,
+        cache_dir: Optional[str] = None
+    ):
         """
         Initialize the policy comparator.
         
@@ -31,10 +86,90 @@ class PolicyComparator:
             vector_store: VectorStore instance to search across policies
             qa_system: Optional Q&A system for extracting policy details
             llm_model: Ollama model to use (default: "llama3")
+            max_concurrent_llm_tasks: Maximum Ollama requests in flight at once
+                                      (1 = ask one question at a time)
+            cache_dir: Directory for cached comparison results, keyed by the
+                       policies' content (default: COMPARISON_CACHE_DIR or
+                       ~/.policy_compare_cache; "" disables caching)
         """
         self.vector_store = vector_store
         self.qa_system = qa_system or PolicyQASystem(vector_store, llm_model=llm_model)
         self.llm_model = llm_model
+        self.max_concurrent_llm_tasks = max_concurrent_llm_tasks
+        
+        if cache_dir is None:
+            cache_dir = os.getenv("COMPARISON_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".policy_compare_cache"))
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        
+        # (description, category) -> structured summary; policies often share
+        # boilerplate text, which then only needs one LLM call
+        self._structured_info_cache = LRUCache(maxsize=1024)
+    
+    async def _gather(self, fn: Callable[..., Awaitable], jobs: Dict[Hashable, Tuple]) -> Dict[Hashable, Any]:
+        """
+        Await fn for every job, up to max_concurrent_llm_tasks at a time.
+        
+        Each call mostly waits on Ollama, so running them concurrently takes
+        about as long as the slowest call instead of the sum of all of them.
+        
+        Args:
+            fn: Async function to call
+            jobs: Dictionary of key -> positional arguments for fn
+            
+        Returns:
+            Dictionary of key -> fn result (same order as jobs)
+        """
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrent_llm_tasks))
+        
+        async def limited(args: Tuple) -> Any:
+            async with semaphore:
+                return await fn(*args)
+        
+        results = await asyncio.gather(*(limited(args) for args in jobs.values()))
+        return dict(zip(jobs, results))
+    
+    async def _ask_async(self, question: str, policy_name: str) -> Dict[str, any]:
+        """
+        Ask a question filtered to one policy.
+        
+        Args:
+            question: Question to ask
+            policy_name: Policy to search
+            
+        Returns:
+            Answer dictionary from the Q&A system
+        """
+        return await self.qa_system.answer_question_async(
+            question=question,
+            policy_filter=policy_name,
+            include_citations=True
+        )
+    
+    def _coverage_questions(self, policy_names: List[str], coverage_categories: List[str]) -> Dict[Tuple[str, str], Tuple[str, str]]:
+        """
+        Build the (policy, category) -> (question, policy) jobs for _gather.
+        
+        Args:
+            policy_names: Policies to ask about
+            coverage_categories: Categories to ask about
+            
+        Returns:
+            Dictionary of jobs
+        """
+        jobs = {}
+        for policy_name in policy_names:
+            for category in coverage_categories:
+                # Get question for this category (or use default)
+                question = self.CATEGORY_QUESTIONS.get(category, f"What is the {category} coverage in this policy?")
+                jobs[(policy_name, category)] = (question, policy_name)
+        return jobs
+    
+    def _coverage_entry(self, result: Dict[str, any]) -> Dict[str, any]:
+        """Keep the fields of an answer used in coverage details."""
+        return {
+            'description': result['answer'],
+            'citations': result['citations']
+        }
     
     def extract_coverage_details(self, policy_name: str, coverage_categories: List[str]) -> Dict[str, any]:
         """
@@ -52,37 +187,17 @@ class PolicyComparator:
         Returns:
             Dictionary mapping categories to their details
         """
-        coverage_data = {}
-        
-        # Standard questions for each category
-        category_questions = {
-            "Medical": "What is the medical expense coverage limit and what does it cover?",
-            "Baggage": "What is the baggage loss or damage coverage limit?",
-            "Trip Delay": "What is the trip delay coverage and conditions?",
-            "Trip Cancellation": "What is the trip cancellation coverage limit and conditions?",
-            "Emergency Evacuation": "What is the emergency evacuation coverage?",
-            "Personal Accident": "What is the personal accident death benefit coverage?",
-            "Exclusions": "What are the main exclusions in this policy?"
-        }
-        
-        # Extract details for each category
-        for category in coverage_categories:
-            # Get question for this category (or use default)
-            question = category_questions.get(category, f"What is the {category} coverage in this policy?")
-            
-            # Ask the question filtered to this policy
-            result = self.qa_system.answer_question(
-                question=question,
-                policy_filter=policy_name,
-                include_citations=True
-            )
-            
-            coverage_data[category] = {
-                'description': result['answer'],
-                'citations': result['citations']
-            }
+        return asyncio.run(self.extract_coverage_details_async(policy_name, coverage_categories))
+    
+    async def extract_coverage_details_async(self, policy_name: str, coverage_categories: List[str]) -> Dict[str, any]:
+        """Async version of extract_coverage_details."""
+        # Ask every category question at once (filtered to this policy)
+        results = await self._gather(self._ask_async, self._coverage_questions([policy_name], coverage_categories))
         
-        return coverage_data
+        return {
+            category: self._coverage_entry(result)
+            for (_, category), result in results.items()
+        }
     
     def compare_policies(
         self, 
@@ -104,6 +219,14 @@ class PolicyComparator:
         Returns:
             Dictionary with comparison table and summary
         """
+        return asyncio.run(self.compare_policies_async(policy_names, coverage_categories))
+    
+    async def compare_policies_async(
+        self,
+        policy_names: List[str],
+        coverage_categories: Optional[List[str]] = None
+    ) -> Dict[str, any]:
+        """Async version of compare_policies."""
         # Default categories if none specified
         if coverage_categories is None:
             coverage_categories = [
@@ -111,14 +234,33 @@ class PolicyComparator:
                 "Trip Cancellation", "Emergency Evacuation", "Personal Accident"
             ]
         
-        # Extract details for each policy
-        all_policy_data = {}
-        for policy_name in policy_names:
-            print(f"Extracting details for {policy_name}...")
-            policy_data = self.extract_coverage_details(policy_name, coverage_categories)
-            all_policy_data[policy_name] = policy_data
+        # Same policies (unchanged since) and categories compared before
+        cache_path = self._cache_path("compare", policy_names, coverage_categories)
+        cached = self._load_cached(cache_path)
+        if cached is not None:
+            return cached
+        
+        # Extract details for every policy and category in one parallel pass
+        print(f"Extracting details for {', '.join(policy_names)}...")
+        results = await self._gather(self._ask_async, self._coverage_questions(policy_names, coverage_categories))
         
-        # Create comparison DataFrame (table format)
+        # Flat (policy, category) -> coverage entry table (every cell is filled)
+        coverage = {key: self._coverage_entry(result) for key, result in results.items()}
+        all_policy_data = {policy_name: {} for policy_name in policy_names}
+        for (policy_name, category), entry in coverage.items():
+            all_policy_data[policy_name][category] = entry
+        
+        # Extract key information (limits, amounts) from the descriptions using
+        # LLM: one call per policy covering all of its categories
+        structured_info = await self._gather(self._extract_structured_info_batch_async, {
+            policy_name: ({
+                category: coverage[(policy_name, category)]['description']
+                for category in coverage_categories
+            },)
+            for policy_name in policy_names
+        })
+        
+        # Create comparison table (one row per category, JSON-ready)
         comparison_rows = []
         
         for category in coverage_categories:
@@ -126,30 +268,170 @@ class PolicyComparator:
             
             # Add data for each policy
             for policy_name in policy_names:
-                category_data = all_policy_data[policy_name].get(category, {})
-                # Extract key information (limits, amounts) using LLM
-                description = category_data.get('description', 'N/A')
-                
-                # Try to extract structured data (amounts, limits) from description
-                structured_info = self._extract_structured_info(description, category)
-                row[policy_name] = structured_info
+                row[policy_name] = structured_info[policy_name][category]
             
             comparison_rows.append(row)
         
-        # Create DataFrame
-        comparison_df = pd.DataFrame(comparison_rows)
-        
         # Generate conversational summary
         summary = self._generate_comparison_summary(all_policy_data, policy_names)
         
-        return {
-            'comparison_table': comparison_df.to_dict('records'),  # Convert to list of dicts for JSON
+        comparison = {
+            'comparison_table': comparison_rows,
             'summary': summary,
             'policies': policy_names,
             'categories': coverage_categories
         }
+        if self._all_answered(results.values()):
+            self._store_cached(cache_path, comparison)
+        return comparison
     
-    def _extract_structured_info(self, description: str, category: str) -> str:
+    def _cache_path(self, kind: str, policy_names: List[str], categories: List[str]) -> Optional[str]:
+        """
+        Cache file for a comparison result.
+        
+        The key covers everything the result depends on: the policies (and
+        their stored content, so re-ingesting a policy invalidates it), the
+        categories and the model.
+        
+        Args:
+            kind: Comparison method ("compare" or "category")
+            policy_names: Policies compared (order is kept in the result)
+            categories: Categories compared
+            
+        Returns:
+            Path of the cache file, or None if caching is disabled
+        """
+        if not self.cache_dir:
+            return None
+        
+        key = json.dumps([
+            _COMPARISON_CACHE_VERSION,
+            kind,
+            policy_names,
+            categories,
+            self.llm_model,
+            self.qa_system.llm_model,
+            [self.vector_store.doc_hash(policy_name) for policy_name in policy_names]
+        ])
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{kind}-{digest}.json")
+    
+    def _load_cached(self, cache_path: Optional[str]) -> Optional[Dict[str, any]]:
+        """
+        Read a cached comparison result.
+        
+        Args:
+            cache_path: Path from _cache_path()
+            
+        Returns:
+            Comparison dictionary, or None if not cached (or unreadable)
+        """
+        if not cache_path:
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                raw = f.read()
+            return orjson.loads(raw) if orjson is not None else json.loads(raw)
+        except (OSError, ValueError):
+            return None
+    
+    def _store_cached(self, cache_path: Optional[str], comparison: Dict[str, any]) -> None:
+        """
+        Write a comparison result to the cache (failures are ignored).
+        
+        Args:
+            cache_path: Path from _cache_path()
+            comparison: Comparison dictionary
+        """
+        if not cache_path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            raw = orjson.dumps(comparison) if orjson is not None else json.dumps(comparison).encode('utf-8')
+            # Write then rename, so a concurrent reader never sees a partial file
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(raw)
+            os.replace(temp_path, cache_path)
+        except (OSError, TypeError) as e:
+            print(f"⚠ Could not cache comparison result: {e}")
+    
+    def _all_answered(self, results) -> bool:
+        """
+        Check that no Q&A result is an LLM-failure fallback (those aren't cached).
+        
+        Args:
+            results: Results from the Q&A system
+            
+        Returns:
+            True if every answer came from the LLM
+        """
+        return not any(
+            result['answer'].startswith(self.qa_system.FALLBACK_PREFIX) for result in results
+        )
+    
+    async def _extract_structured_info_batch_async(self, descriptions: Dict[str, str]) -> Dict[str, str]:
+        """
+        Extract structured information for several categories in one LLM call.
+        
+        Trivial and already-cached descriptions are skipped; categories the
+        JSON reply is missing fall back to _extract_structured_info_async.
+        
+        Args:
+            descriptions: Dictionary of category -> description from Q&A
+            
+        Returns:
+            Dictionary of category -> concise summary (same order as descriptions)
+        """
+        results = {}
+        pending = {}
+        for category, description in descriptions.items():
+            cached = self._structured_info_cache.get((description, category))
+            if cached is not None:
+                results[category] = cached
+            elif not description or description.strip() == 'N/A' or len(description) < self.MIN_SUMMARIZE_LENGTH:
+                results[category] = description
+            else:
+                pending[category] = description
+        
+        if len(pending) > 1:
+            prompt = self.STRUCTURED_INFO_BATCH_PROMPT.format(
+                keys=json.dumps(list(pending)),
+                descriptions="\n\n".join(f"{category}: {description}" for category, description in pending.items())
+            )
+            try:
+                response = await self.qa_system.call_llm_async(
+                    self.qa_system._get_async_client().generate,
+                    model=self.llm_model,
+                    prompt=prompt,
+                    format='json',
+                    keep_alive=self.qa_system.KEEP_ALIVE,
+                    options={
+                        'temperature': 0.1,
+                        'num_predict': 200 * len(pending),
+                        'num_ctx': self.qa_system.NUM_CTX
+                    }
+                )
+                parsed = json.loads(response['response'])
+            except self.qa_system.LLM_ERRORS + (ValueError,):
+                parsed = {}
+            
+            if isinstance(parsed, dict):
+                for category in list(pending):
+                    summary = parsed.get(category)
+                    if isinstance(summary, str) and summary.strip():
+                        summary = summary.strip()
+                        self._structured_info_cache.put((pending.pop(category), category), summary)
+                        results[category] = summary
+        
+        # One call per category the batch didn't answer
+        results.update(await self._gather(self._extract_structured_info_async, {
+            category: (description, category) for category, description in pending.items()
+        }))
+        
+        return {category: results[category] for category in descriptions}
+    
+    async def _extract_structured_info_async(self, description: str, category: str) -> str:
         """
         Extract structured information (amounts, limits) from text description.
         Uses Ollama LLM to parse and normalize coverage details.
@@ -161,27 +443,31 @@ class PolicyComparator:
         Returns:
             Concise summary with key numbers and limits
         """
-        prompt = f"""Extract the key coverage details from this text. Focus on:
-- Coverage amounts/limits (currency and numbers)
-- Main conditions or restrictions
-- What is covered
-
-Category: {category}
-Description: {description}
-
-Provide a concise summary (2-3 sentences max) with specific numbers:"""
+        # Nothing to summarize
+        if not description or description.strip() == 'N/A' or len(description) < self.MIN_SUMMARIZE_LENGTH:
+            return description
+        
+        cached = self._structured_info_cache.get((description, category))
+        if cached is not None:
+            return cached
+        
+        prompt = self.STRUCTURED_INFO_PROMPT.format(category=category, description=description)
         
         try:
-            response = ollama.generate(
+            response = await self.qa_system.call_llm_async(
+                self.qa_system._get_async_client().generate,
                 model=self.llm_model,
                 prompt=prompt,
+                keep_alive=self.qa_system.KEEP_ALIVE,
                 options={
                     'temperature': 0.1,
-                    'num_predict': 200
+                    'num_predict': 200,
+                    'num_ctx': self.qa_system.NUM_CTX
                 }
             )
+            self._structured_info_cache.put((description, category), response['response'])
             return response['response']
-        except:
+        except self.qa_system.LLM_ERRORS:
             # Fallback to first 200 chars if extraction fails
             return description[:200] + "..." if len(description) > 200 else description
     
@@ -227,14 +513,23 @@ Provide a concise summary (2-3 sentences max) with specific numbers:"""
         Returns:
             Detailed comparison for this category
         """
+        return asyncio.run(self.compare_specific_category_async(policy_names, category))
+    
+    async def compare_specific_category_async(self, policy_names: List[str], category: str) -> Dict[str, any]:
+        """Async version of compare_specific_category."""
+        cache_path = self._cache_path("category", policy_names, [category])
+        cached = self._load_cached(cache_path)
+        if cached is not None:
+            return cached
+        
         category_data = {}
         
-        for policy_name in policy_names:
-            result = self.qa_system.answer_question(
-                question=f"What is the {category} coverage, including limits and conditions?",
-                policy_filter=policy_name,
-                include_citations=True
-            )
+        question = f"What is the {category} coverage, including limits and conditions?"
+        results = await self._gather(self._ask_async, {
+            policy_name: (question, policy_name) for policy_name in policy_names
+        })
+        
+        for policy_name, result in results.items():
             category_data[policy_name] = {
                 'answer': result['answer'],
                 'citations': result['citations'],
@@ -246,12 +541,15 @@ Provide a concise summary (2-3 sentences max) with specific numbers:"""
         for policy_name in policy_names:
             comparison_text += f"{policy_name}:\n{category_data[policy_name]['answer']}\n\n"
         
-        return {
+        comparison = {
             'category': category,
             'policies': policy_names,
             'detailed_comparison': category_data,
             'summary': comparison_text
         }
+        if self._all_answered(results.values()):
+            self._store_cached(cache_path, comparison)
+        return comparison
 
 
 # Example usage (for testing)
@@ -7,13 +7,84 @@ with accurate citations from policy documents.
 Uses Ollama for local LLM inference (no API required).
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import httpx
 import ollama
 from dotenv import load_dotenv
+import asyncio
+import copy
+import hashlib
 import os
+import random
+import re
+import threading
+import time
+
+from .cache import LRUCache, SemanticCache
 
 load_dotenv()
 
+# Seconds an Ollama connection check result is reused
+_OLLAMA_CHECK_TTL = 60.0
+
+# Model name -> (connected, time of the check), shared by all instances
+_ollama_checks = {}
+
+# Templated questions (e.g. generated by PolicyComparator); the captured
+# category is looked up in section titles instead of searched for
+_TEMPLATED_QUERIES = (
+    re.compile(r"^What is the (.+?) coverage\b", re.IGNORECASE),
+)
+
+
+def _check_ollama(client: ollama.Client, llm_model: str) -> bool:
+    """
+    Check that Ollama is reachable, at most once per _OLLAMA_CHECK_TTL.
+    
+    Creating many QA systems (e.g. one per request) then costs no extra
+    network calls, and the result is only printed when actually checked.
+    
+    Args:
+        client: Ollama client to check with
+        llm_model: Model that will be used (for the messages)
+        
+    Returns:
+        True if Ollama responded
+    """
+    now = time.monotonic()
+    cached = _ollama_checks.get(llm_model)
+    if cached is not None and now - cached[1] < _OLLAMA_CHECK_TTL:
+        return cached[0]
+    
+    try:
+        # Test connection to Ollama
+        client.list()
+        connected = True
+        print(f"✓ Ollama connected, using model: {llm_model}")
+    except Exception as e:
+        connected = False
+        print(f"⚠ Warning: Could not connect to Ollama: {e}")
+        print("  Make sure Ollama is running: ollama serve")
+        print(f"  Make sure model is downloaded: ollama pull {llm_model}")
+    
+    _ollama_checks[llm_model] = (connected, now)
+    return connected
+
+
+def _is_transient(error: Exception) -> bool:
+    """
+    Whether a failed Ollama call is worth retrying.
+    
+    Args:
+        error: Exception raised by the call
+        
+    Returns:
+        True for dropped connections/timeouts and server overload (5xx, 429)
+    """
+    if isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, ollama.ResponseError) and (error.status_code >= 500 or error.status_code == 429)
+
 
 class PolicyQASystem:
     """
@@ -26,6 +97,69 @@ class PolicyQASystem:
     4. Answer includes citations (section, page) for transparency
     """
     
+    # Keep the model loaded between calls (Ollama unloads it after 5 idle
+    # minutes by default, and reloading takes seconds to minutes)
+    KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "2h")
+    
+    # Seconds to wait for one Ollama response (long country grids included)
+    LLM_TIMEOUT = 300.0
+    
+    # Errors an Ollama call can raise (callers fall back instead of failing)
+    LLM_ERRORS = (ollama.ResponseError, ollama.RequestError, httpx.HTTPError)
+    
+    # Attempts per Ollama call for transient failures; the wait before a retry
+    # starts at LLM_RETRY_DELAY seconds and doubles, plus random jitter
+    LLM_ATTEMPTS = 3
+    LLM_RETRY_DELAY = 0.1
+    
+    # Same context size on every call: a different num_ctx makes Ollama reload the model
+    NUM_CTX = 4096
+    
+    # Low temperature for more consistent, factual answers
+    GENERATE_OPTIONS = {
+        'temperature': 0.1,
+        'top_p': 0.9,
+        'num_predict': 500,  # Max tokens to generate
+        'num_ctx': NUM_CTX
+    }
+    
+    # Start of answers built from raw excerpts because the LLM call failed
+    FALLBACK_PREFIX = "Error generating answer"
+    
+    # Minimum question similarity for reusing a cached answer
+    ANSWER_CACHE_THRESHOLD = 0.95
+    
+    # Minimum seconds between background saves of the answer cache
+    ANSWER_CACHE_SAVE_INTERVAL = 60.0
+    
+    # Citation parts, in order, and how each is written
+    CITATION_PARTS = (
+        ('section_title', "{section_title}"),
+        ('page_number', "page {page_number}"),
+        ('policy_name', "{policy_name} Policy")
+    )
+    
+    # Fixed parts of the answer prompt (the excerpts go between them)
+    PROMPT_HEADER = """You are an expert insurance policy assistant. Answer the user's question based ONLY on the provided policy document excerpts.
+
+Policy Document Excerpts:
+"""
+    PROMPT_QUESTION = "\n\nUser Question: "
+    PROMPT_INSTRUCTIONS = """
+
+Instructions:
+- Answer the question accurately based on the provided excerpts
+- If the information is not in the excerpts, say so clearly
+- Include specific details like coverage amounts, limits, and conditions
+- If citations are requested, reference the section/page information provided
+- Be concise but complete
+
+Answer:"""
+    
+    # Fields present -> citation template (built on first use; there are
+    # only a few metadata layouts, so formatting is a single format_map call)
+    _citation_templates = {}
+    
     def __init__(self, vector_store, llm_model: str = "llama3"):
         """
         Initialize the Q&A system with Ollama.
@@ -39,15 +173,108 @@ class PolicyQASystem:
         self.llm_model = llm_model
         self.vector_store = vector_store
         
-        # Verify Ollama is running and model is available
+        # One Ollama client for every call (also used by the comparator and
+        # country checker), so keep-alive connections are reused
+        self.client = ollama.Client(
+            timeout=self.LLM_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=8)
+        )
+        self._async_client = None
+        self._async_client_loop = None
+        
+        # Answer caches: an exact repeat is a hash lookup; a reworded question
+        # with the same filter is matched semantically. Both skip retrieval and
+        # the LLM. Answers are keyed on the stored chunks' version, so they
+        # are not reused once documents are added or removed (by any process).
+        # The semantic cache is saved next to the database so a restart
+        # starts warm (in the background, and by save_answer_cache() at shutdown).
+        self._exact_answers = LRUCache(maxsize=512)
+        self.answer_cache = SemanticCache(
+            vector_store.generate_embedding,
+            threshold=self.ANSWER_CACHE_THRESHOLD
+        )
+        db_path = getattr(vector_store, 'db_path', None)
+        self._answer_cache_path = os.path.join(db_path, "answer_cache.pkl") if db_path else None
+        if self._answer_cache_path and self.answer_cache.load(self._answer_cache_path):
+            print(f"✓ Loaded {len(self.answer_cache)} cached answers")
+        self._data_version = getattr(vector_store, 'data_version', None)
+        self._answer_cache_dirty = False
+        self._answer_cache_saved_at = time.monotonic()
+        self._answer_cache_save_lock = threading.Lock()
+        
+        # Verify Ollama is running (cached across instances)
+        _check_ollama(self.client, llm_model)
+    
+    def warmup(self) -> None:
+        """
+        Load the model into Ollama now (and keep it loaded for KEEP_ALIVE),
+        so the first real question doesn't pay the model load time.
+        """
         try:
-            # Test connection to Ollama
-            ollama.list()
-            print(f"✓ Ollama connected, using model: {llm_model}")
+            self.client.generate(
+                model=self.llm_model,
+                prompt="ok",
+                keep_alive=self.KEEP_ALIVE,
+                options={'num_predict': 1, 'num_ctx': self.NUM_CTX}
+            )
+            print(f"✓ Model {self.llm_model} loaded (keep_alive={self.KEEP_ALIVE})")
         except Exception as e:
-            print(f"⚠ Warning: Could not connect to Ollama: {e}")
-            print("  Make sure Ollama is running: ollama serve")
-            print(f"  Make sure model is downloaded: ollama pull {llm_model}")
+            print(f"⚠ Warning: Could not warm up model {self.llm_model}: {e}")
+    
+    def call_llm(self, method, **kwargs):
+        """
+        Call an Ollama client method, retrying transient failures.
+        
+        Example: self.call_llm(self.client.generate, model=..., prompt=...)
+        
+        Args:
+            method: Client method (e.g. self.client.generate or self.client.chat)
+            **kwargs: Arguments for the method
+            
+        Returns:
+            The method's response
+        """
+        for attempt in range(self.LLM_ATTEMPTS):
+            try:
+                return method(**kwargs)
+            except self.LLM_ERRORS as e:
+                if attempt == self.LLM_ATTEMPTS - 1 or not _is_transient(e):
+                    raise
+                time.sleep(self._retry_delay(attempt, e))
+    
+    async def call_llm_async(self, method, **kwargs):
+        """
+        Async version of call_llm (for AsyncClient methods).
+        
+        Args:
+            method: Async client method (e.g. self._get_async_client().generate)
+            **kwargs: Arguments for the method
+            
+        Returns:
+            The method's response
+        """
+        for attempt in range(self.LLM_ATTEMPTS):
+            try:
+                return await method(**kwargs)
+            except self.LLM_ERRORS as e:
+                if attempt == self.LLM_ATTEMPTS - 1 or not _is_transient(e):
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt, e))
+    
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """
+        Seconds to wait before retrying a failed Ollama call.
+        
+        Args:
+            attempt: Number of the failed attempt (0 = first)
+            error: Exception raised by the call
+            
+        Returns:
+            Backoff delay with jitter (so parallel callers don't retry in lockstep)
+        """
+        delay = self.LLM_RETRY_DELAY * (2 ** attempt) + random.uniform(0, self.LLM_RETRY_DELAY / 2)
+        print(f"⚠ Ollama call failed ({error}), retrying in {delay:.2f}s")
+        return delay
     
     def format_citation(self, metadata: Dict) -> str:
         """
@@ -61,21 +288,16 @@ class PolicyQASystem:
         Returns:
             Formatted citation string
         """
-        citation_parts = []
+        # Section, page and policy name, for whichever are available
+        fields = tuple(field for field, _ in self.CITATION_PARTS if field in metadata)
         
-        # Add section if available
-        if 'section_title' in metadata:
-            citation_parts.append(metadata['section_title'])
+        template = self._citation_templates.get(fields)
+        if template is None:
+            parts = [part for field, part in self.CITATION_PARTS if field in fields]
+            template = ", ".join(parts) if parts else "Policy Document"
+            self._citation_templates[fields] = template
         
-        # Add page number if available
-        if 'page_number' in metadata:
-            citation_parts.append(f"page {metadata['page_number']}")
-        
-        # Add policy name if available
-        if 'policy_name' in metadata:
-            citation_parts.append(metadata['policy_name'] + " Policy")
-        
-        return ", ".join(citation_parts) if citation_parts else "Policy Document"
+        return template.format_map(metadata)
     
     def answer_question(
         self, 
@@ -102,82 +324,344 @@ class PolicyQASystem:
         Returns:
             Dictionary with answer, citations, and source chunks
         """
-        # Step 1: Retrieve relevant chunks from vector database
-        relevant_chunks = self.vector_store.search(
-            query=question,
-            top_k=top_k,
-            policy_filter=policy_filter
+        # Reuse the answer to a near-identical earlier question
+        cache_key, cached = self._lookup_answer(question, top_k, policy_filter, include_citations)
+        if cached is not None:
+            return cached
+        
+        # Step 1-3: Retrieve relevant chunks and build the prompt
+        relevant_chunks, citations, prompt = self._prepare_question(question, top_k, policy_filter)
+        
+        if not relevant_chunks:
+            return self._no_information(question)
+        
+        # Step 4: Generate answer using Ollama LLM
+        try:
+            response = self.call_llm(
+                self.client.generate,
+                model=self.llm_model,
+                prompt=prompt,
+                keep_alive=self.KEEP_ALIVE,
+                options=self.GENERATE_OPTIONS
+            )
+            
+            answer = response['response']
+        except self.LLM_ERRORS as e:
+            # Error answers are not cached
+            return self._format_answer(
+                question, self._fallback_answer(e, relevant_chunks), citations, relevant_chunks, include_citations
+            )
+        
+        # Step 5: Format response with citations if requested
+        result = self._format_answer(question, answer, citations, relevant_chunks, include_citations)
+        self._store_answer(cache_key, result)
+        return result
+    
+    async def answer_question_async(
+        self, 
+        question: str, 
+        top_k: int = 5,
+        policy_filter: Optional[str] = None,
+        include_citations: bool = True
+    ) -> Dict[str, any]:
+        """
+        Async version of answer_question (uses an ollama.AsyncClient).
+        
+        Lets several questions wait on Ollama at the same time, e.g.
+        asyncio.gather(*[qa.answer_question_async(q) for q in questions]).
+        
+        Args:
+            question: User's question
+            top_k: Number of relevant chunks to retrieve
+            policy_filter: Optional filter for specific policy
+            include_citations: Whether to include citations in answer
+            
+        Returns:
+            Dictionary with answer, citations, and source chunks
+        """
+        # Embedding, cache lookup and retrieval are blocking (model inference,
+        # vector search), so they run in a worker thread, not on the event loop
+        cache_key, cached = await asyncio.to_thread(
+            self._lookup_answer, question, top_k, policy_filter, include_citations
+        )
+        if cached is not None:
+            return cached
+        
+        relevant_chunks, citations, prompt = await asyncio.to_thread(
+            self._prepare_question, question, top_k, policy_filter
         )
         
         if not relevant_chunks:
-            return {
-                'answer': "I couldn't find relevant information in the policy documents to answer this question.",
-                'citations': [],
-                'source_chunks': [],
-                'question': question
-            }
-        
-        # Step 2: Format retrieved chunks as context for LLM
-        context_parts = []
+            return self._no_information(question)
+        
+        try:
+            response = await self.call_llm_async(
+                self._get_async_client().generate,
+                model=self.llm_model,
+                prompt=prompt,
+                keep_alive=self.KEEP_ALIVE,
+                options=self.GENERATE_OPTIONS
+            )
+            
+            answer = response['response']
+        except self.LLM_ERRORS as e:
+            return self._format_answer(
+                question, self._fallback_answer(e, relevant_chunks), citations, relevant_chunks, include_citations
+            )
+        
+        result = self._format_answer(question, answer, citations, relevant_chunks, include_citations)
+        self._store_answer(cache_key, result)
+        return result
+    
+    def _get_async_client(self) -> ollama.AsyncClient:
+        """
+        Get the async Ollama client for the running event loop.
+        
+        Async connections belong to one event loop, so a new client is made
+        when called from a different loop (e.g. a later asyncio.run()).
+        
+        Returns:
+            ollama.AsyncClient shared by calls on this loop
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = ollama.AsyncClient(
+                timeout=self.LLM_TIMEOUT,
+                limits=httpx.Limits(max_keepalive_connections=8)
+            )
+            self._async_client_loop = loop
+        return self._async_client
+    
+    def _lookup_answer(self, question: str, top_k: int, policy_filter: Optional[str], include_citations: bool):
+        """
+        Look up a cached answer for a question.
+        
+        Checks the exact-match cache first (no embedding needed), then the
+        semantic cache. Answers are only reused for the same model, filter,
+        settings and version of the stored chunks.
+        
+        Args:
+            question: User's question
+            top_k: Number of relevant chunks to retrieve
+            policy_filter: Optional filter for specific policy
+            include_citations: Whether to include citations in answer
+            
+        Returns:
+            (cache key, copy of the cached answer or None); pass the key to _store_answer
+        """
+        data_version = self._data_version() if self._data_version else ""
+        tag = f"{self.llm_model}|{policy_filter}|{top_k}|{include_citations}|{data_version}"
+        exact_key = hashlib.sha1(f"{question.strip().lower()}|{tag}".encode('utf-8')).hexdigest()
+        
+        cached = self._exact_answers.get(exact_key)
+        embedding = None
+        if cached is None:
+            embedding = self.answer_cache.embed(question)
+            cached = self.answer_cache.get(embedding, tag)
+            if cached is not None:
+                self._exact_answers.put(exact_key, cached)
+        
+        if cached is not None:
+            # Copy so callers can't modify the cached answer
+            cached = copy.deepcopy(cached)
+            cached['question'] = question
+        return (exact_key, embedding, tag), cached
+    
+    def _store_answer(self, cache_key: Tuple, result: Dict[str, any]) -> None:
+        """
+        Cache an answer (saved to disk in the background every
+        ANSWER_CACHE_SAVE_INTERVAL seconds at most).
+        
+        Args:
+            cache_key: Key returned by _lookup_answer
+            result: Answer dictionary
+        """
+        exact_key, embedding, tag = cache_key
+        cached = copy.deepcopy(result)
+        self._exact_answers.put(exact_key, cached)
+        self.answer_cache.put(embedding, cached, tag)
+        
+        self._answer_cache_dirty = True
+        now = time.monotonic()
+        if (self._answer_cache_path and now - self._answer_cache_saved_at >= self.ANSWER_CACHE_SAVE_INTERVAL
+                and not self._answer_cache_save_lock.locked()):
+            self._answer_cache_saved_at = now
+            threading.Thread(target=self.save_answer_cache, daemon=True).start()
+    
+    def save_answer_cache(self) -> None:
+        """
+        Write the answer cache to disk if it changed since the last save.
+        
+        Runs in the background as answers are cached; call it at shutdown so
+        the latest answers are kept.
+        """
+        with self._answer_cache_save_lock:
+            if not self._answer_cache_dirty:
+                return
+            self._answer_cache_dirty = False
+            self._answer_cache_saved_at = time.monotonic()
+            self._save_answer_cache()
+    
+    def _save_answer_cache(self) -> None:
+        """Write the answer cache to disk (if it has a path)."""
+        if not self._answer_cache_path:
+            return
+        try:
+            self.answer_cache.save(self._answer_cache_path)
+        except OSError as e:
+            print(f"⚠ Warning: Could not save answer cache: {e}")
+    
+    def clear_answer_cache(self) -> None:
+        """
+        Drop all cached answers.
+        
+        Answers from before documents were added or removed are no longer
+        reused anyway (see _lookup_answer); clearing frees their slots.
+        """
+        self._exact_answers.clear()
+        self.answer_cache.clear()
+        self._answer_cache_dirty = True
+        self.save_answer_cache()
+    
+    def _templated_chunks(self, question: str, top_k: int, policy_filter: Optional[str]) -> List[Dict]:
+        """
+        Fast path for templated category questions about one policy.
+        
+        Looks the category up in section titles instead of embedding the
+        question and searching the index.
+        
+        Args:
+            question: User's question
+            top_k: Number of chunks to return
+            policy_filter: Policy the question is about
+            
+        Returns:
+            Matching chunks, or an empty list if the question isn't templated,
+            no policy is set, or no section title matches
+        """
+        if not policy_filter:
+            return []
+        
+        for pattern in _TEMPLATED_QUERIES:
+            match = pattern.match(question.strip())
+            if match:
+                return self.vector_store.search_by_metadata(
+                    policy=policy_filter,
+                    section_matches=match.group(1),
+                    top_k=top_k
+                )
+        return []
+    
+    def _prepare_question(self, question: str, top_k: int, policy_filter: Optional[str]) -> Tuple[List[Dict], List[str], str]:
+        """
+        Retrieve relevant chunks and build the LLM prompt for a question.
+        
+        Args:
+            question: User's question
+            top_k: Number of relevant chunks to retrieve
+            policy_filter: Optional filter for specific policy
+            
+        Returns:
+            (relevant_chunks, citations, prompt); chunks is empty if nothing was found
+        """
+        # Step 1: Retrieve relevant chunks from vector database
+        relevant_chunks = self._templated_chunks(question, top_k, policy_filter)
+        if not relevant_chunks:
+            relevant_chunks = self.vector_store.search(
+                query=question,
+                top_k=top_k,
+                policy_filter=policy_filter
+            )
+        
+        if not relevant_chunks:
+            return [], [], ""
+        
+        # Step 2-3: Build the prompt with the retrieved chunks as context.
+        # All pieces are joined once at the end (no intermediate context string)
+        prompt_parts = [self.PROMPT_HEADER]
         citations = []
+        formatted = {}  # Chunks from the same section and page share a citation
         
         for chunk in relevant_chunks:
             # Extract text and metadata
             chunk_text = chunk['text']
             metadata = chunk['metadata']
             
-            # Format citation
-            citation = self.format_citation(metadata)
-            citations.append(citation)
+            # Format citation (once per section/page/policy)
+            citation_key = (metadata.get('section_title'), metadata.get('page_number'), metadata.get('policy_name'))
+            citation = formatted.get(citation_key)
+            if citation is None:
+                citation = formatted[citation_key] = self.format_citation(metadata)
             
             # Add to context with citation
-            context_parts.append(
-                f"[{citation}]\n{chunk_text}"
-            )
+            if citations:
+                prompt_parts.append("\n\n---\n\n")
+            prompt_parts += ("[", citation, "]\n", chunk_text)
+            citations.append(citation)
         
-        # Combine all context
-        context = "\n\n---\n\n".join(context_parts)
+        prompt_parts += (self.PROMPT_QUESTION, question, self.PROMPT_INSTRUCTIONS)
+        prompt = "".join(prompt_parts)
         
-        # Step 3: Create prompt for LLM
-        prompt = f"""You are an expert insurance policy assistant. Answer the user's question based ONLY on the provided policy document excerpts.
-
-Policy Document Excerpts:
-{context}
-
-User Question: {question}
-
-Instructions:
-- Answer the question accurately based on the provided excerpts
-- If the information is not in the excerpts, say so clearly
-- Include specific details like coverage amounts, limits, and conditions
-- If citations are requested, reference the section/page information provided
-- Be concise but complete
-
-Answer:"""
+        return relevant_chunks, citations, prompt
+    
+    def _no_information(self, question: str) -> Dict[str, any]:
+        """
+        Build the answer returned when no relevant chunks are found.
         
-        # Step 4: Generate answer using Ollama LLM
-        try:
-            response = ollama.generate(
-                model=self.llm_model,
-                prompt=prompt,
-                options={
-                    'temperature': 0.1,  # Low temperature for more consistent, factual answers
-                    'top_p': 0.9,
-                    'num_predict': 500  # Max tokens to generate
-                }
-            )
+        Args:
+            question: User's question
             
-            answer = response['response']
-        except Exception as e:
-            # Fallback if Ollama fails
-            answer = f"Error generating answer: {str(e)}\n\nRelevant information found:\n"
-            for chunk in relevant_chunks[:2]:
-                answer += f"\n{chunk['text'][:200]}...\n"
+        Returns:
+            Answer dictionary
+        """
+        return {
+            'answer': "I couldn't find relevant information in the policy documents to answer this question.",
+            'citations': [],
+            'source_chunks': [],
+            'question': question
+        }
+    
+    def _fallback_answer(self, error: Exception, relevant_chunks: List[Dict]) -> str:
+        """
+        Build an answer from the raw excerpts when Ollama fails.
         
-        # Step 5: Format response with citations if requested
+        Args:
+            error: Exception raised by the LLM call
+            relevant_chunks: Retrieved chunks
+            
+        Returns:
+            Fallback answer text
+        """
+        answer = f"{self.FALLBACK_PREFIX}: {str(error)}\n\nRelevant information found:\n"
+        for chunk in relevant_chunks[:2]:
+            answer += f"\n{chunk['text'][:200]}...\n"
+        return answer
+    
+    def _format_answer(
+        self,
+        question: str,
+        answer: str,
+        citations: List[str],
+        relevant_chunks: List[Dict],
+        include_citations: bool
+    ) -> Dict[str, any]:
+        """
+        Attach citations to an answer and build the result dictionary.
+        
+        Args:
+            question: User's question
+            answer: LLM answer text
+            citations: Citation for each retrieved chunk
+            relevant_chunks: Retrieved chunks
+            include_citations: Whether to include citations in answer
+            
+        Returns:
+            Dictionary with answer, citations, and source chunks
+        """
+        unique_citations = []
         if include_citations and citations:
             # Add citations to the end of the answer
-            unique_citations = list(set(citations))  # Remove duplicates
+            unique_citations = list(dict.fromkeys(citations))  # Remove duplicates, keep retrieval order
             citation_text = "\n\nSources: " + "; ".join(unique_citations)
             answer = answer + citation_text
         
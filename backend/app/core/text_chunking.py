@@ -5,10 +5,58 @@ This module splits long policy documents into smaller, manageable chunks.
 Each chunk is labeled with metadata (section, page, policy name) for better retrieval.
 """
 
+import bisect
+import functools
+import hashlib
+import json
+import os
 import re
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 import tiktoken
 
+# Optional: RE2 for section detection (linear time, so no catastrophic
+# backtracking on long whitespace runs in extracted PDF text)
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# Optional: faster JSON for the chunk cache
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bump when chunking output changes, so cached chunks are not reused
+_CHUNK_CACHE_VERSION = "v2"
+
+# Section headers (e.g., "Section 3.2", "CHAPTER 1", "Article 5") up to the end
+# of the line; group 1 is the title. No lookahead, so RE2 can compile it.
+# Matched against the lowercased text: a case-sensitive pattern lets the
+# engine skip straight to candidate letters, several times faster than (?i).
+_SECTION_PATTERN = r'(?:section|chapter|article|part)\s+\d+(?:\.\d+)*[:\-]?\s*(.*?)\n'
+_SECTION_RE = (re2 or re).compile(_SECTION_PATTERN)
+# Fallback for text whose lowercase form changes length (a few Unicode
+# characters), where match positions would no longer line up
+_SECTION_RE_IGNORECASE = (re2 or re).compile('(?i)' + _SECTION_PATTERN)
+
+# Sentence boundaries (used to split paragraphs too large for one chunk)
+_SENTENCE_RE = re.compile(r'[.!?]+\s+')
+
+
+@functools.lru_cache(maxsize=4)
+def _get_encoder(encoding_name: str) -> tiktoken.Encoding:
+    """
+    Get a tiktoken encoding, shared by all chunkers.
+    
+    Args:
+        encoding_name: tiktoken encoding name (e.g. "cl100k_base")
+        
+    Returns:
+        Encoding instance (built once per name and process)
+    """
+    return tiktoken.get_encoding(encoding_name)
+
 
 class TextChunker:
     """
@@ -20,19 +68,38 @@ class TextChunker:
     - Metadata helps provide context and citations
     """
     
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        chunk_overlap: int = 50,
+        encoding_name: str = "cl100k_base",
+        cache_dir: Optional[str] = None
+    ):
         """
         Initialize the chunker.
         
         Args:
             chunk_size: Target number of tokens per chunk (default 500)
             chunk_overlap: Number of overlapping tokens between chunks (prevents context loss)
+            encoding_name: tiktoken encoding used to count tokens (default: "cl100k_base")
+            cache_dir: Directory for cached chunking results, keyed by text
+                       content (default: CHUNK_CACHE_DIR or ~/.policy_chunk_cache;
+                       empty string disables the cache)
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.encoding_name = encoding_name
+        if cache_dir is None:
+            cache_dir = os.getenv("CHUNK_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".policy_chunk_cache"))
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        
+        # Tokenizer for counting tokens (GPT-style), shared by all chunkers
+        self.tokenizer = _get_encoder(encoding_name)
+        self.num_threads = os.cpu_count() or 1
         
-        # Initialize tokenizer for counting tokens (GPT-style)
-        self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        # Tokens of the separators used to join paragraphs and sentences
+        self._paragraph_separator = self.tokenizer.encode_ordinary("\n\n")
+        self._sentence_separator = self.tokenizer.encode_ordinary(" ")
     
     def count_tokens(self, text: str) -> int:
         """
@@ -56,17 +123,19 @@ class TextChunker:
             text: Full document text
             
         Returns:
-            List of dictionaries, each with 'text' and detected 'section_title'
+            List of dictionaries, each with 'text', detected 'section_title'
+            and 'start' (offset of the section text in the document)
         """
-        # Pattern to detect section headers (e.g., "Section 3.2", "CHAPTER 1", "Article 5")
-        section_pattern = r'(?i)(?:Section|Chapter|Article|Part)\s+\d+(?:\.\d+)*[:\-]?\s*(.*?)(?=\n)'
-        
         sections = []
-        matches = list(re.finditer(section_pattern, text))
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            matches = list(_SECTION_RE.finditer(lowered))
+        else:
+            matches = list(_SECTION_RE_IGNORECASE.finditer(text))
         
         # If no sections found, treat entire document as one section
         if not matches:
-            return [{'text': text, 'section_title': 'Document'}]
+            return [{'text': text, 'section_title': 'Document', 'start': 0}]
         
         # Split text based on section markers
         for i, match in enumerate(matches):
@@ -81,12 +150,13 @@ class TextChunker:
             
             # Extract section text
             section_text = text[start_pos:end_pos].strip()
-            section_title = match.group(0).strip()
+            section_title = text[start_pos:match.end()].strip()  # Original case
             
             if section_text:
                 sections.append({
                     'text': section_text,
-                    'section_title': section_title
+                    'section_title': section_title,
+                    'start': start_pos  # A header match never starts with whitespace
                 })
         
         return sections
@@ -107,176 +177,416 @@ class TextChunker:
         Returns:
             List of chunk dictionaries with text and metadata
         """
+        return list(self.iter_chunks(text, metadata))
+    
+    def iter_chunks(self, text: str, metadata: Optional[Dict] = None) -> Iterator[Dict[str, any]]:
+        """
+        Generate chunks one at a time (same chunks as chunk_text).
+        
+        Lets callers embed and store chunks in batches as they're produced
+        instead of holding the whole chunk list in memory.
+        
+        Args:
+            text: Text to chunk
+            metadata: Dictionary with document metadata (file_name, policy_name, etc.)
+            
+        Yields:
+            Chunk dictionaries with text and metadata
+        """
         # Default metadata if none provided
         if metadata is None:
             metadata = {}
         
+        # Page texts are only needed to assign page numbers - don't copy the
+        # whole document into every chunk's metadata
+        pages = metadata.get('pages')
+        metadata = {k: v for k, v in metadata.items() if k != 'pages'}
+        
+        # Offset of each page in the text (+2 for the \n\n between pages)
+        page_starts = self._page_starts(pages) if pages is not None else None
+        
+        for chunk_index, (start, chunk_text, section_title) in enumerate(self._iter_cached_pieces(text)):
+            chunk = {
+                'text': chunk_text,
+                'chunk_index': chunk_index,
+                'section_title': section_title,
+                **metadata  # Spread metadata (file_name, policy_name, etc.)
+            }
+            
+            # Add page numbers if available in metadata: the page this chunk
+            # starts in, by binary search over the page start offsets
+            if page_starts is not None:
+                if pages:
+                    chunk['page_number'] = pages[bisect.bisect_right(page_starts, start) - 1]['page_num']
+                else:
+                    chunk['page_number'] = 1
+            yield chunk
+    
+    def _iter_cached_pieces(self, text: str) -> Iterator[Tuple[int, str, str]]:
+        """
+        Split text into chunk pieces, reusing the cached result for the same
+        text (e.g. a re-uploaded document).
+        
+        Metadata is added to the pieces by iter_chunks(), so the same text
+        under another policy name still hits the cache.
+        
+        Args:
+            text: Text to chunk
+            
+        Yields:
+            (start offset, text, section_title) of each chunk, in order
+        """
+        if not self.cache_dir:
+            yield from self._iter_section_chunks(text)
+            return
+        
+        cache_path = self._cache_path(text)
+        cached = self._load_cached(cache_path)
+        if cached is not None:
+            yield from map(tuple, cached)
+            return
+        
+        pieces = []
+        for piece in self._iter_section_chunks(text):
+            pieces.append(piece)
+            yield piece
+        
+        # Only reached if the caller consumed every chunk
+        self._store_cached(cache_path, pieces)
+    
+    def _cache_path(self, text: str) -> str:
+        """
+        Cache file for a text's chunks.
+        
+        Args:
+            text: Full document text
+            
+        Returns:
+            Path of the cache file (content hash + chunking settings)
+        """
+        digest = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+        settings = f"{_CHUNK_CACHE_VERSION}-{self.encoding_name}-{self.chunk_size}-{self.chunk_overlap}"
+        return os.path.join(self.cache_dir, f"{digest}-{settings}.json")
+    
+    def _load_cached(self, cache_path: str) -> Optional[List[list]]:
+        """
+        Read cached chunks.
+        
+        Args:
+            cache_path: Path from _cache_path()
+            
+        Returns:
+            List of [start, text, section_title] pieces, or None if not cached (or unreadable)
+        """
+        try:
+            with open(cache_path, 'rb') as f:
+                raw = f.read()
+            return orjson.loads(raw) if orjson is not None else json.loads(raw)
+        except (OSError, ValueError):
+            return None
+    
+    def _store_cached(self, cache_path: str, pieces: List[Tuple[int, str, str]]) -> None:
+        """
+        Write chunks to the cache (failures are ignored).
+        
+        Args:
+            cache_path: Path from _cache_path()
+            pieces: (start offset, text, section_title) of each chunk, in order
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            raw = orjson.dumps(pieces) if orjson is not None else json.dumps(pieces).encode('utf-8')
+            # Write then rename, so parallel workers never read a partial file
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(raw)
+            os.replace(temp_path, cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠ Could not cache chunks: {e}")
+    
+    def _iter_section_chunks(self, text: str) -> Iterator[Tuple[int, str, str]]:
+        """
+        Split text into chunk pieces.
+        
+        Each piece records where its text starts in the document, tracked
+        while packing, so pages can be assigned without searching for it
+        (exact, except a few characters early when an overlap spans
+        sentences, whose punctuation the sentence split drops).
+        
+        Args:
+            text: Text to chunk
+            
+        Yields:
+            (start offset, text, section_title) of each chunk, in order
+        """
         # First, try to split by sections for better structure
         sections = self.split_by_sections(text)
         
-        all_chunks = []
-        
         # Process each section
-        for section in sections:
+        for section, paragraphs in zip(sections, self._tokenize_sections(sections)):
             section_text = section['text']
             section_title = section['section_title']
             
-            # Count tokens in this section
-            token_count = self.count_tokens(section_text)
-            
             # If section is small enough, keep it as one chunk
-            if token_count <= self.chunk_size:
-                chunk = {
-                    'text': section_text,
-                    'chunk_index': len(all_chunks),
-                    'section_title': section_title,
-                    **metadata  # Spread metadata (file_name, policy_name, etc.)
-                }
-                all_chunks.append(chunk)
+            if paragraphs is None:
+                yield section['start'], section_text, section_title
             
             # Otherwise, split section into smaller chunks
             else:
-                # Split by paragraphs first (natural breakpoints)
-                paragraphs = section_text.split('\n\n')
-                
+                # Split by paragraphs first (natural breakpoints). The current
+                # chunk is tracked as a token list, so its overlap never needs
+                # re-encoding, and by the offsets of its first and last
+                # characters in the document. Its size for chunk_size is
+                # counted as before: separators joined onto the chunk don't
+                # count, those after an overlap do.
                 current_chunk = ""
-                current_tokens = 0
-                chunk_index = len(all_chunks)
+                current_tokens = []
+                current_size = 0
+                current_start = current_end = para_start = section['start']
                 
-                for para in paragraphs:
-                    para_tokens = self.count_tokens(para)
-                    
+                for para, para_tokens, sentences in paragraphs:
                     # If adding this paragraph exceeds chunk size, save current chunk
-                    if current_tokens + para_tokens > self.chunk_size and current_chunk:
+                    if current_size + len(para_tokens) > self.chunk_size and current_chunk:
                         # Save current chunk
-                        chunk = {
-                            'text': current_chunk.strip(),
-                            'chunk_index': chunk_index,
-                            'section_title': section_title,
-                            **metadata
-                        }
-                        all_chunks.append(chunk)
-                        chunk_index += 1
+                        yield self._piece(current_start, current_chunk, section_title)
                         
                         # Start new chunk with overlap (last part of previous chunk)
                         # This prevents losing context between chunks
-                        overlap_text = self._get_overlap_text(current_chunk, self.chunk_overlap)
+                        overlap_tokens = self._overlap_tokens(current_tokens)
+                        overlap_text = self.tokenizer.decode(overlap_tokens)
+                        current_start = current_end - len(overlap_text)
                         current_chunk = overlap_text + "\n\n" + para
-                        current_tokens = self.count_tokens(current_chunk)
+                        current_tokens = overlap_tokens + self._paragraph_separator + para_tokens
+                        current_size = len(current_tokens)
+                        current_end = para_start + len(para)
                     
                     # If single paragraph is too large, split by sentences
-                    elif para_tokens > self.chunk_size:
+                    elif sentences is not None:
                         # Save current chunk first
                         if current_chunk:
-                            chunk = {
-                                'text': current_chunk.strip(),
-                                'chunk_index': chunk_index,
-                                'section_title': section_title,
-                                **metadata
-                            }
-                            all_chunks.append(chunk)
-                            chunk_index += 1
+                            yield self._piece(current_start, current_chunk, section_title)
                             current_chunk = ""
-                            current_tokens = 0
+                            current_tokens = []
+                            current_size = 0
                         
                         # Split paragraph by sentences
-                        sentences = re.split(r'[.!?]+\s+', para)
-                        for sentence in sentences:
-                            sent_tokens = self.count_tokens(sentence)
-                            if current_tokens + sent_tokens > self.chunk_size:
+                        for sentence, sent_tokens, sent_offset in sentences:
+                            sent_start = para_start + sent_offset
+                            
+                            # A single sentence too large for one chunk (e.g. a
+                            # table without punctuation): cut its tokens into
+                            # overlapping windows, the last one stays open
+                            if len(sent_tokens) > self.chunk_size:
                                 if current_chunk:
-                                    chunk = {
-                                        'text': current_chunk.strip(),
-                                        'chunk_index': chunk_index,
-                                        'section_title': section_title,
-                                        **metadata
-                                    }
-                                    all_chunks.append(chunk)
-                                    chunk_index += 1
-                                    overlap_text = self._get_overlap_text(current_chunk, self.chunk_overlap)
+                                    yield self._piece(current_start, current_chunk, section_title)
+                                
+                                windows = self._token_windows(sent_tokens)
+                                step = max(self.chunk_size - self.chunk_overlap, 1)
+                                for window in windows[:-1]:
+                                    yield self._piece(sent_start, self.tokenizer.decode(window), section_title)
+                                    sent_start += len(self.tokenizer.decode(window[:step]))
+                                current_tokens = windows[-1]
+                                current_size = len(current_tokens)
+                                current_chunk = self.tokenizer.decode(current_tokens)
+                                current_start = sent_start
+                            
+                            elif current_size + len(sent_tokens) > self.chunk_size:
+                                if current_chunk:
+                                    yield self._piece(current_start, current_chunk, section_title)
+                                    overlap_tokens = self._overlap_tokens(current_tokens)
+                                    overlap_text = self.tokenizer.decode(overlap_tokens)
+                                    current_start = current_end - len(overlap_text)
                                     current_chunk = overlap_text + " " + sentence
-                                    current_tokens = self.count_tokens(current_chunk)
+                                    current_tokens = overlap_tokens + self._sentence_separator + sent_tokens
+                                    current_size = len(current_tokens)
                                 else:
                                     current_chunk = sentence
-                                    current_tokens = sent_tokens
+                                    current_tokens = list(sent_tokens)
+                                    current_size = len(sent_tokens)
+                                    current_start = sent_start
                             else:
-                                current_chunk += " " + sentence if current_chunk else sentence
+                                if current_chunk:
+                                    current_chunk += " " + sentence
+                                    current_tokens += self._sentence_separator
+                                else:
+                                    current_chunk = sentence
+                                    current_start = sent_start
                                 current_tokens += sent_tokens
+                                current_size += len(sent_tokens)
+                            current_end = para_start + sent_offset + len(sentence)
                     
                     # Normal case: add paragraph to current chunk
                     else:
-                        current_chunk += "\n\n" + para if current_chunk else para
+                        if current_chunk:
+                            current_chunk += "\n\n" + para
+                            current_tokens += self._paragraph_separator
+                        else:
+                            current_chunk = para
+                            current_start = para_start
                         current_tokens += para_tokens
+                        current_size += len(para_tokens)
+                        current_end = para_start + len(para)
+                    
+                    # Paragraphs are separated by \n\n in the section text
+                    para_start += len(para) + 2
                 
                 # Don't forget the last chunk
                 if current_chunk.strip():
-                    chunk = {
-                        'text': current_chunk.strip(),
-                        'chunk_index': chunk_index,
-                        'section_title': section_title,
-                        **metadata
-                    }
-                    all_chunks.append(chunk)
-        
-        # Add page numbers if available in metadata
-        if 'pages' in metadata:
-            self._add_page_numbers(all_chunks, metadata['pages'])
-        
-        return all_chunks
+                    yield self._piece(current_start, current_chunk, section_title)
+    
+    @staticmethod
+    def _piece(start: int, chunk_text: str, section_title: str) -> Tuple[int, str, str]:
+        """
+        Build a chunk piece with its text stripped.
+        
+        Args:
+            start: Offset of chunk_text in the document
+            chunk_text: Chunk text (unstripped)
+            section_title: Title of the chunk's section
+        
+        Returns:
+            (start offset of the stripped text, stripped text, section_title)
+        """
+        stripped = chunk_text.lstrip()
+        return start + len(chunk_text) - len(stripped), stripped.rstrip(), section_title
     
-    def _get_overlap_text(self, text: str, overlap_tokens: int) -> str:
+    def _tokenize_sections(self, sections: List[Dict[str, str]]) -> List[Optional[List[Tuple]]]:
         """
-        Extract the last N tokens from text for overlap between chunks.
-        This prevents losing context at chunk boundaries.
+        Encode everything chunking needs to measure, in one batch per level.
+        
+        tiktoken encodes a batch on several threads (outside the GIL), so all
+        sections are encoded in one call, then all paragraphs of the sections
+        that are too large, then all sentences of the paragraphs that are.
         
         Args:
-            text: Text to extract from
-            overlap_tokens: Number of tokens to extract
+            sections: Sections from split_by_sections()
             
         Returns:
-            Last N tokens as string
+            For each section: None if it fits in one chunk, otherwise its
+            paragraphs as (text, tokens, sentences) tuples, where sentences
+            is a list of (text, tokens, offset in the paragraph) tuples if the
+            paragraph is too large for one chunk and None if not
         """
-        # Encode text to tokens
-        tokens = self.tokenizer.encode(text)
+        # Only the sizes of whole sections are needed
+        section_lengths = [len(tokens) for tokens in self._encode_batch([section['text'] for section in sections])]
         
-        # Get last N tokens
-        overlap_tokens_list = tokens[-overlap_tokens:] if len(tokens) > overlap_tokens else tokens
+        # Paragraphs of every section that doesn't fit, flattened. str.split is
+        # one C-level pass, and every piece is needed as a string anyway (for
+        # the batch encode and the chunk text), so scanning for offsets and
+        # slicing lazily would only be slower.
+        paragraphs = {
+            i: section['text'].split('\n\n')
+            for i, (section, length) in enumerate(zip(sections, section_lengths))
+            if length > self.chunk_size
+        }
+        paragraph_tokens = iter(self._encode_batch([para for paras in paragraphs.values() for para in paras]))
+        paragraphs = {
+            i: [(para, next(paragraph_tokens)) for para in paras]
+            for i, paras in paragraphs.items()
+        }
         
-        # Decode back to text
-        return self.tokenizer.decode(overlap_tokens_list)
+        # Sentences of every paragraph that doesn't fit, flattened
+        sentences = {
+            (i, j): self._split_sentences(para)
+            for i, paras in paragraphs.items()
+            for j, (para, tokens) in enumerate(paras)
+            if len(tokens) > self.chunk_size
+        }
+        sentence_tokens = iter(self._encode_batch([sentence for sents in sentences.values() for sentence, _ in sents]))
+        sentences = {
+            key: [(sentence, next(sentence_tokens), offset) for sentence, offset in sents]
+            for key, sents in sentences.items()
+        }
+        
+        return [
+            [(para, tokens, sentences.get((i, j))) for j, (para, tokens) in enumerate(paragraphs[i])]
+            if i in paragraphs else None
+            for i in range(len(sections))
+        ]
     
-    def _add_page_numbers(self, chunks: List[Dict], pages: List[Dict]) -> None:
+    @staticmethod
+    def _split_sentences(para: str) -> List[Tuple[str, int]]:
         """
-        Add page number information to chunks based on their content.
-        This helps provide accurate citations (e.g., "see page 5").
+        Split a paragraph at sentence boundaries (like _SENTENCE_RE.split,
+        which drops the punctuation and spaces between sentences).
         
         Args:
-            chunks: List of chunk dictionaries to update
-            pages: List of page dictionaries from document extraction
+            para: Paragraph text
+            
+        Returns:
+            (sentence, offset in the paragraph) pairs
+        """
+        sentences = []
+        start = 0
+        for match in _SENTENCE_RE.finditer(para):
+            sentences.append((para[start:match.start()], start))
+            start = match.end()
+        sentences.append((para[start:], start))
+        return sentences
+    
+    def _encode_batch(self, texts: List[str]) -> List[List[int]]:
         """
-        # Create a mapping of text positions to page numbers
-        full_text = '\n\n'.join([page['text'] for page in pages])
+        Encode several texts at once, using all CPU cores.
         
-        for chunk in chunks:
-            chunk_text = chunk['text']
+        Args:
+            texts: Texts to encode
             
-            # Find where this chunk appears in the full document
-            # Simple approach: search for chunk start in full text
-            position = full_text.find(chunk_text[:100])  # Use first 100 chars to find position
+        Returns:
+            Tokens of each text
+        """
+        if not texts:
+            return []
+        return self.tokenizer.encode_ordinary_batch(texts, num_threads=self.num_threads)
+    
+    def _token_windows(self, tokens: List[int]) -> List[List[int]]:
+        """
+        Cut tokens into chunk_size windows, each overlapping the previous one
+        by chunk_overlap tokens.
+        
+        Args:
+            tokens: Tokens to cut
             
-            if position != -1:
-                # Calculate which page this position falls in
-                current_pos = 0
-                for i, page in enumerate(pages):
-                    page_length = len(page['text'])
-                    if current_pos <= position < current_pos + page_length:
-                        chunk['page_number'] = page['page_num']
-                        break
-                    current_pos += page_length + 2  # +2 for \n\n
-            else:
-                # Default to page 1 if not found
-                chunk['page_number'] = 1
-
+        Returns:
+            Token windows covering all tokens, in order
+        """
+        step = max(self.chunk_size - self.chunk_overlap, 1)
+        windows = []
+        start = 0
+        while start + self.chunk_size < len(tokens):
+            windows.append(tokens[start:start + self.chunk_size])
+            start += step
+        windows.append(tokens[start:])
+        return windows
+    
+    def _overlap_tokens(self, tokens: List[int]) -> List[int]:
+        """
+        Get the last chunk_overlap tokens of a chunk (the start of the next one).
+        
+        Args:
+            tokens: Tokens of the chunk
+            
+        Returns:
+            Copy of the overlapping tokens
+        """
+        return tokens[max(len(tokens) - self.chunk_overlap, 0):]
+    
+    @staticmethod
+    def _page_starts(pages: List[Dict]) -> List[int]:
+        """
+        Offset of each page in the document text (pages joined with blank lines).
+        
+        Args:
+            pages: List of page dictionaries from document extraction
+        
+        Returns:
+            Start offset of each page, ascending
+        """
+        page_starts = []
+        offset = 0
+        for page in pages:
+            page_starts.append(offset)
+            offset += len(page['text']) + 2
+        return page_starts
 
 # Example usage (for testing)
 if __name__ == "__main__":
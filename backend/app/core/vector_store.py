@@ -8,16 +8,222 @@ Uses sentence-transformers for local embeddings (no API required).
 """
 
 import os
-from typing import List, Dict, Optional
+import functools
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+import threading
+import numpy as np
 import chromadb
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
+from .cache import EmbeddingCache, LRUCache
+
+# Optional: FAISS in-memory index (faster search than ChromaDB)
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Optional: ONNX Runtime for an exported (e.g. int8-quantized) embedding model
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:
+    onnxruntime = None
 
 # Load environment variables
 load_dotenv()
 
 
+@functools.lru_cache(maxsize=4)
+def _load_embedding_model(model_name: str, quantize_int8: bool = False) -> SentenceTransformer:
+    """
+    Load a sentence-transformer model, once per process.
+    
+    All vector stores using the same model share its weights (and GPU
+    memory) instead of each loading their own copy.
+    
+    Args:
+        model_name: Name of sentence-transformer model to load
+        quantize_int8: Quantize Linear weights to int8 (CPU only; on a GPU
+                       the model runs in fp16 instead)
+        
+    Returns:
+        Loaded model
+    """
+    # Initialize sentence-transformer model for local embeddings
+    # This runs locally, no API calls needed
+    print(f"Loading embedding model: {model_name}...")
+    model = SentenceTransformer(model_name)
+    print("✓ Embedding model loaded")
+    
+    if str(model.device).startswith("cuda"):
+        # FP16 weights on the GPU: about twice the throughput on tensor cores,
+        # with practically unchanged vectors
+        model.half()
+    elif quantize_int8:
+        # int8 Linear weights on CPU (dynamic quantization): faster encoding
+        # and a smaller model, with slightly different vectors (re-index
+        # existing documents after switching)
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print("✓ Embedding model quantized to int8")
+    return model
+
+
+class OnnxEmbeddingModel:
+    """
+    Sentence embedding model run with ONNX Runtime.
+    
+    A drop-in for SentenceTransformer.encode() (mean pooling, optional L2
+    normalization). Used with an int8-quantized export, it encodes several
+    times faster than the PyTorch model on CPU (int8 VNNI kernels).
+    
+    Export the model once with
+        optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 onnx/
+    quantize it with onnxruntime.quantization.quantize_dynamic(
+    "onnx/model.onnx", "onnx/model.int8.onnx", weight_type=QuantType.QInt8),
+    then set EMBEDDING_ONNX_MODEL=onnx/model.int8.onnx (tokenizer.json must be
+    in the same directory).
+    """
+    
+    # Same input limit as the sentence-transformers MiniLM/MPNet models
+    MAX_SEQ_LENGTH = 256
+    
+    device = "cpu"
+    
+    def __init__(self, model_path: str):
+        """
+        Load the ONNX model and its tokenizer.
+        
+        Args:
+            model_path: Path of the .onnx file
+        """
+        self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        
+        self.tokenizer = Tokenizer.from_file(os.path.join(os.path.dirname(model_path), "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+    
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False
+    ) -> np.ndarray:
+        """
+        Embed texts (same arguments as SentenceTransformer.encode()).
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Texts per forward pass
+            convert_to_numpy: Ignored (always returns a numpy array)
+            normalize_embeddings: L2-normalize the embeddings
+            show_progress_bar: Ignored
+            
+        Returns:
+            Float32 embedding matrix, one row per text
+        """
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            inputs = {
+                'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+                'attention_mask': attention_mask,
+                'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64)
+            }
+            token_embeddings = self.session.run(
+                None, {name: value for name, value in inputs.items() if name in self.input_names}
+            )[0]
+            
+            # Mean pooling over the real (non-padding) tokens
+            mask = attention_mask[:, :, None].astype(np.float32)
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            batches.append(embeddings.astype(np.float32))
+        
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(embeddings):
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        """
+        Get the embedding size (same as SentenceTransformer's method).
+        
+        Returns:
+            Number of dimensions per embedding
+        """
+        dim = self.session.get_outputs()[0].shape[-1]
+        # Exports with a symbolic hidden size: embed a text to find out
+        return dim if isinstance(dim, int) else self.encode([""]).shape[1]
+
+
+@functools.lru_cache(maxsize=4)
+def _load_onnx_model(model_path: str) -> OnnxEmbeddingModel:
+    """
+    Load an ONNX embedding model, once per process.
+    
+    Args:
+        model_path: Path of the .onnx file
+        
+    Returns:
+        Loaded model
+    """
+    print(f"Loading ONNX embedding model: {model_path}...")
+    model = OnnxEmbeddingModel(model_path)
+    print("✓ ONNX embedding model loaded")
+    return model
+
+
+def _chunk_metadata(chunk: Dict[str, any], policy_name: Optional[str]) -> Dict[str, str]:
+    """
+    Build the stored metadata of a chunk: every field except the text, as strings.
+    
+    Copies the chunk dict in one C-level call and only converts the values
+    that aren't strings already (most are), instead of a str() call per field.
+    
+    Args:
+        chunk: Chunk dictionary (from TextChunker)
+        policy_name: Policy name to record, if any
+        
+    Returns:
+        Metadata dictionary
+    """
+    metadata = dict(chunk)
+    metadata.pop('text', None)
+    for key, value in metadata.items():
+        if type(value) is not str:
+            metadata[key] = str(value)
+    if policy_name:
+        metadata['policy_name'] = policy_name
+    return metadata
+
+
+class _StoreEmbeddingFunction(EmbeddingFunction):
+    """
+    ChromaDB embedding function backed by a VectorStore's own model.
+    
+    Registered on the collection so anything ChromaDB embeds itself (e.g.
+    query_texts, or add() with documents only) uses the same model and
+    embedding cache as store_chunks(), never ChromaDB's default model.
+    """
+    
+    def __init__(self, store: "VectorStore"):
+        self._store = store
+    
+    def __call__(self, input: Documents) -> Embeddings:
+        # ChromaDB 0.4 validates embedding-function output as Python lists
+        return self._store._encode_batch(list(input)).tolist()
+
+
 class VectorStore:
     """
     Manages embedding generation and vector database storage.
@@ -28,6 +234,25 @@ class VectorStore:
     3. Enables semantic search: find relevant chunks even with different wording
     """
     
+    # Maximum records per ChromaDB add() call (Chroma rejects larger batches)
+    MAX_ADD_BATCH = 5000
+    
+    # Chunks encoded and written per step when storing
+    STORE_SLICE_SIZE = 1024
+    
+    # Texts per embedding model forward pass (bigger on a GPU, where larger
+    # batches keep it busy instead of launching many small kernels)
+    EMBED_BATCH_SIZE = 128
+    GPU_EMBED_BATCH_SIZE = 256
+    
+    # Query embeddings kept in memory (384 floats each for MiniLM)
+    QUERY_EMBEDDING_CACHE_SIZE = 1024
+    
+    # Also store each policy's chunks in a collection of its own, so
+    # policy-filtered searches walk a small HNSW graph instead of the whole
+    # collection with a per-node id filter (costs a second copy of each chunk)
+    POLICY_SHARDS = True
+    
     def __init__(self, db_path: str = "./chroma_db", collection_name: str = "policy_documents", embedding_model_name: str = "all-MiniLM-L6-v2"):
         """
         Initialize the vector store.
@@ -38,11 +263,7 @@ class VectorStore:
             embedding_model_name: Name of sentence-transformer model to use
                                  Options: "all-MiniLM-L6-v2" (fast), "all-mpnet-base-v2" (better quality)
         """
-        # Initialize sentence-transformer model for local embeddings
-        # This runs locally, no API calls needed
-        print(f"Loading embedding model: {embedding_model_name}...")
-        self.embedding_model = SentenceTransformer(embedding_model_name)
-        print("✓ Embedding model loaded")
+        self._init_embeddings(db_path, embedding_model_name)
         
         # Initialize ChromaDB client
         # Persistent client stores data on disk (not just in memory)
@@ -53,12 +274,281 @@ class VectorStore:
         
         # Get or create the collection
         # Collection is like a table in a database
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"description": "Insurance policy documents and chunks"}
+        self.collection_name = collection_name
+        self._embedding_function = embedding_function = _StoreEmbeddingFunction(self)
+        try:
+            # Existing collections keep the distance metric they were built with
+            self.collection = self.client.get_collection(
+                name=collection_name,
+                embedding_function=embedding_function
+            )
+        except ValueError:
+            # Embeddings are L2-normalized, so inner product is cosine
+            # similarity: one dot product per candidate in the HNSW search
+            self.collection = self.client.get_or_create_collection(
+                name=collection_name,
+                metadata={"description": "Insurance policy documents and chunks", "hnsw:space": "ip"},
+                embedding_function=embedding_function
+            )
+        
+        # Scores are reported on the L2 distance scale (2 - 2*cos) whatever the
+        # metric, so they don't depend on when the collection was created
+        space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        self._hnsw_space = space
+        self._l2_distance_scale = 1.0 if space == "l2" else 2.0
+        
+        # Per-policy collections (see POLICY_SHARDS) opened so far
+        self._policy_collections = {}
+        self._policy_collections_lock = threading.Lock()
+        
+        # Policy names kept in a sidecar file, so listing policies doesn't
+        # read every chunk's metadata (built from the collection if missing)
+        self._policy_index_path = os.path.join(db_path, f"{collection_name}_policies.json")
+        self._policy_index = None
+        self._policy_index_mtime = None
+        self._policy_index_lock = threading.RLock()
+    
+    def _load_policy_index(self) -> set:
+        """
+        Get the set of stored policy names.
+        
+        Re-read when the sidecar file changed (e.g. another process stored
+        a policy), and rebuilt from the collection if there is none.
+        
+        Returns:
+            Set of policy names (shared, don't modify)
+        """
+        try:
+            mtime = os.stat(self._policy_index_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        
+        if mtime is None:
+            # First use with this database: scan the metadata once
+            metadatas = self.collection.get(include=["metadatas"])['metadatas']
+            self._save_policy_index({m['policy_name'] for m in metadatas if 'policy_name' in m})
+        elif self._policy_index is None or mtime != self._policy_index_mtime:
+            try:
+                with open(self._policy_index_path, 'r', encoding='utf-8') as f:
+                    self._policy_index = set(json.load(f))
+                self._policy_index_mtime = mtime
+            except (OSError, ValueError):
+                os.remove(self._policy_index_path)
+                return self._load_policy_index()
+        return self._policy_index
+    
+    def _save_policy_index(self, policy_names: set) -> None:
+        """
+        Replace the stored policy names.
+        
+        Args:
+            policy_names: Set of policy names
+        """
+        os.makedirs(os.path.dirname(self._policy_index_path) or ".", exist_ok=True)
+        temp_path = f"{self._policy_index_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(policy_names), f, ensure_ascii=False)
+        os.replace(temp_path, self._policy_index_path)
+        self._policy_index = policy_names
+        self._policy_index_mtime = os.stat(self._policy_index_path).st_mtime_ns
+    
+    def _policy_collection_name(self, policy_name: str) -> str:
+        """
+        Name of a policy's own collection.
+        
+        Collection names only allow a few characters (and 63 of them), so
+        the policy name is hashed.
+        
+        Args:
+            policy_name: Name of the policy
+            
+        Returns:
+            Collection name
+        """
+        digest = hashlib.sha1(policy_name.encode('utf-8')).hexdigest()[:16]
+        return f"{self.collection_name[:40]}-p-{digest}"
+    
+    def _policy_collection(self, policy_name: str, create: bool = False):
+        """
+        Get a policy's own collection.
+        
+        A policy stored before it had one has its chunks copied over from
+        the main collection when the collection is created.
+        
+        Args:
+            policy_name: Name of the policy
+            create: Create the collection if it doesn't exist
+            
+        Returns:
+            Collection, or None if it doesn't exist (and create is False)
+        """
+        with self._policy_collections_lock:
+            collection = self._policy_collections.get(policy_name)
+            if collection is not None:
+                return collection
+            
+            name = self._policy_collection_name(policy_name)
+            try:
+                collection = self.client.get_collection(
+                    name=name,
+                    embedding_function=self._embedding_function
+                )
+            except ValueError:
+                if not create:
+                    return None
+                collection = self.client.get_or_create_collection(
+                    name=name,
+                    metadata={"policy_name": policy_name, "hnsw:space": self._hnsw_space},
+                    embedding_function=self._embedding_function
+                )
+                # Copy the chunks the main collection already has for this policy
+                stored = self.collection.get(
+                    where={"policy_name": policy_name},
+                    include=["embeddings", "documents", "metadatas"]
+                )
+                for start in range(0, len(stored['ids']), self.MAX_ADD_BATCH):
+                    end = start + self.MAX_ADD_BATCH
+                    collection.add(
+                        ids=stored['ids'][start:end],
+                        embeddings=stored['embeddings'][start:end],
+                        documents=stored['documents'][start:end],
+                        metadatas=stored['metadatas'][start:end]
+                    )
+            
+            self._policy_collections[policy_name] = collection
+            return collection
+    
+    def _add_slice(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]) -> None:
+        """
+        Write one slice of chunks to the main collection and, with
+        POLICY_SHARDS, to their policies' own collections.
+        
+        Args:
+            ids: Chunk IDs
+            embeddings: Embedding matrix (row i is chunk i)
+            documents: Chunk texts
+            metadatas: Chunk metadata
+        """
+        rows_by_policy = {}
+        if self.POLICY_SHARDS:
+            for row, metadata in enumerate(metadatas):
+                if 'policy_name' in metadata:
+                    rows_by_policy.setdefault(metadata['policy_name'], []).append(row)
+        
+        # Opened (and back-filled) before this slice reaches the main collection
+        policy_collections = {
+            policy_name: self._policy_collection(policy_name, create=True)
+            for policy_name in rows_by_policy
+        }
+        
+        self.collection.add(
+            ids=ids,
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas
         )
+        
+        for policy_name, rows in rows_by_policy.items():
+            policy_collections[policy_name].add(
+                ids=[ids[row] for row in rows],
+                embeddings=embeddings[rows],
+                documents=[documents[row] for row in rows],
+                metadatas=[metadatas[row] for row in rows]
+            )
     
-    def generate_embedding(self, text: str) -> List[float]:
+    def _init_embeddings(self, db_path: str, embedding_model_name: str) -> None:
+        """
+        Load the embedding model and open the embedding cache.
+        
+        Args:
+            db_path: Database directory (the cache file is stored there)
+            embedding_model_name: Name of sentence-transformer model to use
+        """
+        # Shared with other vector stores using the same model
+        quantize_int8 = os.getenv("EMBEDDING_QUANTIZATION", "").lower() == "int8"
+        onnx_path = os.getenv("EMBEDDING_ONNX_MODEL")
+        if onnx_path and onnxruntime is None:
+            print("⚠ EMBEDDING_ONNX_MODEL is set but onnxruntime/tokenizers are not installed, using PyTorch")
+            onnx_path = None
+        
+        if onnx_path:
+            # Exported model replaces the PyTorch one (vectors cached separately)
+            onnx_path = os.path.expanduser(onnx_path)
+            self.embedding_model = _load_onnx_model(onnx_path)
+            embedding_model_name += f":onnx:{os.path.basename(onnx_path)}"
+        else:
+            self.embedding_model = _load_embedding_model(embedding_model_name, quantize_int8)
+        self.db_path = db_path
+        
+        # sentence-transformers picks CUDA automatically when available
+        self.embed_batch_size = self.EMBED_BATCH_SIZE
+        if str(self.embedding_model.device).startswith("cuda"):
+            import torch
+            torch.set_float32_matmul_precision("high")  # TF32 matmuls on Ampere+ GPUs
+            self.embed_batch_size = self.GPU_EMBED_BATCH_SIZE
+            embedding_model_name += ":fp16"  # Cache its vectors separately
+            print(f"✓ Encoding on GPU ({self.embedding_model.device}, fp16), batch size {self.embed_batch_size}")
+        elif quantize_int8 and not onnx_path:
+            embedding_model_name += ":int8"  # Cache its vectors separately
+        
+        # Persistent embedding cache next to the database: re-ingesting a
+        # document or repeating a question never re-embeds the same text
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(db_path, "embedding_cache.sqlite3"),
+            model_name=embedding_model_name
+        )
+        
+        # Recent single-text (query) embeddings in memory, in front of the
+        # SQLite cache: repeated questions skip the model and the database
+        self._query_embeddings = LRUCache(maxsize=self.QUERY_EMBEDDING_CACHE_SIZE)
+        
+        # Rewritten whenever chunks are stored or deleted, so results derived
+        # from the stored chunks (e.g. cached answers, also in other worker
+        # processes) can tell they are stale
+        self._data_version_path = os.path.join(db_path, "data_version")
+    
+    def data_version(self) -> str:
+        """
+        Get the version of the stored chunks.
+        
+        Changes whenever chunks are stored or deleted through any vector store
+        on this database, so it can be used to key results derived from them.
+        
+        Returns:
+            Version string ("" if the chunks were never changed)
+        """
+        try:
+            with open(self._data_version_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return ""
+    
+    def _bump_data_version(self) -> None:
+        """Give the stored chunks a new version (see data_version)."""
+        os.makedirs(os.path.dirname(self._data_version_path) or ".", exist_ok=True)
+        temp_path = f"{self._data_version_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(os.urandom(8).hex())
+        os.replace(temp_path, self._data_version_path)
+    
+    def _embed_query(self, text: str) -> np.ndarray:
+        """
+        Embed one text, reusing recent results.
+        
+        Args:
+            text: Text to embed (e.g. a search query)
+            
+        Returns:
+            Normalized float32 embedding (shared, don't modify)
+        """
+        embedding = self._query_embeddings.get(text)
+        if embedding is None:
+            embedding = self._encode_batch([text])[0]
+            embedding.setflags(write=False)  # Handed out by generate_embedding()
+            self._query_embeddings.put(text, embedding)
+        return embedding
+    
+    def generate_embedding(self, text: str) -> np.ndarray:
         """
         Convert text into an embedding vector using sentence-transformers.
         
@@ -73,14 +563,14 @@ class VectorStore:
             text: Text to convert to embedding
             
         Returns:
-            List of floats (the embedding vector)
+            Embedding vector (read-only 1-D float32 numpy array)
         """
-        # Generate embedding using local sentence-transformer model
-        # encode() returns a numpy array, convert to list
-        embedding = self.embedding_model.encode(text, convert_to_numpy=True).tolist()
-        return embedding
+        # Generate embedding using local sentence-transformer model (or the cache),
+        # kept as numpy - no Python float per dimension
+        # (normalized like stored chunks, so distances are comparable)
+        return self._embed_query(text)
     
-    def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+    def generate_embeddings_batch(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for multiple texts at once (faster for batches).
         
@@ -88,11 +578,49 @@ class VectorStore:
             texts: List of texts to convert to embeddings
             
         Returns:
-            List of embedding vectors
+            Embedding matrix (float32 numpy array, one row per text)
         """
         # Process in batch for efficiency
-        embeddings = self.embedding_model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-        return embeddings.tolist()
+        return self._encode_batch(texts)
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts in large batches, returning a (len(texts), dim) array.
+        
+        Texts already in the embedding cache are not re-encoded; only the
+        misses go through the model, and their vectors are cached.
+        
+        Args:
+            texts: List of texts to convert to embeddings
+            
+        Returns:
+            Normalized float32 embedding matrix ((0, dim) for no texts)
+        """
+        if not texts:
+            return np.empty((0, self.embedding_model.get_sentence_embedding_dimension()), dtype=np.float32)
+        
+        hashes = [EmbeddingCache.text_hash(text) for text in texts]
+        vectors = self.embedding_cache.get_many(set(hashes))
+        
+        # Encode each distinct missing text once
+        missing = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in vectors:
+                missing.setdefault(text_hash, text)
+        
+        if missing:
+            encoded = self.embedding_model.encode(
+                list(missing.values()),
+                batch_size=self.embed_batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=len(missing) > self.embed_batch_size
+            )
+            new_vectors = dict(zip(missing, encoded.astype(np.float32)))
+            self.embedding_cache.put_many(new_vectors)
+            vectors.update(new_vectors)
+        
+        return np.stack([vectors[text_hash] for text_hash in hashes])
     
     def store_chunks(self, chunks: List[Dict[str, any]], policy_name: Optional[str] = None) -> None:
         """
@@ -107,42 +635,72 @@ class VectorStore:
             chunks: List of chunk dictionaries (from TextChunker)
             policy_name: Optional name to label all chunks from this policy
         """
+        self.store_chunks_bulk([(chunks, policy_name)])
+    
+    def store_chunks_bulk(self, chunk_groups: List[Tuple[List[Dict[str, any]], Optional[str]]]) -> int:
+        """
+        Store chunks from several policies with one embedding pass and as few
+        ChromaDB add() calls as possible.
+        
+        Args:
+            chunk_groups: List of (chunks, policy_name) pairs
+            
+        Returns:
+            Number of chunks stored
+        """
         # Prepare data for storage
         ids = []  # Unique IDs for each chunk
         documents = []  # Original text chunks
         metadatas = []  # Metadata (section, page, file name, etc.)
         
-        # Extract texts for batch embedding generation
-        texts = []
-        for i, chunk in enumerate(chunks):
-            # Generate unique ID (combination of policy name and chunk index)
-            chunk_id = f"{policy_name or 'policy'}_{chunk.get('chunk_index', i)}"
-            ids.append(chunk_id)
-            
-            # Store the original text
-            texts.append(chunk['text'])
-            documents.append(chunk['text'])
-            
-            # Store metadata (everything except the text itself)
-            metadata = {k: str(v) for k, v in chunk.items() if k != 'text'}
-            if policy_name:
-                metadata['policy_name'] = policy_name
-            metadatas.append(metadata)
+        for chunks, policy_name in chunk_groups:
+            for i, chunk in enumerate(chunks):
+                # Generate unique ID (combination of policy name and chunk index)
+                chunk_id = f"{policy_name or 'policy'}_{chunk.get('chunk_index', i)}"
+                ids.append(chunk_id)
+                
+                # Store the original text
+                documents.append(chunk['text'])
+                
+                # Store metadata (everything except the text itself)
+                metadatas.append(_chunk_metadata(chunk, policy_name))
         
-        # Generate embeddings in batch (much faster than one-by-one)
-        print(f"Generating embeddings for {len(chunks)} chunks...")
-        embeddings = self.generate_embeddings_batch(texts)
+        if not ids:
+            return 0
         
-        # Add to ChromaDB collection
+        # Generate embeddings in batch (much faster than one-by-one) and add
+        # them to ChromaDB slice by slice. While one slice is written (SQLite
+        # and HNSW index), the next one is encoded, so at most two slices of
+        # vectors are held in memory however many chunks are ingested.
         # ChromaDB automatically handles indexing for fast search
-        self.collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas
-        )
+        print(f"Generating embeddings for {len(ids)} chunks...")
+        step = min(self.STORE_SLICE_SIZE, self.MAX_ADD_BATCH)
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            pending = None
+            for start in range(0, len(ids), step):
+                end = start + step
+                # Kept as a numpy array: ChromaDB accepts it directly
+                embeddings = self._encode_batch(documents[start:end])
+                if pending is not None:
+                    pending.result()  # Previous slice written (re-raises its errors)
+                pending = writer.submit(
+                    self._add_slice,
+                    ids[start:end],
+                    embeddings,
+                    documents[start:end],
+                    metadatas[start:end]
+                )
+            if pending is not None:
+                pending.result()
+        
+        stored_policies = {m['policy_name'] for m in metadatas if 'policy_name' in m}
+        with self._policy_index_lock:
+            if not stored_policies <= self._load_policy_index():
+                self._save_policy_index(self._load_policy_index() | stored_policies)
+        self._bump_data_version()
         
-        print(f"✓ Stored {len(chunks)} chunks in vector database")
+        print(f"✓ Stored {len(ids)} chunks in vector database")
+        return len(ids)
     
     def search(self, query: str, top_k: int = 5, policy_filter: Optional[str] = None) -> List[Dict[str, any]]:
         """
@@ -164,15 +722,22 @@ class VectorStore:
         # Generate embedding for the query
         query_embedding = self.generate_embedding(query)
         
-        # Prepare filter if policy name specified
+        # Prepare filter if policy name specified: search the policy's own
+        # collection if it has one, else filter the main collection
+        collection = self.collection
         where_filter = None
         if policy_filter:
-            where_filter = {"policy_name": policy_filter}
+            policy_collection = self._policy_collection(policy_filter) if self.POLICY_SHARDS else None
+            if policy_collection is not None:
+                collection = policy_collection
+            else:
+                where_filter = {"policy_name": policy_filter}
         
         # Search in ChromaDB
         # ChromaDB uses cosine similarity to find closest embeddings
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
+        # (ChromaDB 0.4 query() only accepts lists; one vector is cheap to convert)
+        results = collection.query(
+            query_embeddings=[query_embedding.tolist()],
             n_results=top_k,
             where=where_filter
         )
@@ -187,7 +752,7 @@ class VectorStore:
         
         for i, (doc, metadata, distance) in enumerate(zip(documents, metadatas, distances)):
             # Calculate similarity score (1 - distance, converted to percentage)
-            similarity = (1 - distance) * 100
+            similarity = (1 - distance * self._l2_distance_scale) * 100
             
             formatted_results.append({
                 'text': doc,
@@ -198,6 +763,98 @@ class VectorStore:
         
         return formatted_results
     
+    def search_by_metadata(self, policy: str, section_matches: str, top_k: int = 5) -> List[Dict[str, any]]:
+        """
+        Find a policy's chunks by section title (keyword prefilter, no embedding).
+        
+        Used as a fast path for templated questions about a named coverage
+        category, e.g. "What is the Medical coverage in this policy?".
+        
+        Args:
+            policy: Policy to search
+            section_matches: Keywords that must all appear in the section title
+                             (case-insensitive)
+            top_k: Maximum number of results
+            
+        Returns:
+            Matching chunks in document order (same format as search()),
+            empty if no section title matches
+        """
+        keywords = section_matches.lower().split()
+        if not keywords:
+            return []
+        
+        formatted_results = []
+        for doc, metadata in self._policy_chunks(policy):
+            title = str(metadata.get('section_title', '')).lower()
+            if all(keyword in title for keyword in keywords):
+                formatted_results.append({
+                    'text': doc,
+                    'metadata': metadata,
+                    'similarity_score': 100.0,  # Exact section match
+                    'rank': len(formatted_results) + 1
+                })
+                if len(formatted_results) == top_k:
+                    break
+        
+        return formatted_results
+    
+    def doc_hash(self, policy_name: str) -> str:
+        """
+        Fingerprint of a policy's stored content.
+        
+        Changes whenever the policy is re-ingested with different text, so it
+        can be used to key results derived from the policy.
+        
+        Args:
+            policy_name: Name of the policy
+            
+        Returns:
+            Hex SHA-256 digest of the policy's chunk texts (in document order)
+        """
+        digest = hashlib.sha256()
+        for doc, _ in self._policy_chunks(policy_name):
+            digest.update(doc.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+    
+    def _policy_chunks(self, policy_name: str) -> List[Tuple[str, Dict]]:
+        """
+        Get all chunks of a policy, in document order.
+        
+        Args:
+            policy_name: Name of the policy
+            
+        Returns:
+            List of (text, metadata) pairs
+        """
+        stored = self.collection.get(
+            where={"policy_name": policy_name},
+            include=["documents", "metadatas"]
+        )
+        chunks = list(zip(stored['documents'], stored['metadatas']))
+        chunks.sort(key=lambda chunk: int(chunk[1].get('chunk_index', 0)))
+        return chunks
+    
+    def count_chunks(self, policy_name: str, file_hash: Optional[str] = None) -> int:
+        """
+        Count the stored chunks of a policy.
+        
+        Args:
+            policy_name: Name of the policy
+            file_hash: Optional source file hash; only chunks stored from
+                       that exact file version are counted
+            
+        Returns:
+            Number of matching chunks
+        """
+        where_filter = {"policy_name": policy_name}
+        if file_hash:
+            where_filter = {"$and": [where_filter, {"file_hash": file_hash}]}
+        
+        # Fetch IDs only (no documents or embeddings)
+        return len(self.collection.get(where=where_filter, include=[])['ids'])
+    
     def delete_policy(self, policy_name: str) -> None:
         """
         Delete all chunks belonging to a specific policy.
@@ -210,6 +867,19 @@ class VectorStore:
         self.collection.delete(
             where={"policy_name": policy_name}
         )
+        
+        # And the policy's own collection
+        with self._policy_collections_lock:
+            self._policy_collections.pop(policy_name, None)
+            try:
+                self.client.delete_collection(self._policy_collection_name(policy_name))
+            except ValueError:
+                pass  # Never had one
+        
+        with self._policy_index_lock:
+            if policy_name in self._load_policy_index():
+                self._save_policy_index(self._load_policy_index() - {policy_name})
+        self._bump_data_version()
         print(f"Deleted all chunks for policy: {policy_name}")
     
     def list_policies(self) -> List[str]:
@@ -219,16 +889,9 @@ class VectorStore:
         Returns:
             List of policy names
         """
-        # Get all items from collection
-        all_items = self.collection.get()
-        
-        # Extract unique policy names from metadata
-        policy_names = set()
-        for metadata in all_items.get('metadatas', []):
-            if 'policy_name' in metadata:
-                policy_names.add(metadata['policy_name'])
-        
-        return list(policy_names)
+        # Maintained when chunks are stored or deleted (no collection scan)
+        with self._policy_index_lock:
+            return list(self._load_policy_index())
     
     def get_collection_info(self) -> Dict:
         """
@@ -247,6 +910,326 @@ class VectorStore:
         }
 
 
+class FAISSVectorStore(VectorStore):
+    """
+    VectorStore variant backed by a FAISS index instead of ChromaDB.
+    
+    Same API as VectorStore, with much lower per-query overhead for
+    search-heavy work (batch summaries, country checks).
+    
+    How it works:
+    1. Embeddings are normalized, so inner product == cosine similarity
+    2. Vectors go into an HNSW (approximate) or flat (exact) FAISS index
+    3. Texts and metadata are kept in parallel lists (row i == vector i)
+    4. Index and metadata are saved to db_path after every change
+    
+    Policy-filtered searches score only that policy's rows (exact).
+    
+    The "hnsw_fp16" / "hnsw_int8" index types store scalar-quantized vectors
+    (2x / 4x smaller than float32, faster to build); queries stay float32,
+    so ranking is nearly unchanged for 384-d sentence embeddings.
+    """
+    
+    # HNSW graph degree and search breadth (higher = more accurate, slower)
+    HNSW_M = 32
+    HNSW_EF_SEARCH = 64
+    
+    # Scalar quantizer (faiss.ScalarQuantizer attribute) per quantized index type
+    QUANTIZERS = {
+        "hnsw_fp16": "QT_fp16",
+        "hnsw_int8": "QT_8bit"
+    }
+    
+    def __init__(self, db_path: str = "./chroma_db", collection_name: str = "policy_documents", embedding_model_name: str = "all-MiniLM-L6-v2", index_type: str = "hnsw"):
+        """
+        Initialize the FAISS vector store (loading a saved index if present).
+        
+        Args:
+            db_path: Directory where the index and metadata are saved
+            collection_name: Name used for the saved index files
+            embedding_model_name: Name of sentence-transformer model to use
+            index_type: "hnsw" (approximate, fast), "flat" (exact), or
+                        "hnsw_fp16" / "hnsw_int8" (HNSW over quantized vectors)
+        """
+        if faiss is None:
+            raise ImportError("FAISS backend requires faiss: pip install faiss-cpu")
+        
+        self._init_embeddings(db_path, embedding_model_name)
+        
+        self.index_type = index_type
+        # Row copy used for filtered search and rebuilds (kept at index precision)
+        self._dtype = np.float16 if index_type in self.QUANTIZERS else np.float32
+        self._index_path = os.path.join(db_path, f"{collection_name}.faiss")
+        self._meta_path = os.path.join(db_path, f"{collection_name}.faiss.json")
+        
+        self.index = None
+        self._vectors = None  # (n, dim), row-aligned with the lists below
+        self._ids = []
+        self._documents = []
+        self._metadatas = []
+        self._policy_rows = {}  # policy_name -> row numbers
+        
+        if os.path.exists(self._index_path) and os.path.exists(self._meta_path):
+            self.index = faiss.read_index(self._index_path)
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self._ids = saved['ids']
+            self._documents = saved['documents']
+            self._metadatas = saved['metadatas']
+            self._vectors = self.index.reconstruct_n(0, self.index.ntotal).astype(self._dtype)
+            self._rebuild_policy_rows()
+            print(f"✓ Loaded FAISS index with {len(self._ids)} chunks")
+    
+    def _new_index(self, dim: int):
+        """
+        Create an empty FAISS index.
+        
+        Args:
+            dim: Embedding dimension
+            
+        Returns:
+            FAISS index using inner product
+        """
+        if self.index_type == "flat":
+            return faiss.IndexFlatIP(dim)
+        
+        if self.index_type in self.QUANTIZERS:
+            quantizer = getattr(faiss.ScalarQuantizer, self.QUANTIZERS[self.index_type])
+            index = faiss.IndexHNSWSQ(dim, quantizer, self.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWFlat(dim, self.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = self.HNSW_EF_SEARCH
+        return index
+    
+    def _add_to_index(self, embeddings: np.ndarray) -> None:
+        """
+        Add vectors to the index, training the quantizer first if needed.
+        
+        int8 quantization learns per-dimension value ranges from the first
+        vectors added (and again whenever the index is rebuilt).
+        
+        Args:
+            embeddings: (n, dim) embedding matrix
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if not self.index.is_trained:
+            self.index.train(embeddings)
+        self.index.add(embeddings)
+    
+    def _rebuild_policy_rows(self) -> None:
+        """Recompute the policy_name -> rows lookup."""
+        self._policy_rows = {}
+        for row, metadata in enumerate(self._metadatas):
+            if 'policy_name' in metadata:
+                self._policy_rows.setdefault(metadata['policy_name'], []).append(row)
+    
+    def _save(self) -> None:
+        """Write the index and metadata to disk."""
+        os.makedirs(os.path.dirname(self._index_path) or ".", exist_ok=True)
+        faiss.write_index(self.index, self._index_path)
+        with open(self._meta_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'ids': self._ids,
+                'documents': self._documents,
+                'metadatas': self._metadatas
+            }, f, ensure_ascii=False)
+    
+    def store_chunks_bulk(self, chunk_groups: List[Tuple[List[Dict[str, any]], Optional[str]]]) -> int:
+        """
+        Store chunks from several policies with one embedding pass and one index add.
+        
+        Args:
+            chunk_groups: List of (chunks, policy_name) pairs
+            
+        Returns:
+            Number of chunks stored
+        """
+        existing = set(self._ids)
+        ids = []
+        documents = []
+        metadatas = []
+        
+        for chunks, policy_name in chunk_groups:
+            for i, chunk in enumerate(chunks):
+                chunk_id = f"{policy_name or 'policy'}_{chunk.get('chunk_index', i)}"
+                
+                # Existing IDs are skipped (as ChromaDB's add() does)
+                if chunk_id in existing:
+                    continue
+                existing.add(chunk_id)
+                ids.append(chunk_id)
+                
+                documents.append(chunk['text'])
+                
+                metadatas.append(_chunk_metadata(chunk, policy_name))
+        
+        if not ids:
+            return 0
+        
+        print(f"Generating embeddings for {len(ids)} chunks...")
+        embeddings = self._encode_batch(documents)
+        
+        if self.index is None:
+            self.index = self._new_index(embeddings.shape[1])
+            self._vectors = np.empty((0, embeddings.shape[1]), dtype=self._dtype)
+        self._add_to_index(embeddings)
+        self._vectors = np.vstack([self._vectors, embeddings.astype(self._dtype)])
+        
+        self._ids.extend(ids)
+        self._documents.extend(documents)
+        self._metadatas.extend(metadatas)
+        self._rebuild_policy_rows()
+        self._save()
+        self._bump_data_version()
+        
+        print(f"✓ Stored {len(ids)} chunks in FAISS index")
+        return len(ids)
+    
+    def search(self, query: str, top_k: int = 5, policy_filter: Optional[str] = None) -> List[Dict[str, any]]:
+        """
+        Search for relevant chunks using semantic similarity.
+        
+        Args:
+            query: User's question or search term
+            top_k: Number of results to return
+            policy_filter: Optional filter to search only in specific policy
+            
+        Returns:
+            List of relevant chunks with similarity scores
+        """
+        if self.index is None or not self._ids:
+            return []
+        
+        query_embedding = self._embed_query(query)
+        
+        if policy_filter:
+            # Score only this policy's rows (exact, and a policy is small)
+            rows = np.asarray(self._policy_rows.get(policy_filter, []), dtype=np.int64)
+            if not len(rows):
+                return []
+            scores = self._vectors[rows].astype(np.float32) @ query_embedding
+            k = min(top_k, len(rows))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            hits = zip(scores[best], rows[best])
+        else:
+            D, I = self.index.search(query_embedding.reshape(1, -1), min(top_k, len(self._ids)))
+            hits = ((score, row) for score, row in zip(D[0], I[0]) if row >= 0)
+        
+        formatted_results = []
+        for i, (score, row) in enumerate(hits):
+            # Same scale as VectorStore: ChromaDB's L2 distance on unit vectors is 2 - 2*cos
+            distance = 2 - 2 * float(score)
+            formatted_results.append({
+                'text': self._documents[row],
+                'metadata': self._metadatas[row],
+                'similarity_score': (1 - distance) * 100,
+                'rank': i + 1
+            })
+        
+        return formatted_results
+    
+    def _policy_chunks(self, policy_name: str) -> List[Tuple[str, Dict]]:
+        """
+        Get all chunks of a policy, in document order.
+        
+        Args:
+            policy_name: Name of the policy
+            
+        Returns:
+            List of (text, metadata) pairs
+        """
+        rows = self._policy_rows.get(policy_name, [])
+        return [(self._documents[row], self._metadatas[row]) for row in rows]
+    
+    def count_chunks(self, policy_name: str, file_hash: Optional[str] = None) -> int:
+        """
+        Count the stored chunks of a policy.
+        
+        Args:
+            policy_name: Name of the policy
+            file_hash: Optional source file hash; only chunks stored from
+                       that exact file version are counted
+            
+        Returns:
+            Number of matching chunks
+        """
+        rows = self._policy_rows.get(policy_name, [])
+        if file_hash:
+            return sum(1 for row in rows if self._metadatas[row].get('file_hash') == file_hash)
+        return len(rows)
+    
+    def delete_policy(self, policy_name: str) -> None:
+        """
+        Delete all chunks belonging to a specific policy.
+        
+        HNSW indexes don't support removal, so the index is rebuilt from the
+        remaining vectors.
+        
+        Args:
+            policy_name: Name of policy to delete
+        """
+        removed = set(self._policy_rows.get(policy_name, []))
+        if removed:
+            keep = [row for row in range(len(self._ids)) if row not in removed]
+            self._vectors = self._vectors[keep]
+            self._ids = [self._ids[row] for row in keep]
+            self._documents = [self._documents[row] for row in keep]
+            self._metadatas = [self._metadatas[row] for row in keep]
+            
+            self.index = self._new_index(self._vectors.shape[1])
+            if len(keep):
+                self._add_to_index(self._vectors)
+            self._rebuild_policy_rows()
+            self._save()
+            self._bump_data_version()
+        
+        print(f"Deleted all chunks for policy: {policy_name}")
+    
+    def list_policies(self) -> List[str]:
+        """
+        Get list of all unique policy names in the index.
+        
+        Returns:
+            List of policy names
+        """
+        return list(self._policy_rows)
+    
+    def get_collection_info(self) -> Dict:
+        """
+        Get statistics about the index.
+        
+        Returns:
+            Dictionary with collection statistics
+        """
+        policies = self.list_policies()
+        
+        return {
+            'total_chunks': len(self._ids),
+            'policies': policies,
+            'policy_count': len(policies)
+        }
+
+
+def create_vector_store(db_path: str = "./chroma_db", backend: Optional[str] = None, **kwargs) -> VectorStore:
+    """
+    Create the configured vector store.
+    
+    Args:
+        db_path: Database directory
+        backend: "chroma" (default) or "faiss"; read from VECTOR_STORE_BACKEND if not given
+        **kwargs: Passed to the store's constructor
+        
+    Returns:
+        VectorStore or FAISSVectorStore instance
+    """
+    backend = (backend or os.getenv("VECTOR_STORE_BACKEND", "chroma")).lower()
+    if backend == "faiss":
+        kwargs.setdefault("index_type", os.getenv("FAISS_INDEX_TYPE", "hnsw"))
+        return FAISSVectorStore(db_path=db_path, **kwargs)
+    return VectorStore(db_path=db_path, **kwargs)
+
+
 # Example usage (for testing)
 if __name__ == "__main__":
     # Initialize vector store
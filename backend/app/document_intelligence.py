@@ -6,22 +6,189 @@ Extracts travel information from itineraries, invoices, and other documents.
 """
 
 from typing import Dict, List, Optional
-import ollama
+from collections import Counter
+import functools
+import hashlib
 import json
+import os
 import re
-from datetime import datetime
+import threading
+from datetime import date, datetime
 
-# Import DocumentIngester if available (from core modules)
-try:
-    from core.document_ingestion import DocumentIngester
-except ImportError:
-    # Fallback: create minimal ingester if module not found
-    class DocumentIngester:
-        def extract_from_pdf(self, path):
-            with open(path, 'rb') as f:
-                return {'text': f.read().decode('utf-8', errors='ignore'), 'file_name': path}
-        def extract_from_docx(self, path):
-            return self.extract_from_pdf(path)
+# ollama and core.document_ingestion (PyMuPDF, Tesseract) are imported on
+# first use, so processes that never extract documents don't load them
+
+
+class _FallbackIngester:
+    """Minimal ingester used when core.document_ingestion is not available."""
+    
+    def __init__(self, use_ocr: bool = False):
+        pass
+    
+    def extract_from_pdf(self, path):
+        with open(path, 'rb') as f:
+            return {'text': f.read().decode('utf-8', errors='ignore'), 'file_name': path}
+    
+    def extract_from_docx(self, path):
+        return self.extract_from_pdf(path)
+
+
+# Bump when the extraction prompt or post-processing changes, so cached
+# results are not reused
+_TRAVEL_INFO_CACHE_VERSION = "v1"
+
+# Fields the LLM extracts, shared by the single and batch extraction prompts
+_EXTRACTION_FIELDS = """- destination: Country or city (primary destination)
+- departure_date: Departure date (format: YYYY-MM-DD)
+- return_date: Return date (format: YYYY-MM-DD)
+- duration_days: Trip duration in days (calculate if dates available)
+- travelers: Array of traveler names
+- traveler_count: Number of travelers
+- flight_numbers: Array of flight numbers (e.g., ["SQ123", "SQ456"])
+- airlines: Array of airline names
+- accommodation: Hotel or accommodation name
+- activities: Array of activities mentioned (e.g., ["skiing", "scuba diving"])
+- trip_type: Type of trip (e.g., "business", "leisure", "adventure")
+"""
+
+# Pattern-matching fallback: dates (simple patterns), flight numbers (e.g. SQ123, AA456)
+_DATE_RE = re.compile(r'\b(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})\b')
+_FLIGHT_RE = re.compile(r'\b([A-Z]{2}\d{3,4})\b')
+
+# Country names for the fallback (simple list - in production use NER), in
+# priority order, with the lowercase form searched for. Substring search in
+# the text lowercased once beats an IGNORECASE alternation regex ~6-10x, and
+# still beats a lowercase alternation regex ~2x even when no country matches
+# (every name is searched); a regex would also return the first country in
+# the text rather than in priority order.
+_FALLBACK_COUNTRIES = [
+    (country, country.lower())
+    for country in ['Japan', 'Singapore', 'Malaysia', 'Thailand', 'USA', 'UK', 'France']
+]
+
+def _parse_date(value: str) -> date:
+    """
+    Parse a YYYY-MM-DD date.
+    
+    date.fromisoformat is several times faster than strptime; strptime is
+    kept for dates it rejects but '%Y-%m-%d' accepts (e.g. "2024-3-5").
+    
+    Args:
+        value: Date string
+        
+    Returns:
+        Parsed date
+        
+    Raises:
+        ValueError: If value is not a valid date
+        TypeError: If value is not a string
+    """
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+# Digit runs, masked when comparing lines across pages ("Page 2 of 5")
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def _strip_boilerplate(pages: List[str], max_fraction: float = 0.7, min_pages: int = 3,
+                       edge_lines: int = 2) -> str:
+    """
+    Drop the header/footer lines repeated across the pages of a document.
+    
+    Only the first and last edge_lines lines of a page are candidates. One
+    of them (compared stripped, with numbers masked) is boilerplate if it
+    is a candidate on more than max_fraction of the pages. Documents with
+    fewer than min_pages pages are left alone: on two pages, a traveler's
+    name would look as repetitive as a header.
+    
+    Args:
+        pages: Text of each page
+        max_fraction: Share of pages above which a repeated line is dropped
+        min_pages: Fewest pages for which boilerplate is detected
+        edge_lines: Lines at the top and bottom of a page that may be
+                    headers/footers
+        
+    Returns:
+        Text of the pages without boilerplate lines, joined by blank lines
+    """
+    if len(pages) < min_pages:
+        return '\n\n'.join(pages)
+    
+    def edge_keys(lines):
+        edges = lines if len(lines) <= 2 * edge_lines else lines[:edge_lines] + lines[-edge_lines:]
+        return {_DIGITS_RE.sub('#', line.strip()) for line in edges} - {''}
+    
+    page_lines = [page.splitlines() for page in pages]
+    page_edge_keys = [edge_keys(lines) for lines in page_lines]
+    counts = Counter(key for keys in page_edge_keys for key in keys)
+    limit = max_fraction * len(pages)
+    boilerplate = {key for key, count in counts.items() if count > limit}
+    if not boilerplate:
+        return '\n\n'.join(pages)
+    
+    stripped_pages = []
+    for lines, keys in zip(page_lines, page_edge_keys):
+        drop = keys & boilerplate
+        n = len(lines)
+        stripped_pages.append('\n'.join(
+            line for i, line in enumerate(lines)
+            if not ((i < edge_lines or i >= n - edge_lines)
+                    and _DIGITS_RE.sub('#', line.strip()) in drop)
+        ))
+    return '\n\n'.join(stripped_pages)
+
+
+@functools.lru_cache(maxsize=1)
+def _token_encoder():
+    """
+    Get the tiktoken encoding used to measure excerpts (loaded once).
+    
+    Returns:
+        tiktoken cl100k_base encoding, or None if tiktoken is not installed
+        or its encoding file can't be loaded
+    """
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"⚠ tiktoken unavailable, truncating document text by characters: {e}")
+        return None
+
+
+def _truncate_tokens(text: str, max_tokens: int = 1000) -> str:
+    """
+    Cut text to its first max_tokens tokens.
+    
+    Tokens are counted with tiktoken's cl100k_base, a close enough proxy
+    for the Ollama model's tokenizer; without tiktoken, 4 characters count
+    as a token.
+    
+    Args:
+        text: Text to truncate
+        max_tokens: Tokens to keep
+        
+    Returns:
+        The longest prefix of text within max_tokens tokens
+    """
+    encoder = _token_encoder()
+    if encoder is None:
+        return text[:max_tokens * 4]
+    
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    # Decode bytes so a character split at the cut is dropped, not replaced
+    return encoder.decode_bytes(tokens[:max_tokens]).decode('utf-8', errors='ignore')
+
+
+# Coverage suggestion keywords, matched as substrings of the lowercased
+# destination (winter / water sports) or activities (adventure sports)
+_WINTER_DESTINATION_KEYWORDS = ('japan', 'snow', 'ski')
+_WATER_DESTINATION_KEYWORDS = ('island', 'beach', 'dive', 'snorkel')
+_ADVENTURE_KEYWORDS = ('ski', 'dive', 'scuba', 'hiking', 'climbing', 'parachute')
 
 
 class DocumentIntelligence:
@@ -36,15 +203,57 @@ class DocumentIntelligence:
     - Screenshots (with OCR)
     """
     
-    def __init__(self, llm_model: str = "llama3"):
+    # Same keep-alive and context size as PolicyQASystem: a different num_ctx
+    # makes Ollama reload the model, which the startup warmup has loaded
+    KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "2h")
+    NUM_CTX = 4096
+    
+    # Documents per LLM call in extract_travel_info_batch(): as many excerpts
+    # as fit in NUM_CTX with their answers
+    BATCH_MAX_DOCUMENTS = 2
+    
+    # Output budget per document: the extracted JSON is ~150-250 tokens, so a
+    # runaway generation is cut off early. format='json' output can trail off
+    # into blank lines, which the stop sequence ends.
+    EXTRACTION_NUM_PREDICT = 300
+    EXTRACTION_STOP = ['\n\n\n']
+    
+    # Longest accepted response per document (characters)
+    MAX_RESPONSE_CHARS = 4096
+    
+    # Tokens of document text sent to the LLM, after boilerplate removal
+    EXCERPT_MAX_TOKENS = 1000
+    
+    def __init__(self, llm_model: str = "llama3", cache_dir: Optional[str] = None):
         """
         Initialize document intelligence module.
         
         Args:
             llm_model: Ollama model to use for extraction
+            cache_dir: Directory for cached extraction results, keyed by the
+                       document text sent to the LLM (default:
+                       TRAVEL_INFO_CACHE_DIR or ~/.travel_info_cache; empty
+                       string disables the cache)
         """
         self.llm_model = llm_model
-        self.ingester = DocumentIngester(use_ocr=True)
+        if cache_dir is None:
+            cache_dir = os.getenv("TRAVEL_INFO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".travel_info_cache"))
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+    
+    @functools.cached_property
+    def ingester(self):
+        """
+        Document ingester (with OCR), created on the first PDF/Word upload.
+        
+        Returns:
+            DocumentIngester, or a plain-text fallback if the core module
+            or its dependencies are not available
+        """
+        try:
+            from core.document_ingestion import DocumentIngester
+        except ImportError:
+            DocumentIngester = _FallbackIngester
+        return DocumentIngester(use_ocr=True)
     
     def extract_travel_info(self, document_path: str) -> Dict:
         """
@@ -67,15 +276,7 @@ class DocumentIntelligence:
         """
         # Step 1: Extract text from document
         try:
-            if document_path.endswith('.pdf'):
-                extracted = self.ingester.extract_from_pdf(document_path)
-            elif document_path.endswith('.docx'):
-                extracted = self.ingester.extract_from_docx(document_path)
-            else:
-                # Try as text file
-                with open(document_path, 'r', encoding='utf-8') as f:
-                    extracted = {'text': f.read(), 'file_name': document_path}
-            
+            extracted = self._read_document(document_path)
             document_text = extracted['text']
         except Exception as e:
             return {
@@ -83,79 +284,312 @@ class DocumentIntelligence:
                 'error': f"Failed to extract text: {str(e)}"
             }
         
-        # Step 2: Use LLM to extract structured information
+        # Step 2: Use LLM to extract structured information, unless this exact
+        # text was extracted before (e.g. the same itinerary uploaded again).
+        # Only exact matches are reused: near-identical itineraries differ in
+        # exactly the details extracted (dates, names, flight numbers).
+        excerpt = self._document_excerpt(extracted)
+        cache_path = self._cache_path(excerpt)
+        extracted_info = self._load_cached(cache_path)
+        if extracted_info is None:
+            try:
+                extracted_info = self._extract_with_llm(excerpt)
+            except Exception:
+                # Fallback: try simple pattern matching
+                return self._extract_with_patterns(document_text)
+            self._store_cached(cache_path, extracted_info)
+        
+        return {
+            'success': True,
+            'extracted_info': extracted_info,
+            'source_file': extracted.get('file_name', document_path)
+        }
+    
+    def extract_travel_info_batch(self, document_paths: List[str]) -> List[Dict]:
+        """
+        Extract travel information from several documents.
+        
+        Documents not in the cache are sent to the LLM together, up to
+        BATCH_MAX_DOCUMENTS per call, so the instructions are processed once
+        per batch instead of once per document. If a batch response can't be
+        parsed, its documents are extracted one by one.
+        
+        Args:
+            document_paths: Paths to document files
+            
+        Returns:
+            One result per path, in order, as returned by extract_travel_info()
+        """
+        results: List[Optional[Dict]] = [None] * len(document_paths)
+        pending = []  # (index, document text, excerpt, cache path, file name)
+        
+        # Step 1: Extract text from each document, answering cached ones
+        for i, document_path in enumerate(document_paths):
+            try:
+                extracted = self._read_document(document_path)
+                document_text = extracted['text']
+            except Exception as e:
+                results[i] = {
+                    'success': False,
+                    'error': f"Failed to extract text: {str(e)}"
+                }
+                continue
+            
+            file_name = extracted.get('file_name', document_path)
+            excerpt = self._document_excerpt(extracted)
+            cache_path = self._cache_path(excerpt)
+            extracted_info = self._load_cached(cache_path)
+            if extracted_info is not None:
+                results[i] = {'success': True, 'extracted_info': extracted_info, 'source_file': file_name}
+            else:
+                pending.append((i, document_text, excerpt, cache_path, file_name))
+        
+        # Step 2: Extract the rest with the LLM, several documents per call
+        for start in range(0, len(pending), self.BATCH_MAX_DOCUMENTS):
+            batch = pending[start:start + self.BATCH_MAX_DOCUMENTS]
+            try:
+                batch_info = self._extract_batch_with_llm([excerpt for _, _, excerpt, _, _ in batch])
+            except Exception as e:
+                print(f"⚠ Batch extraction failed, extracting documents one by one: {e}")
+                batch_info = [None] * len(batch)
+            
+            for (i, document_text, excerpt, cache_path, file_name), extracted_info in zip(batch, batch_info):
+                if extracted_info is None:
+                    try:
+                        extracted_info = self._extract_with_llm(excerpt)
+                    except Exception:
+                        # Fallback: try simple pattern matching
+                        results[i] = self._extract_with_patterns(document_text)
+                        continue
+                self._store_cached(cache_path, extracted_info)
+                results[i] = {'success': True, 'extracted_info': extracted_info, 'source_file': file_name}
+        
+        return results
+    
+    def _read_document(self, document_path: str) -> Dict:
+        """
+        Extract the text of a document, choosing the extractor by extension.
+        
+        Args:
+            document_path: Path to document file
+            
+        Returns:
+            Dictionary with 'text' and 'file_name'
+        """
+        if document_path.endswith('.pdf'):
+            return self.ingester.extract_from_pdf(document_path)
+        if document_path.endswith('.docx'):
+            return self.ingester.extract_from_docx(document_path)
+        # Try as text file
+        with open(document_path, 'r', encoding='utf-8') as f:
+            return {'text': f.read(), 'file_name': document_path}
+    
+    def _document_excerpt(self, extracted: Dict) -> str:
+        """
+        Select the document text sent to the LLM.
+        
+        Repeated page headers/footers are dropped first, so the token budget
+        goes to the document body.
+        
+        Args:
+            extracted: Result of _read_document()
+            
+        Returns:
+            Document text without boilerplate, cut to EXCERPT_MAX_TOKENS tokens
+        """
+        pages = [page['text'] for page in extracted.get('pages') or []]
+        if not pages:
+            # Text without page information: pages only if form-feed separated
+            pages = extracted['text'].split('\f')
+        return _truncate_tokens(_strip_boilerplate(pages), self.EXCERPT_MAX_TOKENS)
+    
+    def _extract_with_llm(self, excerpt: str) -> Dict:
+        """
+        Ask the LLM for the travel information in a document.
+        
+        Args:
+            excerpt: Document text sent to the LLM (from _document_excerpt())
+            
+        Returns:
+            Extracted information dictionary
+            
+        Raises:
+            Exception: If the LLM call fails or doesn't return a JSON object
+        """
         prompt = f"""Extract travel information from this document. Return as JSON:
 
 Document text:
-{document_text[:3000]}  # Limit to first 3000 chars
+{excerpt}
 
 Extract the following information (use null if not found):
-- destination: Country or city (primary destination)
-- departure_date: Departure date (format: YYYY-MM-DD)
-- return_date: Return date (format: YYYY-MM-DD)
-- duration_days: Trip duration in days (calculate if dates available)
-- travelers: Array of traveler names
-- traveler_count: Number of travelers
-- flight_numbers: Array of flight numbers (e.g., ["SQ123", "SQ456"])
-- airlines: Array of airline names
-- accommodation: Hotel or accommodation name
-- activities: Array of activities mentioned (e.g., ["skiing", "scuba diving"])
-- trip_type: Type of trip (e.g., "business", "leisure", "adventure")
-
+{_EXTRACTION_FIELDS}
 Return ONLY valid JSON, no markdown:
 {{"destination": "...", "departure_date": "...", ...}}"""
         
-        try:
-            response = ollama.generate(
-                model=self.llm_model,
-                prompt=prompt,
-                options={'temperature': 0.1, 'num_predict': 500}
-            )
-            
-            # Parse JSON response
-            response_text = response['response'].strip()
-            
-            # Remove markdown code blocks if present
-            if '```json' in response_text:
-                response_text = response_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in response_text:
-                response_text = response_text.split('```')[1].split('```')[0].strip()
-            
-            # Clean up response
-            response_text = response_text.strip()
-            if response_text.startswith('{'):
-                extracted_info = json.loads(response_text)
-            else:
-                # Try to find JSON object in response
-                match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if match:
-                    extracted_info = json.loads(match.group())
-                else:
-                    raise ValueError("No JSON found in response")
+        import ollama
+        
+        # format='json' makes Ollama constrain the output to valid JSON (no
+        # markdown fences or prose to strip, and no tokens spent on them)
+        response = ollama.generate(
+            model=self.llm_model,
+            prompt=prompt,
+            format='json',
+            keep_alive=self.KEEP_ALIVE,
+            options={
+                'temperature': 0.1,
+                'num_predict': self.EXTRACTION_NUM_PREDICT,
+                'stop': self.EXTRACTION_STOP,
+                'num_ctx': self.NUM_CTX
+            }
+        )
+        
+        # Parse JSON response
+        if len(response['response']) > self.MAX_RESPONSE_CHARS:
+            raise ValueError("LLM response too long")
+        extracted_info = json.loads(response['response'])
+        if not isinstance(extracted_info, dict):
+            raise ValueError("Expected a JSON object")
+        
+        return self._complete_extracted_info(extracted_info)
+    
+    def _complete_extracted_info(self, extracted_info: Dict) -> Dict:
+        """
+        Fill in the fields derivable from other extracted fields.
+        
+        Args:
+            extracted_info: Extracted information dictionary from the LLM
             
-            # Calculate duration if dates available
-            if extracted_info.get('departure_date') and extracted_info.get('return_date'):
-                try:
-                    dep = datetime.strptime(extracted_info['departure_date'], '%Y-%m-%d')
-                    ret = datetime.strptime(extracted_info['return_date'], '%Y-%m-%d')
-                    duration = (ret - dep).days
-                    extracted_info['duration_days'] = duration
-                except:
-                    pass
+        Returns:
+            The same dictionary, with duration_days and traveler_count set
+            where possible
+        """
+        # Calculate duration if dates available
+        if extracted_info.get('departure_date') and extracted_info.get('return_date'):
+            try:
+                dep = _parse_date(extracted_info['departure_date'])
+                ret = _parse_date(extracted_info['return_date'])
+                duration = (ret - dep).days
+                extracted_info['duration_days'] = duration
+            except (TypeError, ValueError):
+                pass
+        
+        # Set traveler_count from travelers array if not set
+        if extracted_info.get('travelers') and not extracted_info.get('traveler_count'):
+            extracted_info['traveler_count'] = len(extracted_info['travelers'])
+        
+        return extracted_info
+    
+    def _extract_batch_with_llm(self, excerpts: List[str]) -> List[Dict]:
+        """
+        Ask the LLM for the travel information in several documents at once.
+        
+        Args:
+            excerpts: Document texts sent to the LLM (from _document_excerpt())
             
-            # Set traveler_count from travelers array if not set
-            if extracted_info.get('travelers') and not extracted_info.get('traveler_count'):
-                extracted_info['traveler_count'] = len(extracted_info['travelers'])
+        Returns:
+            Extracted information dictionaries, one per excerpt, in order
             
-            return {
-                'success': True,
-                'extracted_info': extracted_info,
-                'source_file': extracted.get('file_name', document_path)
+        Raises:
+            Exception: If the LLM call fails or doesn't return one JSON
+                       object per document
+        """
+        documents_text = "\n\n".join(
+            f"### DOC {i}\n{excerpt}" for i, excerpt in enumerate(excerpts)
+        )
+        prompt = f"""Extract travel information from each of these {len(excerpts)} documents. Return as JSON:
+
+Documents:
+{documents_text}
+
+For each document, extract the following information (use null if not found):
+{_EXTRACTION_FIELDS}
+Return ONLY valid JSON, no markdown, with one object per document in document order:
+{{"documents": [{{"destination": "...", "departure_date": "...", ...}}, ...]}}"""
+        
+        import ollama
+        
+        # An object wrapping the array: format='json' output is steered
+        # towards a top-level object. The context must hold every excerpt
+        # (up to EXCERPT_MAX_TOKENS each) plus one answer per document.
+        response = ollama.generate(
+            model=self.llm_model,
+            prompt=prompt,
+            format='json',
+            keep_alive=self.KEEP_ALIVE,
+            options={
+                'temperature': 0.1,
+                'num_predict': self.EXTRACTION_NUM_PREDICT * len(excerpts),
+                'stop': self.EXTRACTION_STOP,
+                'num_ctx': self.NUM_CTX
             }
+        )
+        
+        # Parse JSON response (accept a bare array too)
+        if len(response['response']) > self.MAX_RESPONSE_CHARS * len(excerpts):
+            raise ValueError("LLM response too long")
+        parsed = json.loads(response['response'])
+        documents = parsed.get('documents') if isinstance(parsed, dict) else parsed
+        if (not isinstance(documents, list) or len(documents) != len(excerpts)
+                or not all(isinstance(info, dict) for info in documents)):
+            raise ValueError(f"Expected a JSON array of {len(excerpts)} objects")
+        
+        return [self._complete_extracted_info(info) for info in documents]
+    
+    def _cache_path(self, excerpt: str) -> Optional[str]:
+        """
+        Cache file for the extraction result of a document text.
+        
+        Args:
+            excerpt: Document text sent to the LLM
             
-        except Exception as e:
-            # Fallback: try simple pattern matching
-            return self._extract_with_patterns(document_text)
+        Returns:
+            Path of the cache file (hash of the whitespace-normalized text,
+            model and cache version), or None if caching is disabled
+        """
+        if not self.cache_dir:
+            return None
+        key = f"{_TRAVEL_INFO_CACHE_VERSION}\0{self.llm_model}\0{' '.join(excerpt.split())}"
+        digest = hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=20).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+    
+    def _load_cached(self, cache_path: Optional[str]) -> Optional[Dict]:
+        """
+        Read a cached extraction result.
+        
+        Args:
+            cache_path: Path from _cache_path()
+            
+        Returns:
+            Extracted information dictionary, or None if not cached (or unreadable)
+        """
+        if not cache_path:
+            return None
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _store_cached(self, cache_path: Optional[str], extracted_info: Dict) -> None:
+        """
+        Write an extraction result to the cache (failures are ignored).
+        
+        Args:
+            cache_path: Path from _cache_path()
+            extracted_info: Extracted information dictionary
+        """
+        if not cache_path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write then rename, so a concurrent reader never sees a partial file
+            # (uploads are extracted in worker threads, so the name is per thread)
+            temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(extracted_info, f, ensure_ascii=False)
+            os.replace(temp_path, cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠ Could not cache extracted travel info: {e}")
     
     def _extract_with_patterns(self, text: str) -> Dict:
         """
@@ -178,23 +612,21 @@ Return ONLY valid JSON, no markdown:
         }
         
         # Find dates (simple patterns)
-        date_pattern = r'\b(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})\b'
-        dates = re.findall(date_pattern, text)
+        dates = _DATE_RE.findall(text)
         if dates:
             extracted['departure_date'] = dates[0]
             if len(dates) > 1:
                 extracted['return_date'] = dates[1]
         
         # Find flight numbers (e.g., SQ123, AA456)
-        flight_pattern = r'\b([A-Z]{2}\d{3,4})\b'
-        flights = re.findall(flight_pattern, text)
+        flights = _FLIGHT_RE.findall(text)
         if flights:
             extracted['flight_numbers'] = flights[:5]  # Limit to 5
         
-        # Find country names (simple list - in production use NER)
-        countries = ['Japan', 'Singapore', 'Malaysia', 'Thailand', 'USA', 'UK', 'France']
-        for country in countries:
-            if country.lower() in text.lower():
+        # Find country names (first in priority order that is mentioned)
+        lowered = text.lower()
+        for country, country_lower in _FALLBACK_COUNTRIES:
+            if country_lower in lowered:
                 extracted['destination'] = country
                 break
         
@@ -222,21 +654,24 @@ Return ONLY valid JSON, no markdown:
             'notes': []
         }
         
-        destination = trip_info.get('destination', '').lower()
-        activities = trip_info.get('activities', [])
-        duration = trip_info.get('duration_days', 0)
+        # (extracted fields are null when not found)
+        destination = (trip_info.get('destination') or '').lower()
+        activities = trip_info.get('activities') or []
+        duration = trip_info.get('duration_days') or 0
+        
+        # All activities lowercased once, one per line (no keyword spans lines)
+        activities_text = '\n'.join(map(str, activities)).lower()
         
         # Destination-based suggestions
-        if any(c in destination for c in ['japan', 'snow', 'ski']):
+        if any(c in destination for c in _WINTER_DESTINATION_KEYWORDS):
             suggestions['recommended_coverage'].append('Winter sports coverage')
             suggestions['notes'].append('Your destination may require special coverage')
         
-        if any(c in destination for c in ['island', 'beach', 'dive', 'snorkel']):
+        if any(c in destination for c in _WATER_DESTINATION_KEYWORDS):
             suggestions['recommended_coverage'].append('Water sports coverage')
         
         # Activity-based suggestions
-        adventure_keywords = ['ski', 'dive', 'scuba', 'hiking', 'climbing', 'parachute']
-        if any(any(kw in act.lower() for kw in adventure_keywords) for act in activities):
+        if any(kw in activities_text for kw in _ADVENTURE_KEYWORDS):
             suggestions['recommended_coverage'].append('Adventure sports coverage')
             suggestions['notes'].append('Adventure activities detected - special coverage recommended')
         
@@ -261,12 +696,14 @@ Return ONLY valid JSON, no markdown:
         
         return suggestions
     
-    def auto_fill_quote_form(self, trip_info: Dict) -> Dict:
+    def auto_fill_quote_form(self, trip_info: Dict, coverage_suggestions: Optional[Dict] = None) -> Dict:
         """
         Auto-fill insurance quote form fields from trip information.
         
         Args:
             trip_info: Extracted trip information
+            coverage_suggestions: Result of suggest_coverage_from_trip() for
+                                  this trip, if already computed
             
         Returns:
             Dictionary with form field values
@@ -283,7 +720,8 @@ Return ONLY valid JSON, no markdown:
         }
         
         # Add coverage suggestions
-        coverage_suggestions = self.suggest_coverage_from_trip(trip_info)
+        if coverage_suggestions is None:
+            coverage_suggestions = self.suggest_coverage_from_trip(trip_info)
         form_data['suggested_coverage'] = coverage_suggestions['recommended_coverage']
         form_data['optional_coverage'] = coverage_suggestions['optional_coverage']
         
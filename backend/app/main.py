@@ -5,25 +5,45 @@ FastAPI server for Conversational Insurance Assistant
 Handles all stages: Entry, Conversation, Document Intelligence, Commerce, and Predictive Intelligence
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Form, Body
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Body
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional, Dict
+from typing import BinaryIO, List, Optional, Dict, Tuple
+from functools import lru_cache
+import asyncio
+import hashlib
 import os
 from dotenv import load_dotenv
+from pydantic import BaseModel, ConfigDict
 import shutil
 import tempfile
 from pathlib import Path
+import json
 
-# Import backend modules
+# Import backend modules (document intelligence, commerce and predictive
+# intelligence are imported by their factories below, on first use)
 from conversation_engine import ConversationEngine
-from document_intelligence import DocumentIntelligence
-from commerce import QuoteService
-from predictive_intelligence import PredictiveIntelligence
+from core.cache import TTLCache
+
+# Use orjson for all JSON responses if available (much faster than stdlib json,
+# e.g. for answers carrying their source chunks), streamed NDJSON lines included
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+    
+    def _ndjson_line(event: Dict) -> bytes:
+        """Serialize one NDJSON event line."""
+        return orjson.dumps(event, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+except ImportError:
+    FastJSONResponse = JSONResponse
+    
+    def _ndjson_line(event: Dict) -> str:
+        """Serialize one NDJSON event line."""
+        return json.dumps(event, ensure_ascii=False) + "\n"
 
 # Import core engine modules (if available)
 try:
-    from core.vector_store import VectorStore
+    from core.vector_store import VectorStore, create_vector_store
     from core.rag_qa import PolicyQASystem
 except ImportError:
     VectorStore = None
@@ -35,7 +55,8 @@ load_dotenv()
 app = FastAPI(
     title="Conversational Insurance Assistant API",
     description="AI-driven chat experience for insurance policies",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware for frontend access
@@ -51,9 +72,6 @@ app.add_middleware(
 vector_store = None
 qa_system = None
 conversation_engine = None
-doc_intelligence = None
-quote_service = None
-predictive_intel = None
 llm_model = "llama3"
 
 
@@ -62,8 +80,7 @@ async def startup_event():
     """
     Initialize all components when server starts.
     """
-    global vector_store, qa_system, conversation_engine, doc_intelligence
-    global quote_service, predictive_intel, llm_model
+    global vector_store, qa_system, conversation_engine, llm_model
     
     # Get LLM model from environment
     llm_model = os.getenv("OLLAMA_MODEL", "llama3")
@@ -72,30 +89,80 @@ async def startup_event():
     try:
         if VectorStore:
             db_path = os.getenv("CHROMA_DB_PATH", "./chroma_db")
-            vector_store = VectorStore(db_path=db_path)
+            vector_store = create_vector_store(db_path=db_path)  # VECTOR_STORE_BACKEND selects chroma/faiss
             
             if PolicyQASystem:
                 qa_system = PolicyQASystem(vector_store, llm_model=llm_model)
     except Exception as e:
         print(f"Warning: Could not initialize vector store: {e}")
     
+    # Load the LLM now and keep it loaded (OLLAMA_KEEP_ALIVE), so the first
+    # question or document upload doesn't wait for it
+    if qa_system:
+        try:
+            qa_system.warmup()
+        except Exception as e:
+            print(f"Warning: Could not warm up LLM model {llm_model}: {e}")
+    
     # Initialize conversation engine
     conversation_engine = ConversationEngine(
         vector_store=vector_store,
         qa_system=qa_system,
-        llm_model=llm_model
+        llm_model=llm_model,
+        session_ttl=int(os.getenv("SESSION_TTL_SECONDS", 3600))
     )
     
-    # Initialize document intelligence
-    doc_intelligence = DocumentIntelligence(llm_model=llm_model)
+    print(f"✓ Conversational Insurance Assistant initialized with Ollama model: {llm_model}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Save state that is otherwise only written periodically.
+    """
+    if qa_system:
+        # Answers cached since the last background save
+        await asyncio.to_thread(qa_system.save_answer_cache)
+
+
+# Components only some endpoints use are created by the first request that
+# needs them, so workers that never serve them don't pay for their imports
+# (PyMuPDF/Tesseract, Numba) or initialization
+
+@lru_cache(maxsize=1)
+def get_doc_intelligence():
+    """
+    Get the document intelligence module, creating it on first use.
     
-    # Initialize quote service
-    quote_service = QuoteService(vector_store=vector_store, qa_system=qa_system)
+    Returns:
+        Shared DocumentIntelligence instance
+    """
+    from document_intelligence import DocumentIntelligence
+    return DocumentIntelligence(llm_model=llm_model)
+
+
+@lru_cache(maxsize=1)
+def get_quote_service():
+    """
+    Get the quote service, creating it on first use.
     
-    # Initialize predictive intelligence
-    predictive_intel = PredictiveIntelligence(llm_model=llm_model)
+    Returns:
+        Shared QuoteService instance
+    """
+    from commerce import QuoteService
+    return QuoteService(vector_store=vector_store, qa_system=qa_system)
+
+
+@lru_cache(maxsize=1)
+def get_predictive_intel():
+    """
+    Get the predictive intelligence module, creating it on first use.
     
-    print(f"✓ Conversational Insurance Assistant initialized with Ollama model: {llm_model}")
+    Returns:
+        Shared PredictiveIntelligence instance
+    """
+    from predictive_intelligence import PredictiveIntelligence
+    return PredictiveIntelligence(llm_model=llm_model)
 
 
 # ==================== Stage 0-2: Conversation Endpoints ====================
@@ -112,7 +179,7 @@ async def start_conversation(
     """
     try:
         result = conversation_engine.start_conversation(user_id, persona)
-        return JSONResponse(content=result)
+        return FastJSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error starting conversation: {str(e)}")
 
@@ -129,16 +196,43 @@ async def handle_message(
     Detects intent, extracts entities, and generates conversational response.
     """
     try:
-        response = conversation_engine.generate_response(
+        response = await conversation_engine.agenerate_response(
             message, 
             user_id, 
             use_qa_system=use_qa
         )
-        return JSONResponse(content=response)
+        return FastJSONResponse(content=response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
 
+@app.post("/api/conversation/message/stream")
+async def handle_message_stream(
+    user_id: str = Query(..., description="User identifier"),
+    message: str = Query(..., description="User message"),
+    use_qa: bool = Query(True, description="Use Q&A system for policy questions")
+):
+    """
+    Stage 2: Handle user message and stream the response.
+    
+    Returns newline-delimited JSON: {"type": "token", "content": ...} lines as
+    the reply is generated, then one {"type": "done", ...} line with the same
+    fields as /api/conversation/message.
+    """
+    async def events():
+        try:
+            async for event in conversation_engine.agenerate_response_stream(
+                message,
+                user_id,
+                use_qa_system=use_qa
+            ):
+                yield _ndjson_line(event)
+        except Exception as e:
+            yield _ndjson_line({'type': 'error', 'detail': f"Error processing message: {str(e)}"})
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.get("/api/conversation/session/{user_id}")
 async def get_session(user_id: str):
     """
@@ -147,10 +241,11 @@ async def get_session(user_id: str):
     Returns conversation history and context.
     """
     try:
-        session = conversation_engine.get_session(user_id)
-        if not session:
+        # Serialized by the engine, and reused until the session changes
+        body = conversation_engine.get_session_json(user_id)
+        if body is None:
             raise HTTPException(status_code=404, detail="Session not found")
-        return JSONResponse(content=session)
+        return Response(content=body, media_type="application/json")
     except HTTPException:
         raise
     except Exception as e:
@@ -169,7 +264,7 @@ async def update_persona(
         success = conversation_engine.update_persona(user_id, persona)
         if not success:
             raise HTTPException(status_code=400, detail="Invalid persona")
-        return JSONResponse(content={"success": True, "persona": persona})
+        return FastJSONResponse(content={"success": True, "persona": persona})
     except HTTPException:
         raise
     except Exception as e:
@@ -178,6 +273,83 @@ async def update_persona(
 
 # ==================== Stage 3: Document Intelligence Endpoints ====================
 
+# Read size when copying an upload to disk (shutil's default is 64KB)
+UPLOAD_COPY_BUFFER = 1 << 20
+
+# Serialized coverage suggestion / auto-fill responses: both are pure
+# functions of the posted trip info, so repeat requests (page re-mounts,
+# retries) reuse the response body
+DOCUMENT_RESPONSE_CACHE_TTL = 300  # seconds
+_document_responses = TTLCache(maxsize=4096, ttl=DOCUMENT_RESPONSE_CACHE_TTL)
+
+
+def _trip_info_cache_key(endpoint: str, trip_info: Dict) -> Tuple[str, str]:
+    """
+    Cache key for a response computed from posted trip information.
+    
+    Args:
+        endpoint: Name of the endpoint
+        trip_info: Request body
+        
+    Returns:
+        (endpoint, hash of the canonical JSON of trip_info)
+    """
+    canonical = json.dumps(trip_info, sort_keys=True, separators=(',', ':'))
+    return endpoint, hashlib.blake2b(canonical.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+def _extract_travel_info_from_upload(upload: BinaryIO, file_ext: str) -> Dict:
+    """
+    Save an upload to a temporary file and extract travel information from it.
+    
+    All blocking work (file copy, PDF parsing, LLM call), run in a worker
+    thread so other requests are served meanwhile. The temporary file is
+    removed even if extraction fails.
+    
+    Args:
+        upload: Uploaded file object (UploadFile.file)
+        file_ext: File extension, kept so the extractor can be chosen
+        
+    Returns:
+        Result of DocumentIntelligence.extract_travel_info()
+    """
+    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
+        shutil.copyfileobj(upload, tmp_file, UPLOAD_COPY_BUFFER)
+        tmp_path = tmp_file.name
+    
+    try:
+        return get_doc_intelligence().extract_travel_info(tmp_path)
+    finally:
+        os.unlink(tmp_path)
+
+
+def _extract_travel_info_from_uploads(uploads: List[Tuple[BinaryIO, str]]) -> List[Dict]:
+    """
+    Save several uploads to temporary files and extract travel information
+    from all of them, batching the LLM calls.
+    
+    Runs in a worker thread, like _extract_travel_info_from_upload(). The
+    temporary files are removed even if extraction fails.
+    
+    Args:
+        uploads: (file object, file extension) per uploaded file
+        
+    Returns:
+        Result of DocumentIntelligence.extract_travel_info_batch()
+    """
+    tmp_paths = []
+    try:
+        for upload, file_ext in uploads:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
+                tmp_paths.append(tmp_file.name)
+                shutil.copyfileobj(upload, tmp_file, UPLOAD_COPY_BUFFER)
+        
+        return get_doc_intelligence().extract_travel_info_batch(tmp_paths)
+    finally:
+        for tmp_path in tmp_paths:
+            os.unlink(tmp_path)
+
+
 @app.post("/api/document/extract")
 async def extract_travel_info(
     file: UploadFile = File(..., description="Travel document (itinerary, confirmation, etc.)")
@@ -188,19 +360,34 @@ async def extract_travel_info(
     Extracts destination, dates, travelers, flights, etc.
     """
     try:
-        # Save uploaded file temporarily
+        # Save uploaded file temporarily, extract information and clean up,
+        # off the event loop
         file_ext = os.path.splitext(file.filename)[1].lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-            shutil.copyfileobj(file.file, tmp_file)
-            tmp_path = tmp_file.name
+        result = await asyncio.to_thread(_extract_travel_info_from_upload, file.file, file_ext)
         
-        # Extract information
-        result = doc_intelligence.extract_travel_info(tmp_path)
+        return FastJSONResponse(content=result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error extracting info: {str(e)}")
+
+
+@app.post("/api/document/extract-batch")
+async def extract_travel_info_batch(
+    files: List[UploadFile] = File(..., description="Travel documents (itineraries, confirmations, etc.)")
+):
+    """
+    Stage 3: Extract travel information from several uploaded documents.
+    
+    Documents are sent to the LLM together, so N documents take far fewer
+    than N sequential LLM calls. Results are returned in upload order.
+    """
+    try:
+        uploads = [(file.file, os.path.splitext(file.filename)[1].lower()) for file in files]
+        results = await asyncio.to_thread(_extract_travel_info_from_uploads, uploads)
         
-        # Clean up
-        os.unlink(tmp_path)
+        for file, result in zip(files, results):
+            result['file_name'] = file.filename
         
-        return JSONResponse(content=result)
+        return FastJSONResponse(content={"results": results})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error extracting info: {str(e)}")
 
@@ -211,8 +398,13 @@ async def suggest_coverage(trip_info: Dict = Body(...)):
     Suggest insurance coverage based on trip information.
     """
     try:
-        suggestions = doc_intelligence.suggest_coverage_from_trip(trip_info)
-        return JSONResponse(content=suggestions)
+        cache_key = _trip_info_cache_key("suggest-coverage", trip_info)
+        body = _document_responses.get(cache_key)
+        if body is None:
+            suggestions = get_doc_intelligence().suggest_coverage_from_trip(trip_info)
+            body = FastJSONResponse(content=suggestions).body
+            _document_responses[cache_key] = body
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating suggestions: {str(e)}")
 
@@ -223,14 +415,97 @@ async def auto_fill_form(trip_info: Dict = Body(...)):
     Auto-fill quote form from trip information.
     """
     try:
-        form_data = doc_intelligence.auto_fill_quote_form(trip_info)
-        return JSONResponse(content=form_data)
+        cache_key = _trip_info_cache_key("auto-fill", trip_info)
+        body = _document_responses.get(cache_key)
+        if body is None:
+            form_data = get_doc_intelligence().auto_fill_quote_form(trip_info)
+            body = FastJSONResponse(content=form_data).body
+            _document_responses[cache_key] = body
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error auto-filling form: {str(e)}")
 
 
+@app.post("/api/document/process")
+async def process_document(
+    file: UploadFile = File(..., description="Travel document (itinerary, confirmation, etc.)")
+):
+    """
+    Stage 3-4: Extract travel information from an uploaded document, then
+    suggest coverage, auto-fill the quote form and generate quotes.
+    
+    Replaces calling /api/document/extract, /api/document/suggest-coverage,
+    /api/document/auto-fill and /api/commerce/quotes one after another:
+    coverage suggestion and quote generation run concurrently once the
+    extraction is done.
+    """
+    try:
+        file_ext = os.path.splitext(file.filename)[1].lower()
+        extraction = await asyncio.to_thread(_extract_travel_info_from_upload, file.file, file_ext)
+        if not extraction.get('success'):
+            return FastJSONResponse(content={"extraction": extraction})
+        
+        trip_info = extraction['extracted_info']
+        doc_intelligence = get_doc_intelligence()
+        coverage, quotes_data = await asyncio.gather(
+            asyncio.to_thread(doc_intelligence.suggest_coverage_from_trip, trip_info),
+            asyncio.to_thread(get_quote_service().get_quotes, trip_info)
+        )
+        form_data = doc_intelligence.auto_fill_quote_form(trip_info, coverage_suggestions=coverage)
+        
+        return FastJSONResponse(content={
+            "extraction": extraction,
+            "coverage": coverage,
+            "form": form_data,
+            "quotes": quotes_data
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+
+
 # ==================== Stage 4: Commerce Endpoints ====================
 
+class TripInfo(BaseModel):
+    """
+    Trip details, as extracted from documents (all optional; unknown fields
+    are kept and passed on).
+    """
+    model_config = ConfigDict(extra='allow')
+    
+    destination: Optional[str] = None
+    departure_date: Optional[str] = None
+    return_date: Optional[str] = None
+    duration_days: Optional[int] = None
+    travelers: Optional[List[str]] = None
+    traveler_count: Optional[int] = None
+    flight_numbers: Optional[List[str]] = None
+    airlines: Optional[List[str]] = None
+    accommodation: Optional[str] = None
+    activities: Optional[List[str]] = None
+    trip_type: Optional[str] = None
+
+
+class UserInfo(BaseModel):
+    """
+    Policy holder details (all optional; unknown fields are kept and passed on).
+    """
+    model_config = ConfigDict(extra='allow')
+    
+    name: Optional[str] = None
+    email: Optional[str] = None
+    age: Optional[int] = None
+
+
+def _as_dict(model: BaseModel) -> Dict:
+    """
+    Convert a request model to the dictionary the services take.
+    
+    Only fields the client sent are included, so the services' defaults
+    (e.g. trip_info.get('duration_days', 7)) still apply to the others.
+    """
+    return model.model_dump(exclude_unset=True)
+
+
 @app.post("/api/commerce/quotes")
 async def get_quotes(trip_info: Dict = Body(...)):
     """
@@ -239,8 +514,8 @@ async def get_quotes(trip_info: Dict = Body(...)):
     Returns quote cards with prices and coverage details.
     """
     try:
-        quotes_data = quote_service.get_quotes(trip_info)
-        return JSONResponse(content=quotes_data)
+        quotes_data = get_quote_service().get_quotes(trip_info)
+        return FastJSONResponse(content=quotes_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating quotes: {str(e)}")
 
@@ -248,15 +523,17 @@ async def get_quotes(trip_info: Dict = Body(...)):
 @app.post("/api/commerce/purchase/initiate")
 async def initiate_purchase(
     quote_id: str = Query(..., description="Quote identifier"),
-    trip_info: Dict = Form(...),
-    user_info: Dict = Form(...)
+    trip_info: TripInfo = Body(...),
+    user_info: UserInfo = Body(...)
 ):
     """
     Initiate purchase flow - creates payment link.
+    
+    JSON body: {"trip_info": {...}, "user_info": {...}}
     """
     try:
-        result = quote_service.initiate_purchase(quote_id, trip_info, user_info)
-        return JSONResponse(content=result)
+        result = get_quote_service().initiate_purchase(quote_id, _as_dict(trip_info), _as_dict(user_info))
+        return FastJSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error initiating purchase: {str(e)}")
 
@@ -265,22 +542,61 @@ async def initiate_purchase(
 async def complete_purchase(
     transaction_id: str = Query(..., description="Transaction identifier"),
     quote_id: str = Query(..., description="Quote identifier"),
-    payment_data: Dict = Form(...),
-    trip_info: Dict = Form(...),
-    user_info: Dict = Form(...)
+    payment_data: Dict = Body(...),
+    trip_info: TripInfo = Body(...),
+    user_info: UserInfo = Body(...)
 ):
     """
     Complete purchase after payment - issues policy.
+    
+    JSON body: {"payment_data": {...}, "trip_info": {...}, "user_info": {...}}
     """
     try:
-        result = quote_service.complete_purchase(
-            transaction_id, payment_data, quote_id, trip_info, user_info
+        result = get_quote_service().complete_purchase(
+            transaction_id, payment_data, quote_id, _as_dict(trip_info), _as_dict(user_info)
         )
-        return JSONResponse(content=result)
+        return FastJSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error completing purchase: {str(e)}")
 
 
+class PurchaseRequest(BaseModel):
+    """
+    One purchase of a bulk purchase completion.
+    """
+    transaction_id: str
+    quote_id: str
+    payment_data: Dict = {}
+    trip_info: TripInfo = TripInfo()
+    user_info: UserInfo = UserInfo()
+
+
+@app.post("/api/commerce/purchase/complete-bulk")
+async def complete_purchases_bulk(purchases: List[PurchaseRequest] = Body(...)):
+    """
+    Complete many purchases after payment (e.g. B2B bulk issuance).
+    
+    Purchases are processed concurrently. Results are returned in request order.
+    
+    JSON body: [{"transaction_id": ..., "quote_id": ..., "payment_data": {...},
+    "trip_info": {...}, "user_info": {...}}, ...]
+    """
+    try:
+        results = await get_quote_service().complete_purchases_bulk([
+            {
+                'transaction_id': purchase.transaction_id,
+                'quote_id': purchase.quote_id,
+                'payment_data': purchase.payment_data,
+                'trip_info': _as_dict(purchase.trip_info),
+                'user_info': _as_dict(purchase.user_info)
+            }
+            for purchase in purchases
+        ])
+        return FastJSONResponse(content={"results": results})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error completing purchases: {str(e)}")
+
+
 # ==================== Stage 5: Predictive Intelligence Endpoints ====================
 
 @app.post("/api/predictive/risk-assessment")
@@ -294,8 +610,8 @@ async def assess_risk(
     Returns risk score, level, and recommendations.
     """
     try:
-        risk_profile = predictive_intel.assess_risk_profile(trip_info, user_info)
-        return JSONResponse(content=risk_profile)
+        risk_profile = get_predictive_intel().assess_risk_profile(trip_info, user_info)
+        return FastJSONResponse(content=risk_profile)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error assessing risk: {str(e)}")
 
@@ -310,8 +626,8 @@ async def predict_claims(
     Predict claim likelihood for a trip/policy combination.
     """
     try:
-        prediction = predictive_intel.predict_claim_likelihood(trip_info, policy_info, user_info)
-        return JSONResponse(content=prediction)
+        prediction = get_predictive_intel().predict_claim_likelihood(trip_info, policy_info, user_info)
+        return FastJSONResponse(content=prediction)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error predicting claims: {str(e)}")
 
@@ -328,8 +644,8 @@ async def get_smart_nudges(
     Examples: trip reminders, coverage suggestions, flight delay alerts.
     """
     try:
-        nudges = predictive_intel.generate_smart_nudges(user_id, trip_info, policy)
-        return JSONResponse(content={"nudges": nudges, "count": len(nudges)})
+        nudges = get_predictive_intel().generate_smart_nudges(user_id, trip_info, policy)
+        return FastJSONResponse(content={"nudges": nudges, "count": len(nudges)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating nudges: {str(e)}")
 
@@ -343,11 +659,11 @@ async def check_flight_delay(
     Check for flight delays and notify about coverage.
     """
     try:
-        nudge = predictive_intel.detect_flight_delay(flight_info, policy)
+        nudge = get_predictive_intel().detect_flight_delay(flight_info, policy)
         if nudge:
-            return JSONResponse(content=nudge)
+            return FastJSONResponse(content=nudge)
         else:
-            return JSONResponse(content={"delay_detected": False})
+            return FastJSONResponse(content={"delay_detected": False})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error checking flight delay: {str(e)}")
 
@@ -358,8 +674,10 @@ async def check_flight_delay(
 async def root():
     """
     API information and available endpoints.
+    
+    Static, so browsers and CDNs may cache it.
     """
-    return {
+    return FastJSONResponse(content={
         "message": "Conversational Insurance Assistant API",
         "version": "2.0.0",
         "stages": {
@@ -374,7 +692,7 @@ async def root():
             "commerce": "/api/commerce/*",
             "predictive": "/api/predictive/*"
         }
-    }
+    }, headers={"Cache-Control": "public, max-age=300"})
 
 
 @app.get("/api/health")
@@ -386,12 +704,19 @@ async def health_check():
         "status": "healthy",
         "components": {
             "conversation_engine": conversation_engine is not None,
-            "document_intelligence": doc_intelligence is not None,
-            "quote_service": quote_service is not None,
-            "predictive_intelligence": predictive_intel is not None,
+            # Lazily created components are available (created on first use)
+            "document_intelligence": True,
+            "quote_service": True,
+            "predictive_intelligence": True,
             "vector_store": vector_store is not None,
             "qa_system": qa_system is not None
         },
+        # Whether each lazily created component has been created yet
+        "loaded": {
+            "document_intelligence": get_doc_intelligence.cache_info().currsize > 0,
+            "quote_service": get_quote_service.cache_info().currsize > 0,
+            "predictive_intelligence": get_predictive_intel.cache_info().currsize > 0
+        },
         "llm_model": llm_model
     }
 
@@ -402,6 +727,19 @@ if __name__ == "__main__":
     
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 8000))
+    # Conversation sessions live in process memory, so several workers need
+    # a load balancer with sticky sessions (per user_id) in front
+    workers = int(os.getenv("WORKERS", 1))
     
-    uvicorn.run(app, host=host, port=port)
+    # loop/http "auto" pick uvloop and httptools when installed (uvicorn[standard];
+    # uvloop is not available on Windows) and fall back to asyncio/h11
+    uvicorn.run(
+        "main:app" if workers > 1 else app,  # worker processes import the app by name
+        host=host,
+        port=port,
+        workers=workers,
+        loop="auto",
+        http="auto",
+        access_log=os.getenv("ACCESS_LOG", "").lower() == "true"
+    )
 
@@ -5,9 +5,179 @@ Stage 5: Predictive Intelligence - Claims Prediction and Smart Nudges
 Analyzes patterns to predict risks and provide proactive recommendations.
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, NamedTuple, Optional, Union
 from datetime import datetime, timedelta
-import ollama
+from functools import lru_cache
+from types import MappingProxyType
+import numpy as np
+import re
+
+# Numba is optional - batch claim prediction falls back to plain NumPy without it
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _claim_kernel(winter, health, adventure, durations, ages, adventure_coverage):
+        """Risk level (0 = low, 1 = medium, 2 = high) and claim likelihood (%) per trip."""
+        n = durations.shape[0]
+        levels = np.empty(n, np.int64)
+        likelihoods = np.empty(n, np.int64)
+        for i in prange(n):
+            score = 0
+            if winter[i]:
+                score += 2
+            if health[i]:
+                score += 1
+            if adventure[i]:
+                score += 3
+            if durations[i] > 30:
+                score += 1
+            if ages[i] > 65:
+                score += 2
+            elif ages[i] != 0 and ages[i] < 25:
+                score += 1
+            
+            level = 0
+            likelihood = 15
+            if score >= 5:
+                level = 2
+                likelihood += 20
+            elif score >= 3:
+                level = 1
+                likelihood += 10
+            if adventure_coverage[i]:
+                likelihood += 5
+            levels[i] = level
+            likelihoods[i] = min(likelihood, 70)
+        return levels, likelihoods
+    
+    # Compile once at import so the first user request doesn't pay for it
+    _claim_kernel(
+        np.zeros(1, np.bool_), np.zeros(1, np.bool_), np.zeros(1, np.bool_),
+        np.ones(1, np.float64), np.zeros(1, np.float64), np.zeros(1, np.bool_)
+    )
+else:
+    _claim_kernel = None
+
+
+# Every ISO date form starts with a 4-digit year; anything else is
+# rejected without trying to parse it
+_ISO_DATE_RE = re.compile(r'\d{4}')
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> Optional[datetime]:
+    """Parse an ISO date/datetime string, None if malformed (memoized - the same trip dates repeat across polls)."""
+    if not _ISO_DATE_RE.match(value):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        # Date-shaped but invalid (e.g. month 13)
+        return None
+
+
+def _days_until(value, now: datetime) -> Optional[int]:
+    """
+    Whole days from now until an ISO date string.
+    
+    Args:
+        value: ISO date/datetime string, with or without a timezone
+        now: Current time, timezone-aware (local)
+        
+    Returns:
+        Days until the date (negative if past), None if not a valid date
+    """
+    target = _parse_iso(value) if isinstance(value, str) else None
+    if target is None:
+        return None
+    if target.tzinfo is None:
+        # Naive dates are local time
+        now = now.replace(tzinfo=None)
+    return (target - now).days
+
+
+# Smart nudge templates by nudge name (read-only; each result is a copy,
+# with {placeholders} in the message filled when the value is known)
+_NUDGES = MappingProxyType({
+    'trip_reminder': MappingProxyType({
+        'type': 'trip_reminder',
+        'priority': 'high',
+        'message': 'Your trip starts tomorrow! 📅 Would you like emergency assistance information?',
+        'action': 'get_emergency_info',
+        'icon': '✈️'
+    }),
+    'trip_start': MappingProxyType({
+        'type': 'trip_start',
+        'priority': 'high',
+        'message': 'Have a safe trip! 🛫 Keep your policy number handy: {policy_number}',
+        'action': 'show_policy',
+        'icon': '🎒'
+    }),
+    'ski_coverage': MappingProxyType({
+        'type': 'coverage_suggestion',
+        'priority': 'medium',
+        'message': 'Traveling to Japan in winter? ❄️ Consider adding ski coverage if you plan to hit the slopes!',
+        'action': 'upgrade_coverage',
+        'icon': '⛷️'
+    }),
+    'water_sports': MappingProxyType({
+        'type': 'coverage_suggestion',
+        'priority': 'medium',
+        'message': 'Scuba diving detected! 🏊 Make sure your policy covers water sports.',
+        'action': 'check_coverage',
+        'icon': '🤿'
+    }),
+    'policy_expiry': MappingProxyType({
+        'type': 'policy_expiry',
+        'priority': 'medium',
+        'message': 'Your policy expires in {days} days. Consider extending if needed!',
+        'action': 'extend_policy',
+        'icon': '⏰'
+    }),
+    'flight_delay': MappingProxyType({
+        'type': 'flight_delay',
+        'priority': 'high',
+        'message': 'Flight delay detected ({delay_minutes} minutes)! Your policy might cover this. Want to file a claim?',
+        'action': 'file_claim',
+        'icon': '✈️'
+    })
+})
+
+
+class NormalizedTrip(NamedTuple):
+    """Trip fields as the predictors read them, normalized once per trip."""
+    destination: str  # Lowercased ('' if unknown)
+    activities: str  # Lowercased, one activity per line
+    duration_days: float  # 7 if unknown
+    departure_date: Optional[str]
+    return_date: Optional[str]
+    
+    @classmethod
+    def from_dict(cls, trip_info: Union[Dict, 'NormalizedTrip']) -> 'NormalizedTrip':
+        """
+        Normalize a trip info dictionary (extracted fields are null when not found).
+        
+        Args:
+            trip_info: Trip information dictionary (returned as is if already normalized)
+            
+        Returns:
+            NormalizedTrip
+        """
+        if isinstance(trip_info, NormalizedTrip):
+            return trip_info
+        duration = trip_info.get('duration_days')
+        return cls(
+            (trip_info.get('destination') or '').lower(),
+            '\n'.join(trip_info.get('activities') or ()).lower(),
+            7 if duration is None else duration,
+            trip_info.get('departure_date'),
+            trip_info.get('return_date')
+        )
 
 
 class PredictiveIntelligence:
@@ -19,6 +189,65 @@ class PredictiveIntelligence:
     - Analyze claims patterns
     """
     
+    # Every attribute set in __init__ (no per-instance __dict__)
+    __slots__ = (
+        'llm_model', 'claims_patterns',
+        '_winter_re', '_health_re', '_adventure_re', '_ski_nudge_re', '_water_sports_re',
+        '_assess_cached', '_risk_profiles'
+    )
+    
+    # Share of each claim type in a predicted claim likelihood (based on
+    # historical patterns)
+    CLAIM_TYPE_SHARES = (
+        ('medical', 0.45),
+        ('baggage_loss', 0.25),
+        ('trip_delay', 0.20),
+        ('trip_cancellation', 0.10)
+    )
+    
+    # Risk rules in report order: (score weight, risk factor); rule i sets
+    # bit 1 << i of a trip's rule mask
+    RISK_RULES = (
+        (2, 'Winter destination - higher medical claim risk'),
+        (1, 'Destination with higher health risks'),
+        (3, 'Adventure activities - significantly higher risk'),
+        (1, 'Extended trip - more opportunities for claims'),
+        (2, 'Senior traveler - higher medical risk'),
+        (1, 'Young traveler - higher activity risk')
+    )
+    WINTER = 1 << 0
+    HEALTH = 1 << 1
+    ADVENTURE = 1 << 2
+    LONG_TRIP = 1 << 3
+    SENIOR = 1 << 4
+    YOUNG = 1 << 5
+    
+    # Recommendations per risk level (static lookups, no LLM call)
+    RISK_RECOMMENDATIONS = {
+        'high': (
+            'Consider Premium plan for maximum coverage',
+            'Ensure adventure sports coverage if applicable',
+            'Purchase travel insurance well in advance'
+        ),
+        'medium': (
+            'Standard plan should provide adequate coverage',
+            'Review exclusions carefully'
+        ),
+        'low': (
+            'Basic or Standard plan should suffice',
+        )
+    }
+    
+    # Claim prevention tip for likelihoods (%) above each threshold, highest first
+    CLAIM_PREVENTION_TIPS = (
+        (40, 'High claim risk detected. Ensure you have comprehensive coverage and keep all receipts.'),
+        (25, 'Moderate claim risk. Make sure to understand your policy coverage before traveling.'),
+        (float('-inf'), 'Low claim risk expected. Standard coverage should be sufficient.')
+    )
+    
+    # Distinct trip signatures kept in the risk profile cache
+    RISK_PROFILE_CACHE_SIZE = 8192
+    
     def __init__(self, llm_model: str = "llama3"):
         """
         Initialize predictive intelligence module.
@@ -28,19 +257,38 @@ class PredictiveIntelligence:
         """
         self.llm_model = llm_model
         
-        # Mock historical claims data (in production, use real database)
-        self.claims_patterns = {
-            'high_risk_destinations': ['Japan (winter)', 'Nepal', 'India', 'Thailand (monsoon)'],
-            'high_risk_activities': ['skiing', 'scuba diving', 'mountain climbing'],
-            'common_claims': {
+        # Mock historical claims data (in production, use real database);
+        # read-only
+        self.claims_patterns = MappingProxyType({
+            'high_risk_destinations': ('Japan (winter)', 'Nepal', 'India', 'Thailand (monsoon)'),
+            'high_risk_activities': ('skiing', 'scuba diving', 'mountain climbing'),
+            'common_claims': MappingProxyType({
                 'medical': 45,  # 45% of claims
                 'baggage_loss': 25,
                 'trip_delay': 20,
                 'trip_cancellation': 10
-            }
-        }
+            })
+        })
+        
+        # Keyword matchers for risk factors (winter / health-risk destinations,
+        # adventure activities), run on lowercased text
+        self._winter_re = re.compile(r'japan|winter|snow')
+        self._health_re = re.compile(r'india|nepal|thailand')
+        self._adventure_re = re.compile(r'ski|dive|climb|parachute|bungee')
+        
+        # Keyword matchers for nudges (ski coverage / water sports checks)
+        self._ski_nudge_re = re.compile(r'japan|winter')
+        self._water_sports_re = re.compile(r'dive|scuba')
+        
+        # Risk profiles memoized per trip signature (dashboard refreshes and
+        # claim prediction re-assess the same trips)
+        self._assess_cached = lru_cache(maxsize=self.RISK_PROFILE_CACHE_SIZE)(self._assess_risk)
+        
+        # Risk profile per rule mask, built once (immutable, shared by all trips)
+        self._risk_profiles = tuple(self._build_risk_profile(mask) for mask in range(1 << len(self.RISK_RULES)))
     
-    def assess_risk_profile(self, trip_info: Dict, user_info: Optional[Dict] = None) -> Dict:
+    def assess_risk_profile(self, trip_info: Union[Dict, NormalizedTrip],
+                            user_info: Optional[Dict] = None) -> Dict:
         """
         Assess risk profile for a traveler/trip.
         
@@ -52,47 +300,82 @@ class PredictiveIntelligence:
         - Historical patterns
         
         Args:
-            trip_info: Trip information dictionary
+            trip_info: Trip information dictionary or NormalizedTrip
             user_info: Optional user information (age, health, etc.)
             
         Returns:
-            Risk profile dictionary with risk level and factors
+            Risk profile dictionary with risk level and factors (risk factors
+            and recommendations as shared, immutable tuples)
+        """
+        # Repeated trips are answered from the cache, keyed on the normalized
+        # fields the score depends on
+        trip = NormalizedTrip.from_dict(trip_info)
+        age = (user_info.get('age') if user_info else None) or 0  # 0 = unknown
+        
+        risk_score, risk_level, risk_factors, recommendations = self._assess_cached(
+            trip.destination, trip.activities, trip.duration_days, age
+        )
+        return {
+            'risk_score': risk_score,
+            'risk_level': risk_level,
+            'risk_factors': risk_factors,
+            'recommendations': recommendations
+        }
+    
+    def _assess_risk(self, destination: str, activities: str, duration, age) -> tuple:
+        """
+        Score a normalized trip signature (memoized per instance as _assess_cached).
+        
+        Sets one bit per fired risk rule and returns the prebuilt profile for
+        that rule mask.
+        
+        Args:
+            destination: Lowercased destination
+            activities: Lowercased activities, one per line
+            duration: Trip duration in days
+            age: Traveler age (0 = unknown)
+            
+        Returns:
+            Tuple of (risk score, risk level, risk factors, recommendations)
         """
-        risk_score = 0
-        risk_factors = []
+        mask = 0
         
         # Destination risk
-        destination = trip_info.get('destination', '').lower()
-        if any(dest in destination for dest in ['japan', 'winter', 'snow']):
-            risk_score += 2
-            risk_factors.append('Winter destination - higher medical claim risk')
-        
-        if any(dest in destination for dest in ['india', 'nepal', 'thailand']):
-            risk_score += 1
-            risk_factors.append('Destination with higher health risks')
-        
-        # Activity risk
-        activities = trip_info.get('activities', [])
-        adventure_keywords = ['ski', 'dive', 'climb', 'parachute', 'bungee']
-        if any(any(kw in act.lower() for kw in adventure_keywords) for act in activities):
-            risk_score += 3
-            risk_factors.append('Adventure activities - significantly higher risk')
+        if self._winter_re.search(destination):
+            mask |= self.WINTER
+        if self._health_re.search(destination):
+            mask |= self.HEALTH
+        
+        # Activity risk: all activities searched once (no keyword spans lines)
+        if self._adventure_re.search(activities):
+            mask |= self.ADVENTURE
         
         # Duration risk
-        duration = trip_info.get('duration_days', 7)
         if duration > 30:
-            risk_score += 1
-            risk_factors.append('Extended trip - more opportunities for claims')
+            mask |= self.LONG_TRIP
         
         # Age risk (if available)
-        if user_info and user_info.get('age'):
-            age = user_info['age']
+        if age:
             if age > 65:
-                risk_score += 2
-                risk_factors.append('Senior traveler - higher medical risk')
+                mask |= self.SENIOR
             elif age < 25:
-                risk_score += 1
-                risk_factors.append('Young traveler - higher activity risk')
+                mask |= self.YOUNG
+        
+        return self._risk_profiles[mask]
+    
+    def _build_risk_profile(self, mask: int) -> tuple:
+        """
+        Build the risk profile for a set of fired risk rules.
+        
+        Args:
+            mask: Rule mask (bit 1 << i set = RISK_RULES[i] fired)
+            
+        Returns:
+            Tuple of (risk score, risk level, risk factors, recommendations)
+        """
+        fired = [rule for i, rule in enumerate(self.RISK_RULES) if mask & (1 << i)]
+        risk_score = sum(weight for weight, _ in fired)
+        risk_factors = [factor for _, factor in fired]
         
         # Determine risk level
         if risk_score >= 5:
@@ -102,20 +385,16 @@ class PredictiveIntelligence:
         else:
             risk_level = 'low'
         
-        return {
-            'risk_score': risk_score,
-            'risk_level': risk_level,
-            'risk_factors': risk_factors,
-            'recommendations': self._get_risk_recommendations(risk_level, risk_factors)
-        }
+        return (risk_score, risk_level, tuple(risk_factors),
+                self._get_risk_recommendations(risk_level, risk_factors))
     
-    def predict_claim_likelihood(self, trip_info: Dict, policy_info: Dict, 
+    def predict_claim_likelihood(self, trip_info: Union[Dict, NormalizedTrip], policy_info: Dict, 
                                 user_info: Optional[Dict] = None) -> Dict:
         """
         Predict likelihood of making a claim.
         
         Args:
-            trip_info: Trip information
+            trip_info: Trip information dictionary or NormalizedTrip
             policy_info: Policy details
             user_info: Optional user information
             
@@ -126,7 +405,8 @@ class PredictiveIntelligence:
         base_likelihood = 15  # 15% base claim rate
         
         # Adjust based on risk factors
-        risk_profile = self.assess_risk_profile(trip_info, user_info)
+        trip = NormalizedTrip.from_dict(trip_info)
+        risk_profile = self.assess_risk_profile(trip, user_info)
         
         if risk_profile['risk_level'] == 'high':
             base_likelihood += 20
@@ -143,10 +423,7 @@ class PredictiveIntelligence:
         
         # Predict claim types
         claim_type_predictions = {
-            'medical': claim_likelihood * 0.45,  # Based on historical patterns
-            'baggage_loss': claim_likelihood * 0.25,
-            'trip_delay': claim_likelihood * 0.20,
-            'trip_cancellation': claim_likelihood * 0.10
+            claim_type: claim_likelihood * share for claim_type, share in self.CLAIM_TYPE_SHARES
         }
         
         return {
@@ -156,7 +433,105 @@ class PredictiveIntelligence:
             'recommendation': self._get_claim_prevention_tips(claim_likelihood, trip_info)
         }
     
-    def generate_smart_nudges(self, user_id: str, trip_info: Dict, 
+    def predict_claim_likelihood_batch(self, trip_infos: List[Dict], policy_infos: List[Dict],
+                                       user_infos: Optional[List[Optional[Dict]]] = None) -> List[Dict]:
+        """
+        Predict claim likelihood for many trips at once.
+        
+        Same results as predict_claim_likelihood() per trip, but the risk
+        scores and likelihoods are computed as NumPy arrays (one entry per
+        trip) instead of a Python call per trip - in a compiled, parallel
+        loop when Numba is installed.
+        
+        Args:
+            trip_infos: Trip information per trip
+            policy_infos: Policy details per trip
+            user_infos: Optional user information per trip
+            
+        Returns:
+            Prediction dictionaries, one per trip, in order
+            
+        Raises:
+            ValueError: If policy_infos (or user_infos) doesn't have one entry per trip
+        """
+        if len(policy_infos) != len(trip_infos):
+            raise ValueError(f"Expected one policy per trip: {len(trip_infos)} trips, {len(policy_infos)} policies")
+        if user_infos is not None and len(user_infos) != len(trip_infos):
+            raise ValueError(f"Expected one user (or None) per trip: {len(trip_infos)} trips, {len(user_infos)} users")
+        
+        if not trip_infos:
+            return []
+        if user_infos is None:
+            user_infos = [None] * len(trip_infos)
+        
+        # Build per-trip arrays: risk factor flags, duration, age, coverage
+        # (the same factors as assess_risk_profile)
+        factors = [self._risk_factor_flags(trip_info, user_info)
+                   for trip_info, user_info in zip(trip_infos, user_infos)]
+        winter = np.array([f[0] for f in factors], dtype=bool)
+        health = np.array([f[1] for f in factors], dtype=bool)
+        adventure = np.array([f[2] for f in factors], dtype=bool)
+        durations = np.array([f[3] for f in factors], dtype=np.float64)
+        ages = np.array([f[4] for f in factors], dtype=np.float64)  # 0 = unknown
+        adventure_coverage = np.array([
+            bool((policy_info.get('coverage') or {}).get('adventure_sports')) for policy_info in policy_infos
+        ], dtype=bool)
+        
+        if _claim_kernel is not None:
+            levels, likelihoods = _claim_kernel(winter, health, adventure, durations, ages, adventure_coverage)
+        else:
+            # Risk score and level (0 = low, 1 = medium, 2 = high)
+            senior = ages > 65
+            young = (ages != 0) & (ages < 25)
+            risk_scores = (2 * winter + health + 3 * adventure + (durations > 30)
+                           + 2 * senior + young).astype(np.int64)
+            levels = (risk_scores >= 3).astype(np.int64) + (risk_scores >= 5)
+            
+            # Likelihood (%): base rate + risk level + adventure coverage, at most 70
+            likelihoods = np.minimum(15 + np.array([0, 10, 20])[levels] + 5 * adventure_coverage, 70)
+        
+        # Likelihoods take a few distinct values: predict the claim types once
+        # per value (copied into each result)
+        claim_type_predictions = {
+            likelihood: {
+                claim_type: round(likelihood * share, 1) for claim_type, share in self.CLAIM_TYPE_SHARES
+            }
+            for likelihood in np.unique(likelihoods).tolist()
+        }
+        
+        level_names = ('low', 'medium', 'high')
+        return [
+            {
+                'overall_likelihood': round(likelihood, 1),
+                'claim_type_predictions': dict(claim_type_predictions[likelihood]),
+                'risk_level': level_names[level],
+                'recommendation': self._get_claim_prevention_tips(likelihood, trip_info)
+            }
+            for likelihood, level, trip_info in zip(likelihoods.tolist(), levels.tolist(), trip_infos)
+        ]
+    
+    def _risk_factor_flags(self, trip_info: Union[Dict, NormalizedTrip], user_info: Optional[Dict]) -> tuple:
+        """
+        Extract the inputs of the risk score for one trip.
+        
+        Args:
+            trip_info: Trip information dictionary
+            user_info: Optional user information
+            
+        Returns:
+            (winter destination, health-risk destination, adventure activities,
+            duration in days, age or 0 if unknown)
+        """
+        trip = NormalizedTrip.from_dict(trip_info)
+        return (
+            self._winter_re.search(trip.destination) is not None,
+            self._health_re.search(trip.destination) is not None,
+            self._adventure_re.search(trip.activities) is not None,
+            trip.duration_days,
+            (user_info.get('age') if user_info else None) or 0
+        )
+    
+    def generate_smart_nudges(self, user_id: str, trip_info: Union[Dict, NormalizedTrip], 
                               policy: Optional[Dict] = None) -> List[Dict]:
         """
         Generate proactive smart nudges for users.
@@ -168,82 +543,71 @@ class PredictiveIntelligence:
         
         Args:
             user_id: User identifier
-            trip_info: Trip information
+            trip_info: Trip information dictionary or NormalizedTrip
             policy: Optional policy information
             
         Returns:
             List of nudge dictionaries
         """
-        nudges = []
-        
-        # Check trip start date
-        departure_date = trip_info.get('departure_date')
-        if departure_date:
-            try:
-                dep = datetime.fromisoformat(departure_date.replace('Z', '+00:00'))
-                days_until_trip = (dep - datetime.now()).days
-                
-                if days_until_trip == 1:
-                    nudges.append({
-                        'type': 'trip_reminder',
-                        'priority': 'high',
-                        'message': 'Your trip starts tomorrow! 📅 Would you like emergency assistance information?',
-                        'action': 'get_emergency_info',
-                        'icon': '✈️'
-                    })
-                elif days_until_trip == 0:
-                    nudges.append({
-                        'type': 'trip_start',
-                        'priority': 'high',
-                        'message': 'Have a safe trip! 🛫 Keep your policy number handy: {policy_number}',
-                        'action': 'show_policy',
-                        'icon': '🎒'
-                    })
-            except:
-                pass
+        return list(self._iter_nudges(trip_info, policy))
+    
+    def top_nudge(self, user_id: str, trip_info: Union[Dict, NormalizedTrip],
+                  policy: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Get the first high-priority nudge (e.g. for a push notification).
+        
+        Stops at the first match, so the remaining nudge checks are skipped.
+        
+        Args:
+            user_id: User identifier
+            trip_info: Trip information dictionary or NormalizedTrip
+            policy: Optional policy information
+            
+        Returns:
+            Nudge dictionary, None if no high-priority nudge applies
+        """
+        return next((nudge for nudge in self._iter_nudges(trip_info, policy) if nudge['priority'] == 'high'), None)
+    
+    def _iter_nudges(self, trip_info: Union[Dict, NormalizedTrip], policy: Optional[Dict]):
+        """
+        Yield the smart nudges for a trip, in generate_smart_nudges() order.
+        
+        Args:
+            trip_info: Trip information dictionary or NormalizedTrip
+            policy: Optional policy information
+            
+        Yields:
+            Nudge dictionaries
+        """
+        now = datetime.now().astimezone()
+        trip = NormalizedTrip.from_dict(trip_info)
+        
+        # Check trip start date (malformed dates are skipped)
+        days_until_trip = _days_until(trip.departure_date, now)
+        if days_until_trip == 1:
+            yield _NUDGES['trip_reminder'].copy()
+        elif days_until_trip == 0:
+            nudge = _NUDGES['trip_start'].copy()
+            policy_number = policy.get('policy_number') if policy else None
+            if policy_number:
+                nudge['message'] = nudge['message'].format(policy_number=policy_number)
+            yield nudge
         
         # Destination-based nudges
-        destination = trip_info.get('destination', '').lower()
-        if 'japan' in destination or 'winter' in destination:
-            nudges.append({
-                'type': 'coverage_suggestion',
-                'priority': 'medium',
-                'message': 'Traveling to Japan in winter? ❄️ Consider adding ski coverage if you plan to hit the slopes!',
-                'action': 'upgrade_coverage',
-                'icon': '⛷️'
-            })
+        if self._ski_nudge_re.search(trip.destination):
+            yield _NUDGES['ski_coverage'].copy()
         
-        # Activity-based nudges
-        activities = trip_info.get('activities', [])
-        if any('dive' in act.lower() or 'scuba' in act.lower() for act in activities):
-            nudges.append({
-                'type': 'coverage_suggestion',
-                'priority': 'medium',
-                'message': 'Scuba diving detected! 🏊 Make sure your policy covers water sports.',
-                'action': 'check_coverage',
-                'icon': '🤿'
-            })
+        # Activity-based nudges (all activities searched once)
+        if self._water_sports_re.search(trip.activities):
+            yield _NUDGES['water_sports'].copy()
         
         # Policy expiration reminder
         if policy:
-            return_date = trip_info.get('return_date')
-            if return_date:
-                try:
-                    ret = datetime.fromisoformat(return_date.replace('Z', '+00:00'))
-                    days_until_return = (ret - datetime.now()).days
-                    
-                    if days_until_return <= 7:
-                        nudges.append({
-                            'type': 'policy_expiry',
-                            'priority': 'medium',
-                            'message': f'Your policy expires in {days_until_return} days. Consider extending if needed!',
-                            'action': 'extend_policy',
-                            'icon': '⏰'
-                        })
-                except:
-                    pass
-        
-        return nudges
+            days_until_return = _days_until(trip.return_date, now)
+            if days_until_return is not None and days_until_return <= 7:
+                nudge = _NUDGES['policy_expiry'].copy()
+                nudge['message'] = nudge['message'].format(days=days_until_return)
+                yield nudge
     
     def detect_flight_delay(self, flight_info: Dict, policy: Dict) -> Optional[Dict]:
         """
@@ -259,19 +623,19 @@ class PredictiveIntelligence:
         # In production, integrate with flight tracking API
         # For now, mock detection
         
-        if flight_info.get('status') == 'delayed' and flight_info.get('delay_minutes', 0) > 180:
-            return {
-                'type': 'flight_delay',
-                'priority': 'high',
-                'message': f'Flight delay detected ({flight_info["delay_minutes"]} minutes)! Your policy might cover this. Want to file a claim?',
-                'action': 'file_claim',
-                'icon': '✈️',
-                'delay_minutes': flight_info['delay_minutes']
-            }
+        # Fields read once (delay is null when unknown)
+        status = flight_info.get('status')
+        delay_minutes = flight_info.get('delay_minutes') or 0
+        
+        if status == 'delayed' and delay_minutes > 180:
+            nudge: Dict = _NUDGES['flight_delay'].copy()
+            nudge['message'] = nudge['message'].format(delay_minutes=delay_minutes)
+            nudge['delay_minutes'] = delay_minutes
+            return nudge
         
         return None
     
-    def _get_risk_recommendations(self, risk_level: str, risk_factors: List[str]) -> List[str]:
+    def _get_risk_recommendations(self, risk_level: str, risk_factors: List[str]) -> tuple:
         """
         Get recommendations based on risk level.
         
@@ -280,39 +644,25 @@ class PredictiveIntelligence:
             risk_factors: List of risk factors
             
         Returns:
-            List of recommendation strings
+            Tuple of recommendation strings (shared)
         """
-        recommendations = []
-        
-        if risk_level == 'high':
-            recommendations.append('Consider Premium plan for maximum coverage')
-            recommendations.append('Ensure adventure sports coverage if applicable')
-            recommendations.append('Purchase travel insurance well in advance')
-        elif risk_level == 'medium':
-            recommendations.append('Standard plan should provide adequate coverage')
-            recommendations.append('Review exclusions carefully')
-        else:
-            recommendations.append('Basic or Standard plan should suffice')
-        
-        return recommendations
+        return self.RISK_RECOMMENDATIONS.get(risk_level, self.RISK_RECOMMENDATIONS['low'])
     
-    def _get_claim_prevention_tips(self, likelihood: float, trip_info: Dict) -> str:
+    def _get_claim_prevention_tips(self, likelihood: float, trip_info: Union[Dict, NormalizedTrip]) -> str:
         """
         Get claim prevention tips based on predicted likelihood.
         
         Args:
             likelihood: Predicted claim likelihood percentage
-            trip_info: Trip information
+            trip_info: Trip information dictionary or NormalizedTrip
             
         Returns:
             Recommendation string
         """
-        if likelihood > 40:
-            return 'High claim risk detected. Ensure you have comprehensive coverage and keep all receipts.'
-        elif likelihood > 25:
-            return 'Moderate claim risk. Make sure to understand your policy coverage before traveling.'
-        else:
-            return 'Low claim risk expected. Standard coverage should be sufficient.'
+        for threshold, tip in self.CLAIM_PREVENTION_TIPS:
+            if likelihood > threshold:
+                return tip
+        return self.CLAIM_PREVENTION_TIPS[-1][1]
 
 
 # Example usage